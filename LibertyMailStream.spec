@@ -0,0 +1,58 @@
+# -*- mode: python ; coding: utf-8 -*-
+"""
+PyInstaller spec for the one-file build of Liberty Mail Stream:
+
+    pyinstaller LibertyMailStream.spec
+
+Resources are bundled under src/, where resource_path looks for them at run time. The bundled config.cfg only holds
+the defaults: everything the application writes, such as the sending limit ledger, the send journal and changed
+preferences, lives in the per-user data directory, see user_data_path. The Gmail discovery document shipped with
+googleapiclient is bundled as well, so the first launch builds the Gmail service without going to the network; the
+cache written from it is kept in the per-user data directory too.
+"""
+from PyInstaller.utils.hooks import collect_data_files
+
+
+datas = [
+    ('src/img', 'src/img'),
+    ('src/web', 'src/web'),
+    ('src/settings/config.cfg', 'src/settings'),
+]
+datas += collect_data_files('googleapiclient', includes=['discovery_cache/documents/gmail.v1.json'])
+datas += collect_data_files('qdarktheme')
+
+
+a = Analysis(
+    ['main.py'],
+    pathex=[],
+    binaries=[],
+    datas=datas,
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[],
+    noarchive=False,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.datas,
+    [],
+    name='LibertyMailStream',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    runtime_tmpdir=None,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
@@ -0,0 +1,270 @@
+"""
+Headless entry point for sending campaigns from a terminal, a server or a scheduler, without the Qt interface.
+
+    python -m lms send --template templates/Newsletter.json --list email_list.csv
+    python -m lms add-account work
+    python -m lms merge-lists email_list.csv signups.csv imported.csv
+
+The template is a JSON file saved by the editor. The list is cleaned and loaded the same way the recipients panel
+loads it, and the campaign is sent with the same engine, journal, quota state and suppression list as the GUI, so a
+run started here can be resumed from either. Progress is streamed to stdout as JSON lines, one event per line; all
+other output goes to stderr. Nothing from PyQt5 or qdarktheme is imported, and the rest is only imported once the
+command runs, so the script starts in milliseconds.
+"""
+
+import argparse
+import json
+import sys
+import threading
+
+
+
+class EventWriter:
+    """
+    Writes events as JSON lines to a stream, one complete line at a time from any thread.
+
+    Args:
+        stream (io.TextIOBase): The stream to write to.
+    """
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.lock = threading.Lock()
+
+
+    def emit(self, event, **fields) -> None:
+        """
+        Writes one event.
+
+        Args:
+            event (str): The name of the event.
+            **fields: The details of the event.
+        """
+        line = json.dumps({"event": event, **fields})
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def load_recipients(path):
+    """
+    Cleans a recipients CSV file if it changed since it was last cleaned, then loads it.
+
+    Args:
+        path (str): The path to the CSV file.
+
+    Returns:
+        RecipientStore: The recipients, with their merge fields if the file has a header row.
+    """
+    from src.utilities.import_cleaner import clean_email_list_cached
+    from src.utilities.recipient_index import RecipientIndex
+    from src.utilities.recipient_store import RecipientStore
+
+    clean_email_list_cached(path)
+    index = RecipientIndex.load(path)
+    recipients = RecipientStore()
+    if index.header:
+        recipients.set_columns(index.header)
+    for chunk in index.iter_chunks(50_000):
+        recipients.extend([row[0] for row in chunk], [row[1:] for row in chunk] if index.header else [])
+    index.save()
+    return recipients
+
+
+def load_campaign(path):
+    """
+    Builds a Campaign from a template saved by the editor. Templates saved before the plain text was stored with
+    them get one derived from their HTML.
+
+    Args:
+        path (str): The path to the template JSON file.
+
+    Returns:
+        Campaign: The campaign snapshot.
+    """
+    from src.utilities.campaign import Campaign
+    from src.utilities.html_compactor import html_to_text
+
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    body = data.get('body', {})
+    html = body.get('html', '')
+    return Campaign(data.get('subject', ''), html, body.get('text') or html_to_text(html), data.get('attachments') or [])
+
+
+def send(args, events) -> int:
+    """
+    Sends a campaign to a recipients list, streaming its progress as events.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+        events (EventWriter): Where progress is reported.
+
+    Returns:
+        int: The exit status: 0 when the run completed, 1 when it could not start or stopped on an error.
+    """
+    from src.utilities.account_pool import load_accounts
+    from src.utilities.config import config
+    from src.utilities.journal import SendJournal
+    from src.utilities.oauth import GmailService
+    from src.utilities.send_engine import SendEngine, resume_pending
+    from src.utilities.suppression import SuppressionList
+
+    try:
+        campaign = load_campaign(args.template)
+        recipients = load_recipients(args.list)
+    except (OSError, ValueError) as e:
+        events.emit("error", message=str(e))
+        return 1
+    if not campaign.subject or not campaign.plain_text:
+        events.emit("error", message="Subject or content cannot be empty.")
+        return 1
+    unknown_fields = campaign.merge_fields - set(recipients.columns) - set(campaign.merge_defaults)
+    if unknown_fields:
+        events.emit("error", message="The recipients list has no column for: " + ", ".join(sorted(unknown_fields)))
+        return 1
+
+    suppression = SuppressionList(config.get("FILES", "suppression_csv"))
+    suppression.refresh()
+    journal = SendJournal()
+    suppressed = suppression.mask(recipients.addresses)
+    settled, pending = resume_pending(journal, campaign, recipients.addresses, suppressed)
+    positions = recipients.positions()
+    for row in suppressed.nonzero()[0].tolist():
+        recipients.set_status(row, 'Suppressed')
+    for address, status in settled.items():
+        if address in positions:
+            recipients.set_status(positions[address], 'Unconfirmed' if status == 'Sending' else status)
+
+    gmail_service = GmailService()
+    client_id = config.get("TEMP_SECRET_STORAGE", "google_client_id")
+    if not gmail_service.restore_credentials(client_id):
+        if args.no_browser:
+            events.emit("error", message="No saved credentials. Sign in once without --no-browser, or from the application.")
+            return 1
+        if not gmail_service.authenticate(client_id, config.get("TEMP_SECRET_STORAGE", "google_client_secret")):
+            events.emit("error", message="Authentication failed.")
+            return 1
+    gmail_service.build_service()
+    accounts = load_accounts(gmail_service)
+
+    errors = []
+
+    def on_progress(snapshot):
+        for row, status in snapshot.updates.items():
+            recipients.set_status(row, status)
+        events.emit("progress", updates={recipients.addresses[row]: status for row, status in snapshot.updates.items()},
+                    counts=snapshot.counts, done=snapshot.done, total=snapshot.total,
+                    throughput=round(snapshot.throughput, 2), eta=snapshot.eta)
+
+    def on_error(message):
+        errors.append(message)
+        events.emit("error", message=message)
+
+    engine = SendEngine(pending, accounts, campaign, journal, suppression, recipients, on_progress, on_error)
+    events.emit("start", campaign=campaign.campaign_id, recipients=len(recipients), pending=len(pending),
+                settled=len(settled), accounts=[account.name for account in accounts])
+    worker = threading.Thread(target=engine.run)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.5)
+    except KeyboardInterrupt:
+        engine.stop()
+        worker.join()
+        events.emit("stopped")
+    for account in accounts:
+        account.gmail_service.refresher.stop()
+    journal.close()
+    events.emit("finished", counts=recipients.count_by_status())
+    return 1 if errors else 0
+
+
+def add_account(args, events) -> int:
+    """
+    Signs in another Gmail account in the browser and adds it to the accounts campaigns are sent from.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+        events (EventWriter): Where the result is reported.
+
+    Returns:
+        int: The exit status: 0 when the account was added, 1 otherwise.
+    """
+    from src.utilities.account_pool import add_account_name, check_account_name
+    from src.utilities.config import config
+    from src.utilities.oauth import GmailService
+
+    try:
+        check_account_name(args.name)
+    except ValueError as e:
+        events.emit("error", message=str(e))
+        return 1
+    if not GmailService(args.name).authenticate(config.get("TEMP_SECRET_STORAGE", "google_client_id"),
+                                                config.get("TEMP_SECRET_STORAGE", "google_client_secret")):
+        events.emit("error", message="Authentication failed.")
+        return 1
+    add_account_name(args.name)
+    events.emit("account_added", name=args.name)
+    return 0
+
+
+def merge_lists(args, events) -> int:
+    """
+    Merges several recipients CSV files into one cleaned list, in a single external merge sort pass.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+        events (EventWriter): Where the result is reported.
+
+    Returns:
+        int: The exit status: 0 when the lists were merged, 1 otherwise.
+    """
+    from src.utilities.import_cleaner import clean_email_lists
+
+    try:
+        written = clean_email_lists(args.inputs, args.output)
+    except (OSError, ValueError) as e:
+        events.emit("error", message=str(e))
+        return 1
+    events.emit("merged", output=args.output, recipients=written)
+    return 0
+
+
+def main(argv=None) -> int:
+    """
+    Parses the command line and runs the requested command.
+
+    Args:
+        argv (list[str], optional): The arguments, defaulting to those the script was started with.
+
+    Returns:
+        int: The exit status.
+    """
+    parser = argparse.ArgumentParser(prog="lms", description="Liberty Mail Stream without the graphical interface.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    send_parser = commands.add_parser("send", help="Send a campaign to a recipients list.")
+    send_parser.add_argument("--template", required=True, help="A template JSON file saved by the editor.")
+    send_parser.add_argument("--list", required=True, help="The recipients CSV file.")
+    send_parser.add_argument("--no-browser", action="store_true",
+                             help="Fail instead of opening a browser when there are no saved credentials.")
+    send_parser.set_defaults(command=send)
+    add_account_parser = commands.add_parser("add-account", help="Sign in another account to send from.")
+    add_account_parser.add_argument("name", help="A name for the account: letters, digits, dashes and underscores.")
+    add_account_parser.set_defaults(command=add_account)
+    merge_parser = commands.add_parser("merge-lists", help="Merge recipients CSV files into one cleaned list.")
+    merge_parser.add_argument("output", help="The CSV file to write, which may also be one of the inputs.")
+    merge_parser.add_argument("inputs", nargs="+", help="The CSV files to merge.")
+    merge_parser.set_defaults(command=merge_lists)
+    args = parser.parse_args(argv)
+
+    # Keep stdout for events: anything else the application prints goes to stderr
+    events = EventWriter(sys.stdout)
+    sys.stdout = sys.stderr
+    try:
+        return args.command(args, events)
+    finally:
+        sys.stdout = events.stream
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,20 +4,29 @@ necessary directories and files exist, applies a dark theme, and manages user au
 
 It uses configurations for paths and settings, handles high-DPI display settings, and executes the application with
 a login prompt followed by the main email application window.
+
+Heavy modules are imported as late as possible: the main window, and with it the theme, only once the login is done,
+and the Google client libraries, numpy and pandas on first use. A timing report of the startup is printed to stderr
+once the main window is up.
 """
 
+from src.utilities.startup_timer import startup_timer
+
+import multiprocessing
 import os
 import sys
-import qdarktheme
 
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtWidgets import QApplication, QDialog
 
 from src.containers.login_screen import EmailerLoginDialog
-from src.containers.main_window import LibertyMailstream
 from src.utilities.config import config
 from src.utilities.oauth import GmailService
 
 if __name__ == "__main__":
+    # Let the frozen executable run the worker processes used to validate large imports
+    multiprocessing.freeze_support()
+
     # Ensure the templates folder exists
     if config.get("FOLDERS", "templates_folder") not in os.listdir("."):
         os.mkdir(config.get("FOLDERS", "templates_folder"))
@@ -27,8 +36,17 @@ if __name__ == "__main__":
         with open(config.get("FILES", "recipients_csv"), "w") as file:
             file.write("")
 
+    # Ensure the suppression list CSV file exists
+    if config.get("FILES", "suppression_csv") not in os.listdir("."):
+        with open(config.get("FILES", "suppression_csv"), "w") as file:
+            file.write("")
+
+    startup_timer.mark("Imports")
+
     # Enable high DPI scaling for better display on high-resolution screens
-    qdarktheme.enable_hi_dpi()
+    QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
+    QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps)
+    QApplication.setHighDpiScaleFactorRoundingPolicy(Qt.HighDpiScaleFactorRoundingPolicy.PassThrough)
 
     # Create a Qt application instance
     app = QApplication(sys.argv)
@@ -36,15 +54,28 @@ if __name__ == "__main__":
     # Initialize the Gmail service
     gmail_service = GmailService()
 
-    # Create and display the login dialog
-    login_dialog = EmailerLoginDialog(gmail_service)
-    if login_dialog.exec_() == QDialog.Accepted:
+    # Sign in with the saved credentials, or else create and display the login dialog
+    if gmail_service.restore_credentials(config.get("TEMP_SECRET_STORAGE", "google_client_id")):
+        startup_timer.mark("Credentials restored")
+        logged_in = True
+    else:
+        login_dialog = EmailerLoginDialog(gmail_service)
+        startup_timer.mark("Login dialog created")
+        logged_in = login_dialog.exec_() == QDialog.Accepted
+        startup_timer.mark("Logged in")
+
+    if logged_in:
         # If login is successful, build the Gmail service
         gmail_service.build_service()
+        startup_timer.mark("Ready to send")
 
     # Initialize and display the main application window
+    from src.containers.main_window import LibertyMailstream
     window = LibertyMailstream(gmail_service)
     window.show()
 
+    # Report once the window has been painted, on the first pass of the event loop
+    QTimer.singleShot(0, lambda: (startup_timer.mark("First window"), startup_timer.report()))
+
     # Start the Qt event loop
     sys.exit(app.exec_())
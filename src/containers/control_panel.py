@@ -1,90 +1,129 @@
-import time
-import pandas as pd
+import datetime
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import QThread, pyqtSignal
 
-from ..utilities.import_cleaner import clean_email_list
-from ..utilities.state import state_manager
+from ..utilities.account_pool import SendingAccount, load_accounts
+from ..utilities.import_cleaner import clean_email_list_cached
+from ..utilities.state import StateManager, state_manager
 from ..utilities.config import config
+from ..utilities.campaign import Campaign
+from ..utilities.journal import SendJournal
+from ..utilities.recipient_index import RecipientIndex
+from ..utilities.recipient_store import RecipientStore
+from ..utilities.send_engine import SendEngine, resume_pending
+from ..utilities.suppression import SuppressionList
+from .recipients_model import RecipientsTableModel
 
 
 class EmailSenderThread(QThread):
     """
-    A class derived from QThread that handles the background sending of emails.
-    
+    A class derived from QThread that runs a SendEngine in the background and relays what it reports as signals.
+
     Attributes:
-        update_progress (pyqtSignal): Signal emitted during the sending process to update the progress.
+        progress_batch (pyqtSignal): Signal emitted at most every 100 ms with a ProgressSnapshot of the changes since the last one.
         finished (pyqtSignal): Signal emitted when the email sending process is complete.
         error_occurred (pyqtSignal): Signal emitted in case of an error during the email sending process.
-    
+
     Args:
-        emails_df (pd.DataFrame): DataFrame containing the email addresses and their sending status.
-        parent_frame (QWidget): The parent GUI component that contains UI elements like subject line and content editor.
+        pending (list[tuple]): The (table row, address) of every recipient left to send.
+        accounts (list[SendingAccount]): The accounts to send from.
+        campaign (Campaign): The snapshot of the message content taken when sending was started.
+        journal (SendJournal): The journal recording every recipient state transition.
+        suppression (SuppressionList): The addresses that must not be sent to.
+        recipients (RecipientStore): The loaded recipients, holding their merge fields.
     """
-    update_progress = pyqtSignal(int, str)
+    progress_batch = pyqtSignal(object)
     finished = pyqtSignal()
     error_occurred = pyqtSignal(str)
 
-    def __init__(self, emails_df, parent_frame):
+    def __init__(self, pending, accounts, campaign, journal, suppression, recipients):
         super().__init__()
-        self.emails_df = emails_df
-        self.parent_frame = parent_frame
-        self.keep_running = True
+        self.engine = SendEngine(pending, accounts, campaign, journal, suppression, recipients,
+                                 on_progress=self.progress_batch.emit, on_error=self.error_occurred.emit)
 
     def run(self):
         """
-        Starts the process of sending emails. This method checks for unsent emails in the DataFrame and sends them.
-        It also updates the status of each email sent and handles the interruption if the user decides to stop the process.
-        """
-        print("Starting email sending process.")
-        recipient_count = len(self.emails_df)
-        for index, (idx, row) in enumerate(self.emails_df.iterrows()):
-            if not self.keep_running:
-                print("Email sending cancelled by user.")
-                break
-
-            if row["Status"] == "Sent":
-                print(f"Skipping already sent email to: {row['Email Address']}")
-                continue
-
-            if not state_manager.can_send_email():
-                self.error_occurred.emit("Daily email limits met")
-                print("Daily email limit reached, stopping send.")
-                break
-
-            recipient = row['Email Address']
-            subject = self.parent_frame.subjectLineEdit.text()
-            raw_content = self.parent_frame.editor.toPlainText()
-            content = self.parent_frame.editor.toHtml()
-            
-            if not subject or not raw_content:
-                self.error_occurred.emit("Subject or content cannot be empty.")
-                return
-
-            try:
-                if state_manager.increment_sent():
-
-                    success = self.parent_frame.gmail_service.send_email(recipient, subject, raw_content, content)
-                    new_status = "Sent" if success else "Failed"
-                    print(f"Email sent to {recipient}: {new_status}")
-            except Exception as e:
-                new_status = "Failed"
-                self.error_occurred.emit(str(e))
-                print(f"Error sending email to {recipient}: {e}")
-
-            self.emails_df.at[idx, 'Status'] = new_status
-            self.update_progress.emit(index, new_status)
-            time.sleep(int(config.get("PREFERENCES","email_delay")))
-
-        print("Email sending process completed.")
+        Sends the campaign, then signals that sending is complete.
+        """
+        self.engine.run()
         self.finished.emit()
 
     def stop(self):
         """
-        Stops the email sending process by setting the keep_running flag to False.
+        Stops the email sending process. Sends already in flight are allowed to complete.
+        """
+        self.engine.stop()
+
+
+class RecipientLoaderThread(QThread):
+    """
+    A class derived from QThread that imports a recipients CSV file in the background.
+
+    The file is cleaned, then streamed in chunks through a RecipientIndex so the GUI thread only ever handles one
+    chunk at a time. A load that was cancelled can be resumed from the row it stopped at, as long as the file has
+    not changed in between.
+
+    Attributes:
+        header_loaded (pyqtSignal): Signal emitted with the column titles of the file before its first chunk, if it has a header.
+        chunk_loaded (pyqtSignal): Signal emitted with the list of email addresses of each chunk read, the values of their
+            extra columns, and the positions within the chunk of the suppressed ones.
+        progress (pyqtSignal): Signal emitted with the percentage of the file read so far.
+        loaded (pyqtSignal): Signal emitted with the RecipientIndex once the whole file has been read.
+        error_occurred (pyqtSignal): Signal emitted if the file cannot be read.
+
+    Args:
+        index (RecipientIndex): The index of the file to load, possibly partly built by an earlier load.
+        start_row (int): The row to start loading from.
+        suppression (SuppressionList): The addresses to mark as suppressed.
+    """
+    header_loaded = pyqtSignal(object)
+    chunk_loaded = pyqtSignal(object, object, object)
+    progress = pyqtSignal(int)
+    loaded = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
+
+    CHUNK_SIZE = 5000
+
+    def __init__(self, index, start_row, suppression):
+        super().__init__()
+        self.index = index
+        self.start_row = start_row
+        self.suppression = suppression
+        self.keep_running = True
+
+    def run(self):
+        """
+        Cleans the file when loading from the start, skipping the work if it has not changed since the last clean,
+        then streams it chunk by chunk until it is read or cancelled. Each chunk is checked against the suppression
+        list in one pass.
+        """
+        try:
+            self.suppression.refresh()
+            if self.start_row == 0:
+                if clean_email_list_cached(self.index.path) or not self.index.is_current():
+                    self.index = RecipientIndex.load(self.index.path)
+                if self.index.header:
+                    self.header_loaded.emit(self.index.header)
+
+            for chunk in self.index.iter_chunks(self.CHUNK_SIZE, self.start_row):
+                if not self.keep_running:
+                    print("Recipient loading cancelled by user.")
+                    return
+                addresses = [row[0] for row in chunk]
+                fields = [row[1:] for row in chunk] if self.index.header else []
+                self.chunk_loaded.emit(addresses, fields, self.suppression.mask(addresses).nonzero()[0].tolist())
+                self.progress.emit(int(self.index.end_offset / max(self.index.size, 1) * 100))
+
+            self.index.save()
+            self.loaded.emit(self.index)
+        except (OSError, UnicodeDecodeError) as e:
+            self.error_occurred.emit(f"Could not load recipients: {e}")
+
+    def cancel(self):
+        """
+        Stops the load after the current chunk.
         """
         self.keep_running = False
-        print("Stopping email sending process...")
 
 
 class ControlPanel(QToolBar):
@@ -98,10 +137,16 @@ class ControlPanel(QToolBar):
         super().__init__(parent)
         self.parent_frame = parent
         self.email_listing = config.get("FILES", "recipients_csv")
-        self.emails_df = pd.DataFrame(columns=['Status', 'Email Address'])
+        self.recipients = RecipientStore()
+        self.recipients_complete = False
+        self.journal = SendJournal()
+        self.suppression = SuppressionList(config.get("FILES", "suppression_csv"))
+        self.recipient_index = None
+        self.loader_thread = None
+        self.email_sender_thread = None
+        self.accounts = None
         self.setWindowTitle('Recipients')
         self.initUI()
-        self.email_sender_thread = None
         
     def displayError(self, message):
             QMessageBox.critical(self, "Error", message)
@@ -129,10 +174,11 @@ class ControlPanel(QToolBar):
         self.buttonBarLayout.addWidget(self.removeButton)
         self.buttonBarLayout.addWidget(self.refreshButton)
         
-        self.recipientsTable = QTableWidget()
-        self.recipientsTable.setColumnCount(2)
-        self.recipientsTable.setHorizontalHeaderLabels(['Status', 'Email Address'])
+        self.recipientsModel = RecipientsTableModel(self.recipients, self)
+        self.recipientsTable = QTableView()
+        self.recipientsTable.setModel(self.recipientsModel)
         self.recipientsTable.verticalHeader().setVisible(False)
+        self.recipientsTable.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.recipientsTable.setShowGrid(True)
         self.recipientsTable.setColumnWidth(0, 55)
         self.recipientsTable.horizontalHeader().setStretchLastSection(True)
@@ -143,6 +189,13 @@ class ControlPanel(QToolBar):
         self.widget.setLayout(self.layout)
         self.addWidget(self.widget)
         
+        self.quotaLabel = QLabel(self)
+        self.layout.addWidget(self.quotaLabel)
+        self.updateQuotaLabel()
+
+        self.progressLabel = QLabel(self)
+        self.layout.addWidget(self.progressLabel)
+
         self.progressBar = QProgressBar(self)
         self.progressBar.setMaximum(100)
         self.progressBar.setValue(0)
@@ -154,60 +207,244 @@ class ControlPanel(QToolBar):
 
     def loadEmails(self, filePath):
         """
-        Loads emails from a specified CSV file, cleans them using an external utility, and updates the GUI table.
+        Starts loading emails from a specified CSV file on a RecipientLoaderThread, which cleans the file using an
+        external utility and streams it in chunks into the GUI table. If an earlier load of the same, unchanged file
+        was cancelled, loading resumes where it stopped.
         
         Args:
             filePath (str): The path to the CSV file containing email addresses.
         """
-        clean_email_list(filePath, filePath)
-        self.recipientsTable.setRowCount(0)
-        self.emails_df = pd.DataFrame(columns=['Status', 'Email Address'])
+        if self.loader_thread and self.loader_thread.isRunning():
+            self.loader_thread.cancel()
+            self.loader_thread.wait()
 
+        index = self.recipient_index
+        if index and index.path == filePath and index.is_current() and not index.is_complete() \
+                and len(self.recipients) <= index.row_count:
+            start_row = len(self.recipients)
+        else:
+            index = RecipientIndex.load(filePath)
+            start_row = 0
+            self.recipients = RecipientStore()
+            self.recipientsModel.setStore(self.recipients)
+        self.recipient_index = index
+        self.recipients_complete = False
 
-        temp_df = pd.read_csv(filePath, header=None, names=['Email Address'])
-        temp_df['Status'] = 'Pending'
-        self.emails_df = pd.concat([self.emails_df, temp_df])
+        self.loader_thread = RecipientLoaderThread(index, start_row, self.suppression)
+        self.loader_thread.header_loaded.connect(self.setRecipientColumns)
+        self.loader_thread.chunk_loaded.connect(self.appendRecipients)
+        self.loader_thread.progress.connect(self.progressBar.setValue)
+        self.loader_thread.loaded.connect(self.recipientsLoaded)
+        self.loader_thread.error_occurred.connect(self.displayError)
+        self.loader_thread.finished.connect(self.progressBar.hide)
+        self.progressBar.setValue(0)
+        self.progressBar.show()
+        self.loader_thread.start()
 
-        for index, row in self.emails_df.iterrows():
-            row_pos = self.recipientsTable.rowCount()
-            self.recipientsTable.insertRow(row_pos)
-            self.recipientsTable.setItem(row_pos, 0, QTableWidgetItem(row['Status']))
-            self.recipientsTable.setItem(row_pos, 1, QTableWidgetItem(row['Email Address']))
-        
+    def setRecipientColumns(self, header):
+        """
+        Sets up the merge field columns of the recipients from the header of the file being loaded.
+
+        Args:
+            header (list[str]): The column titles of the file.
+        """
+        if self.sender() is not self.loader_thread:
+            return
+        self.recipients.set_columns(header)
+
+    def appendRecipients(self, addresses, fields, suppressed):
+        """
+        Appends one loaded chunk of email addresses to the recipients model. Chunks still queued from a load that has since
+        been replaced are ignored; the new load reads them again.
+
+        Args:
+            addresses (list[str]): The email addresses of the chunk.
+            fields (list[list[str]]): The values of the extra columns of every address of the chunk.
+            suppressed (list[int]): The positions within the chunk of the suppressed addresses.
+        """
+        if self.sender() is not self.loader_thread:
+            return
+        self.recipientsModel.appendRecipients(addresses, fields, suppressed)
+
+    def recipientsLoaded(self, index):
+        """
+        Marks the recipients list as complete once the whole file has been loaded.
+
+        Args:
+            index (RecipientIndex): The completed index of the file.
+        """
+        if self.sender() is not self.loader_thread:
+            return
+        self.recipient_index = index
+        self.recipients_complete = True
+
+    def isLoading(self):
+        """
+        Returns:
+            bool: True while a recipients file is being loaded.
+        """
+        return bool(self.loader_thread and self.loader_thread.isRunning())
+
+    def isSending(self):
+        """
+        Returns:
+            bool: True while a campaign is being sent.
+        """
+        return bool(self.email_sender_thread and self.email_sender_thread.isRunning())
+
+    def setSending(self, sending):
+        """
+        Disables Start and Refresh while a campaign is being sent, so that neither a second run nor a new recipients
+        list can be started under the running one.
+
+        Args:
+            sending (bool): Whether a campaign is being sent.
+        """
+        self.addButton.setEnabled(not sending)
+        self.refreshButton.setEnabled(not sending)
 
     def startSendingEmails(self):
         """
-        Initializes and starts the EmailSenderThread to send emails. It also connects signals to appropriate slots
-        for error handling and progress updates.
+        Captures the current subject and editor content as a Campaign snapshot, checks that the recipients list has
+        a column for every merge field it uses, resumes its journaled progress,
+        then initializes and starts the EmailSenderThread to send what is left. It also connects signals to appropriate
+        slots for error handling and progress updates.
         """
+        if self.isSending():
+            QMessageBox.critical(self, "Error", "A campaign is already being sent.")
+            return
+
         if not self.parent_frame.gmail_service:
             QMessageBox.critical(self, "Error", "Emailer service is not initialized.")
             return
 
-        self.email_sender_thread = EmailSenderThread(self.emails_df, self.parent_frame)
+        if not self.recipients_complete:
+            QMessageBox.critical(self, "Error", "Recipients are still loading. Press Refresh to finish loading them.")
+            return
+
+        subject = self.parent_frame.subjectLineEdit.text()
+        raw_content = self.parent_frame.editor.toPlainText()
+        if not subject or not raw_content:
+            QMessageBox.critical(self, "Error", "Subject or content cannot be empty.")
+            return
+
+        try:
+            campaign = Campaign(subject, self.parent_frame.editor.toHtml(), raw_content, self.parent_frame.attachments)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Could not read attachment: {e}")
+            return
+        unknown_fields = campaign.merge_fields - set(self.recipients.columns) - set(campaign.merge_defaults)
+        if unknown_fields:
+            QMessageBox.critical(self, "Error", "The recipients list has no column for: " + ", ".join(sorted(unknown_fields)))
+            return
+
+        pending = self.resumeCampaign(campaign)
+        self.email_sender_thread = EmailSenderThread(pending, self.sendingAccounts(), campaign, self.journal,
+                                                     self.suppression, self.recipients)
         self.email_sender_thread.error_occurred.connect(self.displayError)
-        self.email_sender_thread.update_progress.connect(self.updateEmailStatus)
+        self.email_sender_thread.progress_batch.connect(self.applyProgress)
         self.email_sender_thread.finished.connect(self.emailSendingFinished)
+        self.progressBar.setValue(0)
+        self.progressBar.show()
+        self.setSending(True)
         self.email_sender_thread.start()
 
-    def updateEmailStatus(self, index, status):
+    def sendingAccounts(self):
+        """
+        Returns the accounts campaigns are sent from, signing in the additional ones on first use.
+
+        Returns:
+            list[SendingAccount]: The main account followed by every additional account that could be signed in.
+        """
+        if self.accounts is None:
+            self.accounts = load_accounts(self.parent_frame.gmail_service)
+        return self.accounts
+
+    def addAccount(self, name, gmail_service):
+        """
+        Adds a newly signed in account to the accounts campaigns are sent from, if they have been loaded already.
+
+        Args:
+            name (str): The name of the account.
+            gmail_service (GmailService): The service of the account, already built.
+        """
+        if self.accounts is not None:
+            self.accounts.append(SendingAccount(name, gmail_service, StateManager(name)))
+        self.updateQuotaLabel()
+
+    def resumeCampaign(self, campaign):
+        """
+        Registers the loaded recipients with the send journal and restores the status of every recipient the campaign
+        already reached. Recipients that were being sent when the application stopped are shown as Unconfirmed and
+        are not sent again. The whole list is checked against the suppression list in one pass, and suppressed
+        recipients are left out.
+
+        Args:
+            campaign (Campaign): The campaign about to be sent.
+
+        Returns:
+            list[tuple]: The (table row, address) of every recipient left to send, in table order.
+        """
+        self.suppression.refresh()
+        suppressed = self.suppression.mask(self.recipients.addresses)
+        settled, pending = resume_pending(self.journal, campaign, self.recipients.addresses, suppressed)
+
+        positions = self.recipients.positions()
+        self.recipientsModel.resetStatuses(suppressed.nonzero()[0].tolist())
+        for address, status in settled.items():
+            if address in positions:
+                self.recipientsModel.setStatus(positions[address], 'Unconfirmed' if status == 'Sending' else status)
+        return pending
+
+    def applyProgress(self, snapshot):
         """
-        Updates the status of an email in the GUI table and the progress bar.
+        Applies a batch of status changes to the recipients table and updates the progress bar and the run summary.
+        Snapshots still queued from an earlier run, or from a run over a recipients list that has since been replaced,
+        are ignored, as their rows no longer match the table.
         
         Args:
-            index (int): The index of the email in the table.
-            status (str): The new status of the email ('Sent' or 'Failed').
+            snapshot (ProgressSnapshot): The changes and totals since the previous batch.
+        """
+        thread = self.sender()
+        if thread is not self.email_sender_thread or thread.engine.recipients is not self.recipients:
+            return
+        for row, status in snapshot.updates.items():
+            self.recipientsModel.setStatus(row, status)
+
+        self.progressBar.setValue(int(snapshot.done / max(snapshot.total, 1) * 100))
+        summary = ", ".join(f"{count} {status.lower()}" for status, count in sorted(snapshot.counts.items()))
+        summary += f" | {snapshot.throughput:.1f}/min"
+        if snapshot.eta is not None:
+            summary += f" | ETA {datetime.timedelta(seconds=int(snapshot.eta))}"
+        self.progressLabel.setText(summary)
+        self.updateQuotaLabel()
+
+    def updateQuotaLabel(self):
         """
-        self.recipientsTable.setItem(index, 0, QTableWidgetItem(status))
-        progress_percentage = int((index + 1) / len(self.emails_df) * 100)
-        self.progressBar.setValue(progress_percentage)
+        Shows how many sends the rolling 24-hour windows of the accounts allow right now, or when the next slot frees up.
+        """
+        states = [account.state for account in self.accounts] if self.accounts else [state_manager]
+        available = sum(state.available_now() for state in states)
+        if available:
+            self.quotaLabel.setText(f"{available} sends available")
+        else:
+            next_slot = min(state.next_slot_frees_at() for state in states)
+            self.quotaLabel.setText(f"Sending limit reached, next slot at {next_slot:%H:%M}")
 
     def emailSendingFinished(self):
+        if self.sender() is not self.email_sender_thread:
+            return
         self.progressBar.hide()
+        self.setSending(False)
+        self.updateQuotaLabel()
 
     def cancelSendingEmails(self):
-        if self.email_sender_thread:
+        if self.isSending():
             self.email_sender_thread.stop()
+        elif self.isLoading():
+            self.loader_thread.cancel()
 
     def refreshRecipientsList(self):
+        if self.isSending():
+            return
         self.loadEmails(self.email_listing)
\ No newline at end of file
@@ -1,7 +1,7 @@
 import os
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton, QMessageBox
 from PyQt5.QtGui import QIcon, QPixmap
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
 from ..utilities.resource_path import resource_path
 from ..utilities.config import config
@@ -10,6 +10,43 @@ from ..utilities.oauth import GmailService
 
 
 
+class LoginThread(QThread):
+    """
+    A class derived from QThread that runs the OAuth2 browser flow in the background, so the dialog stays responsive
+    while the user signs in.
+
+    Attributes:
+        completed (pyqtSignal): Signal emitted with True once the user has signed in, or False if the flow failed,
+            timed out or was cancelled.
+
+    Args:
+        oauth2_handler (GmailService): The service to authenticate. Its sign-in is prepared when the thread is
+            created, so a cancel made before the thread starts running is kept.
+    """
+    completed = pyqtSignal(bool)
+
+    def __init__(self, oauth2_handler):
+        super().__init__()
+        self.oauth2_handler = oauth2_handler
+        self.auth_code_event = oauth2_handler.prepare_authentication()
+
+    def run(self):
+        """
+        Authenticates with the client ID and secret from the configuration and reports the result.
+        """
+        self.completed.emit(self.oauth2_handler.authenticate(
+            config.get("TEMP_SECRET_STORAGE", "google_client_id"),
+            config.get("TEMP_SECRET_STORAGE", "google_client_secret"),
+            auth_code_event=self.auth_code_event
+        ))
+
+    def cancel(self):
+        """
+        Stops waiting for the browser, or keeps the sign-in from starting. The thread then completes with False.
+        """
+        self.auth_code_event.set()
+
+
 class EmailerLoginDialog(QDialog):
     """
     A dialog window for the OAuth2 authentication with Google for email services.
@@ -20,6 +57,7 @@ class EmailerLoginDialog(QDialog):
     Attributes:
         email (str): Email address of the user. Initialized to None and updated upon successful login.
         oauth2_handler (GmailService): Handler for OAuth2 authentication process.
+        login_thread (LoginThread): The sign-in in progress, if any.
     
     Args:
         oauth2_handler (GmailService): An instance of GmailService to handle OAuth2 authentication.
@@ -28,6 +66,8 @@ class EmailerLoginDialog(QDialog):
         super().__init__()
         self.email: str = None
         self.oauth2_handler:GmailService = oauth2_handler
+        self.login_thread = None
+        self.cancelled = False
         
         self.initUI()
 
@@ -47,25 +87,71 @@ class EmailerLoginDialog(QDialog):
         logoLabel.setAlignment(Qt.AlignCenter)
         layout.addWidget(logoLabel)
 
-        login_button = QPushButton("Sign in with Google")
-        login_button.clicked.connect(self.initiate_oauth2_flow)
-        layout.addWidget(login_button)
+        self.login_button = QPushButton("Sign in with Google")
+        self.login_button.clicked.connect(self.initiate_oauth2_flow)
+        layout.addWidget(self.login_button)
+
+        self.status_label = QLabel("Waiting for you to sign in in the browser...")
+        self.status_label.setAlignment(Qt.AlignCenter)
+        self.status_label.hide()
+        layout.addWidget(self.status_label)
+
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_oauth2_flow)
+        self.cancel_button.hide()
+        layout.addWidget(self.cancel_button)
 
         self.setLayout(layout)
 
 
     def initiate_oauth2_flow(self):
         """
-        Initiates the OAuth2 flow for authentication. It retrieves the client ID and secret from configuration,
-        calls the GmailService to authenticate, and handles the user response based on the authentication success.
+        Initiates the OAuth2 flow for authentication on a LoginThread, and waits for it without blocking the dialog.
+        """
+        self.cancelled = False
+        self.login_button.setEnabled(False)
+        self.status_label.show()
+        self.cancel_button.show()
+        self.login_thread = LoginThread(self.oauth2_handler)
+        self.login_thread.completed.connect(self.oauth2_flow_completed)
+        self.login_thread.start()
+
+
+    def cancel_oauth2_flow(self):
+        """
+        Stops waiting for the browser, so the user can start signing in again.
         """
-        client_id = config.get("TEMP_SECRET_STORAGE", "google_client_id")
-        print(client_id)
-        success = self.oauth2_handler.authenticate(
-            client_id,
-            config.get("TEMP_SECRET_STORAGE", "google_client_secret")
-        )
+        if self.login_thread and self.login_thread.isRunning():
+            self.cancelled = True
+            self.login_thread.cancel()
+
+
+    def oauth2_flow_completed(self, success):
+        """
+        Handles the result of the OAuth2 flow: closes the dialog when the user signed in, and otherwise lets them try
+        again, with an error message unless they cancelled.
+
+        Args:
+            success (bool): True if authentication succeeded.
+        """
+        self.login_thread.wait()
+        self.login_thread = None
         if success:
             self.accept()
-        else:
-            QMessageBox.critical(self, "Login Failed", "OAuth2 Authentication failed. Please try again.")
+            return
+        self.login_button.setEnabled(True)
+        self.status_label.hide()
+        self.cancel_button.hide()
+        if not self.cancelled:
+            QMessageBox.critical(self, "Login Failed", "OAuth2 Authentication failed or timed out. Please try again.")
+
+
+    def reject(self):
+        """
+        Cancels a sign-in in progress before closing the dialog.
+        """
+        if self.login_thread and self.login_thread.isRunning():
+            self.cancelled = True
+            self.login_thread.cancel()
+            self.login_thread.wait()
+        super().reject()
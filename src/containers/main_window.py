@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import QVBoxLayout
 from PyQt5.QtWidgets import QWidget
 from PyQt5.QtWidgets import QLineEdit
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWidgets import QLabel
 
 from PyQt5.QtGui import QIcon
 
@@ -17,6 +18,7 @@ from .control_panel import ControlPanel
 from .toolbar import Toolbar
 from .menubar import Menubar
 
+import os
 import qdarktheme
 
 
@@ -31,6 +33,7 @@ class LibertyMailstream(QMainWindow):
 
     Attributes:
         gmail_service: Instance used for Gmail service operations, handling email interactions.
+        attachments (list[str]): Paths of the files attached to the email being edited.
 
     Args:
         gmail_service: A GmailService object for handling email operations.
@@ -38,6 +41,7 @@ class LibertyMailstream(QMainWindow):
     def __init__(self, gmail_service):
         super().__init__()
         self.gmail_service = gmail_service
+        self.attachments = []
         self.title = "Liberty Mail Stream"
         self.setWindowTitle(self.title)
         self.setWindowIcon(QIcon(resource_path('img\icons\logo.png')))
@@ -65,6 +69,11 @@ class LibertyMailstream(QMainWindow):
         self.subjectLineEdit.setPlaceholderText("Subject")
         self.layout.addWidget(self.subjectLineEdit)
 
+        # Attached files
+        self.attachmentsLabel = QLabel()
+        self.layout.addWidget(self.attachmentsLabel)
+        self.setAttachments([])
+
         # Editor
         self.editor = QTextEdit()
         self.layout.addWidget(self.editor)
@@ -88,6 +97,18 @@ class LibertyMailstream(QMainWindow):
         self.control_panel.setVisible(config.get_bool("PREFERENCES", "control_panel_toggle"))
 
 
+    def setAttachments(self, paths):
+        """
+        Replaces the files attached to the email and lists them under the subject.
+
+        Args:
+            paths (list[str]): The paths of the attached files.
+        """
+        self.attachments = list(paths)
+        self.attachmentsLabel.setText("Attachments: " + ", ".join(os.path.basename(path) for path in self.attachments))
+        self.attachmentsLabel.setVisible(bool(self.attachments))
+
+
     def resizeEvent(self, event):
         """
         Handles the resize event to adjust configuration settings based on the new window size.
@@ -1,12 +1,17 @@
 from PyQt5.QtWidgets import QAction
 from PyQt5.QtWidgets import QFileDialog
+from PyQt5.QtWidgets import QInputDialog
+from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtWidgets import QTextEdit
 
 import json
 
+from ..containers.login_screen import EmailerLoginDialog
 from ..containers.preferences import PreferencesDialog
 
+from ..utilities.account_pool import add_account_name, check_account_name
 from ..utilities.config import config
+from ..utilities.oauth import GmailService
 
 
 
@@ -66,6 +71,22 @@ class Menubar:
 
         file_menu.addSeparator() # -----------------------
 
+        attach_action = QAction("Attach Files...", self.parent)
+        attach_action.triggered.connect(self.attachFiles)
+        file_menu.addAction(attach_action)
+
+        clear_attachments_action = QAction("Remove Attachments", self.parent)
+        clear_attachments_action.triggered.connect(lambda: self.parent.setAttachments([]))
+        file_menu.addAction(clear_attachments_action)
+
+        file_menu.addSeparator() # -----------------------
+
+        add_account_action = QAction("Add Sending Account...", self.parent)
+        add_account_action.triggered.connect(self.addSendingAccount)
+        file_menu.addAction(add_account_action)
+
+        file_menu.addSeparator() # -----------------------
+
         preferences_action = QAction("Preferences", self.parent)
         preferences_action.triggered.connect(self.open_preferences)
         file_menu.addAction(preferences_action)
@@ -133,21 +154,24 @@ class Menubar:
         Clears the current document content and resets the document name to 'Untitled'. Also updates the window title.
         """
         self.parent.editor.clear()
+        self.parent.setAttachments([])
         self.document_name = "Untitled"
         self.update_title()
 
 
     def saveFile(self):
         """
-        Saves the current document to a file using JSON format, storing details like subject and body.
+        Saves the current document to a file using JSON format, storing details like subject, body (as HTML and
+        plain text) and attachment paths.
         The file is saved under the current document name in a predefined templates directory.
         """
         data = {
             "subject": self.parent.subjectLineEdit.text(),
             "body": {
-                "html": self.editor.toHtml()
+                "html": self.editor.toHtml(),
+                "text": self.editor.toPlainText()
             },
-            "attachments": None
+            "attachments": self.parent.attachments
         }
 
         with open(f"templates/{self.document_name}.json", 'w') as file:
@@ -169,9 +193,10 @@ class Menubar:
             data = {
                 "subject": self.parent.subjectLineEdit.text(),
                 "body": {
-                    "html": self.editor.toHtml()
+                    "html": self.editor.toHtml(),
+                    "text": self.editor.toPlainText()
                 },
-                "attachments": None
+                "attachments": self.parent.attachments
             }
 
             with open(filePath, 'w') as file:
@@ -194,12 +219,42 @@ class Menubar:
                 subject = data.get('subject', '')
                 # body_text = data.get('body', {}).get('text', '')
                 body_html = data.get('body', {}).get('html', '')
+                attachments = data.get('attachments') or []
                 
                 # Updating the UI components
                 self.parent.subjectLineEdit.setText(subject)
                 self.editor.setHtml(body_html)
+                self.parent.setAttachments(attachments)
         self.update_title()
 
+    def attachFiles(self):
+        """
+        Opens a file dialog to choose files to attach to the email, adding them to the current attachments.
+        """
+        filePaths, _ = QFileDialog.getOpenFileNames(self.parent, "Attach Files", "", "All Files (*)")
+        if filePaths:
+            self.parent.setAttachments(self.parent.attachments + [path for path in filePaths if path not in self.parent.attachments])
+
+    def addSendingAccount(self):
+        """
+        Asks for a name for another Gmail account, signs it in and adds it to the accounts campaigns are sent from.
+        """
+        name, ok = QInputDialog.getText(self.parent, "Add Sending Account", "Account name:")
+        name = name.strip()
+        if not ok or not name:
+            return
+        try:
+            check_account_name(name)
+        except ValueError as e:
+            QMessageBox.critical(self.parent, "Error", str(e))
+            return
+
+        gmail_service = GmailService(name)
+        if EmailerLoginDialog(gmail_service).exec_():
+            add_account_name(name)
+            gmail_service.build_service()
+            self.parent.control_panel.addAccount(name, gmail_service)
+
     def open_preferences(self):
         """
         Opens a preferences dialog allowing the user to adjust application settings such as theme and toolbar visibility.
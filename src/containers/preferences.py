@@ -1,4 +1,4 @@
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSpinBox, QFontComboBox
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSpinBox, QFontComboBox, QCheckBox
 from PyQt5.QtGui import QFont
 from ..utilities.config import config  # Ensure this import is correct
 
@@ -20,7 +20,7 @@ class PreferencesDialog(QDialog):
     def initUI(self):
         """
         Initializes the user interface elements for the preferences dialog. This includes input fields for
-        setting email delay, default font family, and default font size, along with Save and Cancel buttons.
+        setting email delay, concurrent sends, batch size, address case handling, default font family, and default font size, along with Save and Cancel buttons.
         """
         layout = QVBoxLayout()
 
@@ -37,6 +37,32 @@ class PreferencesDialog(QDialog):
         email_delay_layout.addWidget(self.email_delay_input)
         layout.addLayout(email_delay_layout)
 
+        # Concurrent Sends Setting
+        send_workers_layout = QHBoxLayout()
+        send_workers_label = QLabel("Concurrent Sends:", self)
+        self.send_workers_input = QSpinBox(self)
+        self.send_workers_input.setRange(1, 32)
+        self.send_workers_input.setValue(int(config.get("PREFERENCES", "send_workers")))
+        send_workers_layout.addWidget(send_workers_label)
+        send_workers_layout.addWidget(self.send_workers_input)
+        layout.addLayout(send_workers_layout)
+
+        # Batch Size Setting
+        send_batch_size_layout = QHBoxLayout()
+        send_batch_size_label = QLabel("Messages per Batch Request:", self)
+        self.send_batch_size_input = QSpinBox(self)
+        self.send_batch_size_input.setRange(1, 100)
+        self.send_batch_size_input.setValue(int(config.get("PREFERENCES", "send_batch_size")))
+        self.send_batch_size_input.setToolTip("Messages sent together in one Gmail request. Each still waits its own email delay.")
+        send_batch_size_layout.addWidget(send_batch_size_label)
+        send_batch_size_layout.addWidget(self.send_batch_size_input)
+        layout.addLayout(send_batch_size_layout)
+
+        # Address Case Setting
+        self.fold_local_part_input = QCheckBox("Treat addresses differing only in case as duplicates", self)
+        self.fold_local_part_input.setChecked(config.get_bool("PREFERENCES", "fold_local_part"))
+        layout.addWidget(self.fold_local_part_input)
+
         # Default Font Family Setting
         font_family_layout = QHBoxLayout()
         font_family_label = QLabel("Default Font Family:", self)
@@ -73,10 +99,13 @@ class PreferencesDialog(QDialog):
 
     def save_preferences(self):
         """
-        Saves the preferences set by the user to the configuration. This includes the email delay, default font family,
+        Saves the preferences set by the user to the configuration. This includes the email delay, concurrent sends, batch size, default font family,
         and default font size. The dialog is accepted and closed upon successful saving.
         """
         config.set("PREFERENCES", "email_delay", str(self.email_delay_input.value()))
+        config.set("PREFERENCES", "send_workers", str(self.send_workers_input.value()))
+        config.set("PREFERENCES", "send_batch_size", str(self.send_batch_size_input.value()))
+        config.set("PREFERENCES", "fold_local_part", str(self.fold_local_part_input.isChecked()))
         config.set("PREFERENCES", "default_font_family", self.font_family_input.currentFont().family())
         config.set("PREFERENCES", "default_font_size", str(self.font_size_input.value()))
         self.accept()
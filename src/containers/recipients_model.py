@@ -0,0 +1,119 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+
+from ..utilities.recipient_store import RecipientStore
+
+
+
+class RecipientsTableModel(QAbstractTableModel):
+    """
+    A table model that presents a RecipientStore to a QTableView without creating an item per cell.
+
+    The view only asks for the rows it shows, so the cost of a list is independent of its length. Status changes
+    are collected into one dirty row range and reported as a single dataChanged signal every FLUSH_INTERVAL
+    milliseconds, however many statuses changed in between.
+
+    Attributes:
+        store (RecipientStore): The recipients shown by the model.
+        HEADERS (list[str]): The column titles.
+
+    Args:
+        store (RecipientStore): The recipients to show.
+        parent (QObject, optional): The parent object of the model.
+    """
+    HEADERS = ['Status', 'Email Address']
+    FLUSH_INTERVAL = 50
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store: RecipientStore = store
+        self.dirty_top = None
+        self.dirty_bottom = None
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.FLUSH_INTERVAL)
+        self.flush_timer.timeout.connect(self.flushChanges)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        if index.column() == 0:
+            return self.store.status(index.row())
+        return self.store.addresses[index.row()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def setStore(self, store):
+        """
+        Replaces the recipients shown by the model.
+
+        Args:
+            store (RecipientStore): The new recipients.
+        """
+        self.beginResetModel()
+        self.store = store
+        self.dirty_top = self.dirty_bottom = None
+        self.endResetModel()
+
+    def appendRecipients(self, addresses, fields=(), suppressed=()):
+        """
+        Appends recipients with the Pending status, or Suppressed for the given ones.
+
+        Args:
+            addresses (list[str]): The email addresses to append.
+            fields (list[list[str]], optional): The values of the extra columns of every recipient.
+            suppressed (list[int], optional): The positions within addresses of the suppressed recipients.
+        """
+        if not addresses:
+            return
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + len(addresses) - 1)
+        self.store.extend(addresses, fields)
+        for position in suppressed:
+            self.store.set_status(first + position, "Suppressed")
+        self.endInsertRows()
+
+    def resetStatuses(self, suppressed=()):
+        """
+        Sets every recipient back to Pending, or to Suppressed for the given ones.
+
+        Args:
+            suppressed (list[int], optional): The rows of the suppressed recipients.
+        """
+        self.store.statuses[:] = bytes(len(self.store))
+        for row in suppressed:
+            self.store.set_status(row, "Suppressed")
+        if len(self.store):
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.store) - 1, 0), [Qt.DisplayRole])
+
+    def setStatus(self, row, status):
+        """
+        Changes the status of a recipient and schedules the change to be reported to the view.
+
+        Args:
+            row (int): The position of the recipient.
+            status (str): The new status.
+        """
+        self.store.set_status(row, status)
+        self.dirty_top = row if self.dirty_top is None else min(self.dirty_top, row)
+        self.dirty_bottom = row if self.dirty_bottom is None else max(self.dirty_bottom, row)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flushChanges(self):
+        """
+        Reports every status change since the last flush as one dataChanged range.
+        """
+        if self.dirty_top is None:
+            return
+        top, bottom = self.dirty_top, self.dirty_bottom
+        self.dirty_top = self.dirty_bottom = None
+        self.dataChanged.emit(self.index(top, 0), self.index(bottom, 0), [Qt.DisplayRole])
@@ -0,0 +1,245 @@
+import datetime
+import re
+import threading
+from dataclasses import dataclass
+
+from ..utilities.config import config
+from ..utilities.oauth import GmailService
+from ..utilities.pacing import Pacer
+from ..utilities.state import StateManager, state_manager
+
+
+
+ACCOUNT_NAME = re.compile(r"[A-Za-z0-9_-]+")
+MAIN_ACCOUNT = "main"
+
+
+@dataclass
+class SendingAccount:
+    """
+    A Gmail account campaigns can be sent from.
+
+    Attributes:
+        name (str): The name the account was added under, MAIN_ACCOUNT for the one signed in at startup.
+        gmail_service (GmailService): The authenticated service sending from the account.
+        state (StateManager): The account's own ledger of the sends in the rolling 24-hour window.
+    """
+    name: str
+    gmail_service: GmailService
+    state: StateManager
+
+
+def account_names() -> list:
+    """
+    Returns:
+        list[str]: The names of the additional sending accounts, in the order they were added.
+    """
+    names = config.get("ACCOUNTS", "names") or ""
+    return [name.strip() for name in names.split(",") if name.strip()]
+
+
+def check_account_name(name) -> None:
+    """
+    Checks that a name can be given to a new sending account.
+
+    Args:
+        name (str): The name of the account, made of letters, digits, dashes and underscores.
+
+    Raises:
+        ValueError: If the name is not valid or already taken.
+    """
+    if not ACCOUNT_NAME.fullmatch(name) or name == MAIN_ACCOUNT:
+        raise ValueError(f"'{name}' is not a valid account name. Use letters, digits, dashes and underscores.")
+    if name in account_names():
+        raise ValueError(f"There is already an account named '{name}'.")
+
+
+def add_account_name(name) -> None:
+    """
+    Records an additional sending account in the configuration.
+
+    Args:
+        name (str): The name of the account.
+
+    Raises:
+        ValueError: If the name is not valid or already taken.
+    """
+    check_account_name(name)
+    config.set("ACCOUNTS", "names", ",".join(account_names() + [name]))
+
+
+def load_accounts(gmail_service) -> list:
+    """
+    Signs in every additional sending account with its saved credentials. Accounts that need to sign in again are
+    left out.
+
+    Args:
+        gmail_service (GmailService): The service of the main account, already authenticated.
+
+    Returns:
+        list[SendingAccount]: The main account followed by every additional account that could be signed in.
+    """
+    accounts = [SendingAccount(MAIN_ACCOUNT, gmail_service, state_manager)]
+    client_id = config.get("TEMP_SECRET_STORAGE", "google_client_id")
+    for name in account_names():
+        service = GmailService(name)
+        if not service.restore_credentials(client_id):
+            print(f"Account {name} needs to sign in again, sending without it.")
+            continue
+        service.build_service()
+        accounts.append(SendingAccount(name, service, StateManager(name)))
+    return accounts
+
+
+class AccountPool:
+    """
+    Spreads the sends of a run across several accounts, each with its own quota ledger and its own Pacer.
+
+    Accounts are picked by smooth weighted round-robin, weighted by their remaining capacity in the rolling window:
+    every pick adds each account's weight to its credit, the account with the most credit is chosen and pays the
+    total back, so the credits always sum to zero. Recipients are thereby spread in proportion to what every account
+    has left, interleaved rather than in runs, and the chosen account's pacer is then waited on. Since every account
+    is paced at the same interval, the account with the most capacity sends at that interval and the others in the
+    gaps between its slots. An account its pacer has slowed down after rate-limit responses has its weight reduced
+    by the same factor, so it does not hold up the others.
+
+    An account that reaches its Gmail limit or whose login expires is retired for the rest of the run, and its
+    recipients fail over to the remaining accounts.
+
+    Attributes:
+        accounts (list[SendingAccount]): The accounts of the run.
+        pacers (dict): The Pacer of every account, by name.
+        credits (dict): The round-robin credit of every account, by name.
+        retired (dict): The reason every retired account was taken out of the run, by name.
+        cancelled (Event): Set once the run is stopped.
+
+    Args:
+        accounts (list[SendingAccount]): The accounts to send from.
+        interval (float): The configured number of seconds between two sends from the same account.
+    """
+    def __init__(self, accounts, interval) -> None:
+        self.accounts = list(accounts)
+        self.pacers = {account.name: Pacer(interval) for account in self.accounts}
+        self.credits = {account.name: 0 for account in self.accounts}
+        self.retired = {}
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+
+
+    def pacer(self, account) -> Pacer:
+        """
+        Returns:
+            Pacer: The pacer of an account.
+        """
+        return self.pacers[account.name]
+
+
+    def active(self) -> list:
+        """
+        Returns:
+            list[SendingAccount]: The accounts that have not been retired.
+        """
+        with self.lock:
+            return [account for account in self.accounts if account.name not in self.retired]
+
+
+    def pick(self):
+        """
+        Chooses the account the next send goes out from.
+
+        Returns:
+            SendingAccount: The chosen account, or None if no active account has capacity left.
+        """
+        weights = {}
+        for account in self.active():
+            capacity = account.state.available_now()
+            if capacity > 0:
+                pacer = self.pacer(account)
+                slowdown = pacer.interval / pacer.base_interval if pacer.base_interval else 1
+                weights[account.name] = (account, capacity / slowdown)
+        if not weights:
+            return None
+        with self.lock:
+            for name, (_, weight) in weights.items():
+                self.credits[name] += weight
+            name = max(weights, key=lambda name: self.credits[name])
+            self.credits[name] -= sum(weight for _, weight in weights.values())
+        return weights[name][0]
+
+
+    def acquire(self, count=1):
+        """
+        Picks an account, waits for its pacer to grant a slot to each of up to count sends and charges them to its
+        ledger. The sends go out together, and the account's next sends wait until every one of them has been paced.
+
+        Args:
+            count (int, optional): The number of sends wanted. Defaults to 1.
+
+        Returns:
+            tuple: The account and the minute every send was charged to, at least one and fewer than count if the
+                account has less capacity left, or None if no active account has capacity left or the run was stopped.
+        """
+        while not self.cancelled.is_set():
+            account = self.pick()
+            if account is None:
+                return None
+            wanted = min(count, account.state.available_now())
+            if wanted <= 0:
+                continue
+            if not self.pacer(account).acquire(wanted):
+                return None
+            minutes = []
+            while len(minutes) < wanted:
+                minute = account.state.charge()
+                if minute is None:
+                    break
+                minutes.append(minute)
+            if minutes:
+                return account, minutes
+        return None
+
+
+    def wait_for_quota(self) -> bool:
+        """
+        Blocks until a slot frees up in the rolling window of an active account.
+
+        Returns:
+            bool: True once an account has capacity, False if the run was stopped or every account was retired.
+        """
+        while not self.cancelled.is_set():
+            accounts = self.active()
+            if not accounts:
+                return False
+            if any(account.state.available_now() for account in accounts):
+                return True
+            frees_at = min(account.state.next_slot_frees_at() for account in accounts)
+            print(f"Sending limit reached on every account, waiting until {frees_at:%H:%M} for the next slot.")
+            self.cancelled.wait(max(1.0, (frees_at - datetime.datetime.now()).total_seconds()))
+        return False
+
+
+    def retire(self, account, reason) -> bool:
+        """
+        Takes an account out of the run.
+
+        Args:
+            account (SendingAccount): The account that can no longer send.
+            reason (str): Why it can no longer send.
+
+        Returns:
+            bool: True if other accounts are left to fail over to.
+        """
+        with self.lock:
+            if account.name not in self.retired:
+                self.retired[account.name] = reason
+                print(f"Account {account.name} stopped sending: {reason}")
+            return len(self.retired) < len(self.accounts)
+
+
+    def cancel(self) -> None:
+        """
+        Stops the run, waking every caller waiting for a slot.
+        """
+        self.cancelled.set()
+        for pacer in self.pacers.values():
+            pacer.cancel()
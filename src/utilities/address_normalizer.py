@@ -0,0 +1,110 @@
+from dataclasses import dataclass
+
+from ..utilities.config import config
+
+
+
+@dataclass(frozen=True)
+class DomainRule:
+    """
+    How the addresses of one mail domain are reduced to their canonical form.
+
+    Attributes:
+        domain (str): The canonical domain, for providers that answer under several domains.
+        fold_case (bool): Whether the local part is case-insensitive.
+        strip_dots (bool): Whether dots in the local part are ignored by the provider.
+        tag_separator (str): The character after which the provider ignores the rest of the local part, if any.
+    """
+    domain: str
+    fold_case: bool = False
+    strip_dots: bool = False
+    tag_separator: str = None
+
+
+class AddressNormalizer:
+    """
+    Reduces email addresses to a canonical form, so that addresses delivering to the same mailbox are recognized
+    as duplicates.
+
+    Domains are always lowercased. Well-known providers get their own rules: Gmail ignores dots and everything after
+    a plus sign, and answers under googlemail.com as well. Other domains keep their local part as it is, except that
+    it is lowercased when fold_local_part is set. Most providers do treat it as case-insensitive, but the standard
+    does not, so folding is left off unless it is turned on in the preferences.
+    The rule of every domain seen is compiled once and cached.
+
+    Attributes:
+        fold_local_part (bool): Whether local parts of unknown domains are treated as case-insensitive.
+        PROVIDER_RULES (dict): The rules of the well-known providers, by domain.
+    """
+    PROVIDER_RULES = {
+        "gmail.com": DomainRule("gmail.com", fold_case=True, strip_dots=True, tag_separator="+"),
+        "googlemail.com": DomainRule("gmail.com", fold_case=True, strip_dots=True, tag_separator="+"),
+        "outlook.com": DomainRule("outlook.com", fold_case=True, tag_separator="+"),
+        "hotmail.com": DomainRule("hotmail.com", fold_case=True, tag_separator="+"),
+        "live.com": DomainRule("live.com", fold_case=True, tag_separator="+"),
+        "fastmail.com": DomainRule("fastmail.com", fold_case=True, tag_separator="+"),
+        "protonmail.com": DomainRule("protonmail.com", fold_case=True, tag_separator="+"),
+        "proton.me": DomainRule("proton.me", fold_case=True, tag_separator="+"),
+    }
+
+    def __init__(self, fold_local_part=False) -> None:
+        self.fold_local_part = fold_local_part
+        self.rules = {}
+
+
+    @classmethod
+    def from_config(cls):
+        """
+        Returns:
+            AddressNormalizer: A normalizer set up from the preferences.
+        """
+        return cls(config.get_bool("PREFERENCES", "fold_local_part"))
+
+
+    @property
+    def signature(self) -> str:
+        """
+        Returns:
+            str: A short description of the settings, which changes whenever they would produce different canonical forms.
+        """
+        return f"v1:fold={int(self.fold_local_part)}"
+
+
+    def rule_for(self, domain) -> DomainRule:
+        """
+        Returns the rule of a domain, compiling it on first use.
+
+        Args:
+            domain (str): The lowercased domain.
+
+        Returns:
+            DomainRule: The rule of the domain.
+        """
+        rule = self.rules.get(domain)
+        if rule is None:
+            rule = self.PROVIDER_RULES.get(domain) or DomainRule(domain, fold_case=self.fold_local_part)
+            self.rules[domain] = rule
+        return rule
+
+
+    def canonical(self, address) -> str:
+        """
+        Returns the canonical form of an address, to be used as its deduplication key. The address itself is what
+        should still be sent to.
+
+        Args:
+            address (str): A valid email address.
+
+        Returns:
+            str: The canonical form of the address.
+        """
+        local, _, domain = address.rpartition("@")
+        rule = self.rule_for(domain.lower())
+        if rule.tag_separator:
+            local = local.split(rule.tag_separator, 1)[0]
+        if rule.strip_dots:
+            local = local.replace(".", "")
+        if rule.fold_case:
+            local = local.lower()
+        return f"{local}@{rule.domain}"
+
@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import mimetypes
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from email.mime.base import MIMEBase
+
+
+
+class AttachmentCache:
+    """
+    A content-addressed cache of base64 encoded attachment bodies, shared by every campaign of the session.
+
+    Each file is read once, memory-mapped when it is larger than MMAP_THRESHOLD so it is never copied into a Python
+    buffer, hashed and encoded once. The encoding is stored under the SHA-256 of the content, so the same content
+    attached under several names or paths is encoded once too. A file is only read again when its size or
+    modification time change. Encoded bodies are evicted least recently used first once they take up more than
+    max_bytes.
+
+    Attributes:
+        max_bytes (int): The maximum total size of the cached encodings.
+        entries (OrderedDict): The encoded body of every cached content, by digest, least recently used first.
+        digests (dict): The (size, modification time, digest) last seen for every path.
+    """
+    MMAP_THRESHOLD = 1024 * 1024
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.digests = {}
+        self.lock = threading.Lock()
+
+
+    def digest(self, path) -> str:
+        """
+        Returns the content digest of a file, hashing it only if it changed since it was last seen.
+
+        Args:
+            path (str): The path to the file.
+
+        Returns:
+            str: The hex SHA-256 of the file's content.
+        """
+        stat = os.stat(path)
+        with self.lock:
+            known = self.digests.get(path)
+        if known and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2]
+        return self.load(path, stat)[0]
+
+
+    def load(self, path, stat) -> tuple:
+        """
+        Reads, hashes and encodes a file, and caches its encoding.
+
+        Args:
+            path (str): The path to the file.
+            stat (os.stat_result): The current status of the file.
+
+        Returns:
+            tuple: The hex digest of the file's content and its base64 encoding.
+        """
+        with open(path, 'rb') as file:
+            if stat.st_size > self.MMAP_THRESHOLD:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                    digest = hashlib.sha256(content).hexdigest()
+                    encoded = self.entries.get(digest) or base64.encodebytes(content)
+            else:
+                content = file.read()
+                digest = hashlib.sha256(content).hexdigest()
+                encoded = self.entries.get(digest) or base64.encodebytes(content)
+
+        with self.lock:
+            self.digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+            self.store(digest, encoded)
+        return digest, encoded
+
+
+    def store(self, digest, encoded) -> None:
+        """
+        Caches an encoding as the most recently used one and evicts the least recently used ones beyond max_bytes.
+        Must be called with the lock held.
+
+        Args:
+            digest (str): The digest of the content.
+            encoded (bytes): The base64 encoding of the content.
+        """
+        if digest in self.entries:
+            self.entries.move_to_end(digest)
+            return
+        self.entries[digest] = encoded
+        self.size += len(encoded)
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+    def encoded(self, path) -> bytes:
+        """
+        Returns the base64 encoding of a file, from the cache when its content was encoded before.
+
+        Args:
+            path (str): The path to the file.
+
+        Returns:
+            bytes: The content encoded as MIME base64, in lines of 76 characters.
+        """
+        digest = self.digest(path)
+        with self.lock:
+            encoded = self.entries.get(digest)
+            if encoded is not None:
+                self.entries.move_to_end(digest)
+                return encoded
+        return self.load(path, os.stat(path))[1]
+
+
+    def part(self, path) -> MIMEBase:
+        """
+        Builds the MIME attachment part of a file around its cached encoding.
+
+        Args:
+            path (str): The path to the file.
+
+        Returns:
+            MIMEBase: The attachment part, already base64 encoded.
+        """
+        content_type, _ = mimetypes.guess_type(path)
+        maintype, _, subtype = (content_type or 'application/octet-stream').partition('/')
+        part = MIMEBase(maintype, subtype)
+        part.set_payload(self.encoded(path).decode('ascii'))
+        part['Content-Transfer-Encoding'] = 'base64'
+        part.add_header('Content-Disposition', 'attachment', filename=os.path.basename(path))
+        return part
+
+
+attachment_cache = AttachmentCache()
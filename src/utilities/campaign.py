@@ -0,0 +1,346 @@
+import base64
+import functools
+import hashlib
+import io
+import os
+from dataclasses import dataclass, field
+from email.header import Header
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from ..utilities.attachment_cache import attachment_cache
+from ..utilities.html_compactor import compact_html
+from ..utilities.template import MergeTemplate
+
+
+
+@dataclass(frozen=True)
+class Campaign:
+    """
+    An immutable snapshot of everything that is identical across the messages of a sending run.
+
+    The snapshot is taken once, on the GUI thread, when sending starts. Every MIME part that does not depend on the
+    recipient, together with the subject and MIME headers, is serialized and base64 encoded a single time. Rendering
+    a message for a recipient then only encodes the recipient's own header line and joins it to the shared encoding.
+
+    The subject and both bodies are MergeTemplates, compiled once. When any of them has placeholders, the skeleton is
+    serialized with a marker in place of each personalized value and split into byte segments around the markers.
+    Rendering then fills in and encodes only the personalized subject and body parts; the attachments and closing
+    boundary stay pre-encoded. The HTML is compacted with compact_html before anything is compiled. Attachment parts
+    come from the shared attachment_cache, so a file is only read and encoded again when its content changes.
+
+    Large messages are not sent as base64 at all: open_message streams the raw bytes of a recipient's message for a
+    media upload, and the base64 encoding of the shared part is only made the first time render_raw needs it.
+
+    Attributes:
+        subject (str): The subject of the email.
+        html (str): The HTML version of the email content.
+        plain_text (str): The plain text version of the email content.
+        attachments (tuple[str]): Paths of the files attached to every message.
+        campaign_id (str): A fingerprint of the content, used to key the send journal.
+        templates (dict): The compiled MergeTemplate of the subject, the plain text and the HTML.
+    """
+    subject: str
+    html: str
+    plain_text: str
+    attachments: tuple = ()
+    templates: dict = field(init=False, repr=False)
+    segments: tuple = field(init=False, repr=False)
+    tail: bytes = field(init=False, repr=False)
+    campaign_id: str = field(init=False)
+
+    MARKER = "LMSMERGE{}MARKER"
+
+
+    def __post_init__(self):
+        object.__setattr__(self, "attachments", tuple(self.attachments))
+        object.__setattr__(self, "templates", {
+            "subject": MergeTemplate(self.subject),
+            "plain": MergeTemplate(self.plain_text),
+            "html": MergeTemplate.for_html(compact_html(self.html)),
+        })
+        defaults = self.merge_defaults
+        for template in self.templates.values():
+            template.defaults = defaults
+
+        if self.personalized:
+            segments, tail = self.split_skeleton()
+            object.__setattr__(self, "segments", segments)
+            object.__setattr__(self, "tail", tail)
+        else:
+            object.__setattr__(self, "segments", ())
+            object.__setattr__(self, "tail", self.build_skeleton())
+
+        fingerprint = hashlib.sha256()
+        for value in (self.subject, self.html, self.plain_text, *self.attachments):
+            fingerprint.update(value.encode('utf-8') + b"\0")
+        for path in self.attachments:
+            fingerprint.update(attachment_cache.digest(path).encode('ascii'))
+        object.__setattr__(self, "campaign_id", fingerprint.hexdigest()[:32])
+
+
+    @functools.cached_property
+    def encoded_tail(self) -> bytes:
+        """
+        Returns:
+            bytes: The urlsafe base64 encoding of the part of the message after the last personalized value.
+        """
+        return base64.urlsafe_b64encode(self.tail)
+
+
+    @property
+    def size(self) -> int:
+        """
+        Returns:
+            int: The approximate size in bytes of one message of the campaign, before any transfer encoding.
+        """
+        return len(self.tail) + sum(len(segment) for segment in self.segments if isinstance(segment, bytes))
+
+
+    @property
+    def personalized(self) -> bool:
+        """
+        Returns:
+            bool: True if the subject or content has merge placeholders.
+        """
+        return any(not template.is_static for template in self.templates.values())
+
+
+    @property
+    def merge_fields(self) -> set:
+        """
+        Returns:
+            set: The keys of every merge field used by the campaign.
+        """
+        return {key for template in self.templates.values() for key in template.fields}
+
+
+    @property
+    def merge_defaults(self) -> dict:
+        """
+        Returns:
+            dict: The default value of every merge field that has one.
+        """
+        defaults = {}
+        for template in self.templates.values():
+            defaults.update(template.defaults)
+        return defaults
+
+
+    def build_skeleton(self, subject=None, plain_text=None, html=None) -> bytes:
+        """
+        Serializes the recipient independent part of the message: the subject, the MIME headers and all body parts.
+
+        Args:
+            subject (str, optional): Replaces the subject. Defaults to the campaign's subject.
+            plain_text (str, optional): Replaces the plain text body, which is then always base64 encoded as utf-8.
+                Defaults to the campaign's.
+            html (str, optional): Replaces the HTML body, which is then always base64 encoded as utf-8.
+                Defaults to the campaign's, compacted.
+
+        Returns:
+            bytes: The message without its To header.
+        """
+        message = MIMEMultipart('alternative')
+        if plain_text is None:
+            message.attach(MIMEText(self.plain_text, 'plain'))
+        else:
+            message.attach(MIMEText(plain_text, 'plain', 'utf-8'))
+        if html is None:
+            message.attach(MIMEText(self.templates["html"].text, 'html'))
+        else:
+            message.attach(MIMEText(html, 'html', 'utf-8'))
+
+        if self.attachments:
+            alternative = message
+            message = MIMEMultipart('mixed')
+            message.attach(alternative)
+            for path in self.attachments:
+                message.attach(attachment_cache.part(path))
+
+        message['subject'] = self.subject if subject is None else subject
+        return message.as_bytes()
+
+
+    @staticmethod
+    def encode_body(text) -> bytes:
+        """
+        Returns:
+            bytes: A body part's text encoded the way MIMEText encodes a utf-8 body, without the final line break.
+        """
+        return base64.encodebytes(text.encode('utf-8')).rstrip(b"\n")
+
+
+    @staticmethod
+    def encode_subject(subject) -> bytes:
+        """
+        Returns:
+            bytes: The subject encoded as a header value.
+        """
+        try:
+            subject.encode('ascii')
+            return Header(subject, header_name='Subject').encode().encode('ascii')
+        except UnicodeEncodeError:
+            return Header(subject, 'utf-8', header_name='Subject').encode().encode('ascii')
+
+
+    def split_skeleton(self) -> tuple:
+        """
+        Serializes the skeleton of a personalized campaign with a marker in place of each personalized value, and
+        splits it around the markers.
+
+        Returns:
+            tuple: The segments, alternating static bytes and the name of the personalized value that follows,
+                and the static remainder of the message after the last personalized value.
+        """
+        markers = {name: self.MARKER.format(name.upper()) for name, template in self.templates.items() if not template.is_static}
+        skeleton = self.build_skeleton(markers.get("subject"), markers.get("plain"), markers.get("html"))
+
+        found = []
+        for name, marker in markers.items():
+            encoded = marker.encode('ascii') if name == "subject" else self.encode_body(marker)
+            found.append((skeleton.index(encoded), len(encoded), name))
+
+        segments = []
+        position = 0
+        for start, length, name in sorted(found):
+            segments.append(skeleton[position:start])
+            segments.append(name)
+            position = start + length
+        return tuple(segments), skeleton[position:]
+
+
+    def message_id(self, to) -> str:
+        """
+        Returns the Message-ID of this campaign's message to a recipient. It is derived from the campaign and the
+        address, so every retry of the same send carries the same id. Gmail does not deduplicate sends on it, so it
+        is no protection against sending twice; it only lets a second copy be recognized as one.
+
+        Args:
+            to (str): The email address of the recipient.
+
+        Returns:
+            str: The Message-ID header value.
+        """
+        digest = hashlib.sha256(f"{self.campaign_id}\0{to}".encode('utf-8')).hexdigest()[:32]
+        return f"<{digest}@liberty-mail-stream>"
+
+
+    def render_head(self, to, fields=None) -> tuple:
+        """
+        Renders the recipient's own part of the message: the header lines and, for personalized campaigns, every
+        segment up to the tail.
+
+        Args:
+            to (str): The email address of the recipient.
+            fields (dict, optional): The recipient's merge field values, keyed by field key.
+
+        Returns:
+            tuple: The header lines, without their final line break, and the rendered segments.
+        """
+        header = f"Message-ID: {self.message_id(to)}\nTo: {to}".encode('utf-8')
+        body = b""
+        if self.segments:
+            fields = fields or {}
+            values = {
+                "subject": lambda: self.encode_subject(self.templates["subject"].render(fields)),
+                "plain": lambda: self.encode_body(self.templates["plain"].render(fields)),
+                "html": lambda: self.encode_body(self.templates["html"].render(fields)),
+            }
+            body = b"".join(segment if isinstance(segment, bytes) else values[segment]() for segment in self.segments)
+        return header, body
+
+
+    def open_message(self, to, fields=None):
+        """
+        Opens the raw RFC 822 bytes of the message for one recipient as a seekable stream, without copying the
+        shared tail of the message.
+
+        Args:
+            to (str): The email address of the recipient.
+            fields (dict, optional): The recipient's merge field values, keyed by field key.
+
+        Returns:
+            MessageStream: The message, ready to be uploaded.
+        """
+        header, body = self.render_head(to, fields)
+        return MessageStream([header + b"\n" + body, self.tail])
+
+
+    def render_raw(self, to, fields=None) -> str:
+        """
+        Renders the message for one recipient, encoded the way the Gmail API expects.
+
+        The recipient's header lines are padded with trailing whitespace so that everything rendered for the recipient
+        is a multiple of three bytes long. Its base64 encoding then ends on a group boundary and can be joined directly
+        to the pre-encoded remainder of the message.
+
+        Args:
+            to (str): The email address of the recipient.
+            fields (dict, optional): The recipient's merge field values, keyed by field key.
+
+        Returns:
+            str: The message as a urlsafe base64 string, ready to be used as the 'raw' field of a send request.
+        """
+        header, body = self.render_head(to, fields)
+        header += b" " * (-(len(header) + 1 + len(body)) % 3) + b"\n"
+        return (base64.urlsafe_b64encode(header + body) + self.encoded_tail).decode()
+
+
+class MessageStream(io.RawIOBase):
+    """
+    A read-only, seekable file over a sequence of byte strings, presenting them as one without joining them.
+
+    Args:
+        parts (list[bytes]): The byte strings, in order.
+    """
+    def __init__(self, parts) -> None:
+        super().__init__()
+        self.parts = [memoryview(part) for part in parts if part]
+        self.length = sum(len(part) for part in self.parts)
+        self.position = 0
+
+
+    def readable(self) -> bool:
+        return True
+
+
+    def seekable(self) -> bool:
+        return True
+
+
+    def tell(self) -> int:
+        return self.position
+
+
+    def seek(self, offset, whence=os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.length
+        self.position = max(0, offset)
+        return self.position
+
+
+    def readinto(self, buffer) -> int:
+        """
+        Copies the bytes at the current position into a buffer.
+
+        Args:
+            buffer (memoryview): The buffer to fill.
+
+        Returns:
+            int: The number of bytes copied, 0 at the end of the stream.
+        """
+        target = memoryview(buffer).cast('B')
+        copied = 0
+        start = 0
+        for part in self.parts:
+            end = start + len(part)
+            if self.position < end and copied < len(target):
+                chunk = part[self.position - start:][:len(target) - copied]
+                target[copied:copied + len(chunk)] = chunk
+                copied += len(chunk)
+                self.position += len(chunk)
+            start = end
+        return copied
@@ -1,6 +1,6 @@
 import configparser
 
-from .resource_path import resource_path
+from .resource_path import resource_path, user_data_path
 
 
 
@@ -11,13 +11,19 @@ class Config:
     This class utilizes Python's configparser to handle application settings such as UI preferences, paths, 
     and other options that need to be persisted across sessions.
 
+    The configuration shipped with the application holds the defaults. Changes are saved to the copy in the user data
+    directory, which is read over the defaults, so a frozen build keeps its preferences and sending accounts between
+    launches. Running from source, both are the same file.
+
     Attributes:
-        path (str): The path to the configuration file, derived from a helper function to handle resource paths.
+        path (str): The path to the configuration file changes are saved to.
+        defaults_path (str): The path to the configuration file shipped with the application.
     """
-    path = resource_path("settings/config.cfg")
+    path = user_data_path("settings/config.cfg")
+    defaults_path = resource_path("settings/config.cfg")
     def __init__(self) -> None:
         self.config = configparser.ConfigParser()
-        self.config.read(self.path)
+        self.config.read([self.defaults_path, self.path])
 
 
     def get(self, section, option):
@@ -86,4 +92,3 @@ class Config:
 
 
 config = Config()
-print("Config loaded")
\ No newline at end of file
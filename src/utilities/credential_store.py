@@ -0,0 +1,233 @@
+import datetime
+import json
+import os
+import sys
+import tempfile
+import threading
+
+from ..utilities.resource_path import user_data_path
+
+
+
+class CredentialStore:
+    """
+    Keeps the OAuth2 credentials of the signed in account between launches, so that a restart can reuse the refresh
+    token instead of going through the browser consent flow again.
+
+    On Windows the credentials are encrypted with DPAPI for the current user, through pywin32-ctypes, and written to
+    the credentials file. Elsewhere, or when DPAPI cannot be loaded, they are kept in the system keychain through
+    keyring and the file only records that. Only when neither is available are they written in plain text to a file
+    only the current user can read, with a warning every time. The first bytes of the file record which of the three
+    was used. Every sending account has its own file and keychain entry; the files live in the user data directory so
+    that a frozen build finds them again.
+
+    Attributes:
+        path (str): The relative path to the credentials file.
+        name (str): The user name of the keychain entry, the file name without its extension.
+
+    Args:
+        account (str, optional): The name of an additional sending account. Defaults to the main account, whose
+            credentials are kept in path.
+    """
+    path = 'settings/credentials.dat'
+    KEYRING_SERVICE = "Liberty Mail Stream"
+    DPAPI = b"LMSCRED-DPAPI\n"
+    KEYRING = b"LMSCRED-KEYRING\n"
+    PLAIN = b"LMSCRED-PLAIN\n"
+
+    def __init__(self, account=None) -> None:
+        self.path = CredentialStore.path if account is None else f'settings/credentials_{account}.dat'
+        self.name = os.path.splitext(os.path.basename(self.path))[0]
+
+
+    def protect(self, data) -> bytes:
+        """
+        Encrypts the credentials with DPAPI, or stores them in the system keychain, whichever is available first.
+
+        Args:
+            data (bytes): The serialized credentials.
+
+        Returns:
+            bytes: The contents of the credentials file.
+        """
+        if sys.platform == "win32":
+            try:
+                from win32ctypes.pywin32 import win32crypt
+            except ImportError as e:
+                print(f"DPAPI is unavailable ({e}), saving the credentials to the system keychain instead.")
+            else:
+                return self.DPAPI + win32crypt.CryptProtectData(data, "Liberty Mail Stream credentials")
+
+        try:
+            import keyring
+            keyring.set_password(self.KEYRING_SERVICE, self.name, data.decode('utf-8'))
+            return self.KEYRING
+        except Exception as e:
+            print(f"No system keychain is available ({e}), saving the credentials UNENCRYPTED, readable by this user only.")
+        return self.PLAIN + data
+
+
+    def unprotect(self, content) -> bytes:
+        """
+        Args:
+            content (bytes): The contents of the credentials file.
+
+        Returns:
+            bytes: The serialized credentials.
+
+        Raises:
+            ValueError: If the file is not a credentials file or the credentials cannot be read back by this user.
+        """
+        if content.startswith(self.PLAIN):
+            return content[len(self.PLAIN):]
+        if content.startswith(self.KEYRING):
+            try:
+                import keyring
+                data = keyring.get_password(self.KEYRING_SERVICE, self.name)
+            except Exception as e:
+                raise ValueError(f"Could not read the credentials from the system keychain: {e}")
+            if data is None:
+                raise ValueError("The credentials are missing from the system keychain.")
+            return data.encode('utf-8')
+        if content.startswith(self.DPAPI) and sys.platform == "win32":
+            from win32ctypes.pywin32 import win32crypt
+            try:
+                return win32crypt.CryptUnprotectData(content[len(self.DPAPI):])[1]
+            except Exception as e:
+                raise ValueError(f"Could not decrypt the credentials: {e}")
+        raise ValueError("Not a credentials file.")
+
+
+    def save(self, credentials) -> None:
+        """
+        Atomically writes the credentials file, readable by the current user only.
+
+        Args:
+            credentials (Credentials): The credentials to keep.
+        """
+        credentials_path = user_data_path(self.path)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(credentials_path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.protect(credentials.to_json().encode('utf-8')))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, credentials_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+    def load(self, client_id, scopes):
+        """
+        Reads the saved credentials if they were issued to the given client for all the given scopes.
+
+        Args:
+            client_id (str): The client ID of the OAuth application.
+            scopes (list[str]): The scopes the credentials must grant.
+
+        Returns:
+            Credentials: The saved credentials, or None if there are none that can be used.
+        """
+        from google.oauth2.credentials import Credentials
+
+        try:
+            with open(user_data_path(self.path), "rb") as f:
+                info = json.loads(self.unprotect(f.read()))
+            if info.get("client_id") != client_id or not set(scopes) <= set(info.get("scopes") or []):
+                return None
+            return Credentials.from_authorized_user_info(info, scopes)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            print(f"Saved credentials are unusable ({e}), signing in again.")
+            return None
+
+
+    def clear(self) -> None:
+        """
+        Deletes the saved credentials, for example once their refresh token has been revoked, together with their
+        keychain entry if they were kept in one.
+        """
+        credentials_path = user_data_path(self.path)
+        try:
+            with open(credentials_path, "rb") as f:
+                in_keyring = f.read(len(self.KEYRING)) == self.KEYRING
+            os.remove(credentials_path)
+        except FileNotFoundError:
+            return
+        if in_keyring:
+            try:
+                import keyring
+                keyring.delete_password(self.KEYRING_SERVICE, self.name)
+            except Exception as e:
+                print(f"Could not remove the credentials from the system keychain: {e}")
+
+
+class TokenRefresher:
+    """
+    Renews an access token in the background shortly before it expires, so the requests made with the credentials
+    always find a valid token and never stop to refresh it themselves. Every new token is saved to the store.
+
+    Failed renewals are retried every RETRY_DELAY seconds. When the refresh token has been revoked the refresher
+    stops, and sends fail with an authentication error as they would without it.
+
+    Args:
+        credentials (Credentials): The credentials to keep fresh, shared with the service that uses them.
+        store (CredentialStore): Where renewed credentials are saved.
+    """
+    REFRESH_MARGIN = 300
+    RETRY_DELAY = 30
+
+    def __init__(self, credentials, store) -> None:
+        self.credentials = credentials
+        self.store = store
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+
+    def start(self) -> None:
+        """
+        Starts the background renewals.
+        """
+        self.thread.start()
+
+
+    def seconds_until_refresh(self) -> float:
+        """
+        Returns:
+            float: How long to wait before renewing the token, 0 if it should be renewed now.
+        """
+        if not self.credentials.token:
+            return 0
+        if not self.credentials.expiry:
+            return self.REFRESH_MARGIN
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return max(0, (self.credentials.expiry - now).total_seconds() - self.REFRESH_MARGIN)
+
+
+    def run(self) -> None:
+        """
+        Renews the token whenever it comes within REFRESH_MARGIN seconds of expiring, until stopped.
+        """
+        from google.auth.exceptions import RefreshError
+        from google.auth.transport.requests import Request
+
+        while not self.stopped.wait(self.seconds_until_refresh()):
+            try:
+                self.credentials.refresh(Request())
+                self.store.save(self.credentials)
+            except RefreshError as e:
+                print(f"Access token could not be renewed, sign in again: {e}")
+                return
+            except Exception as e:
+                print(f"Access token renewal failed, retrying in {self.RETRY_DELAY} seconds: {e}")
+                if self.stopped.wait(self.RETRY_DELAY):
+                    return
+
+
+    def stop(self) -> None:
+        """
+        Stops the background renewals.
+        """
+        self.stopped.set()
@@ -0,0 +1,136 @@
+import functools
+import re
+from html.parser import HTMLParser
+
+
+
+DOCTYPE = re.compile(r"<!DOCTYPE[^>]*>\s*", re.IGNORECASE)
+QRICHTEXT_META = re.compile(r'<meta name="qrichtext"[^>]*>', re.IGNORECASE)
+QT_STYLE_BLOCK = re.compile(r'<style type="text/css">\s*p, li \{ white-space: pre-wrap; \}\s*</style>', re.IGNORECASE)
+STYLE_ATTRIBUTE = re.compile(r'<(\w+)([^>]*?)\sstyle="([^"]*)"')
+BETWEEN_TAGS = re.compile(r">\s*\n\s*<")
+SELF_CLOSING = re.compile(r"\s*/>")
+
+BODY_DEFAULTS = {
+    "font-weight": "400",
+    "font-style": "normal",
+}
+MARGINS = ("margin-top", "margin-right", "margin-bottom", "margin-left")
+
+
+def compact_style(style, defaults=None):
+    """
+    Rewrites an inline style without the declarations that have no effect outside Qt.
+
+    Qt's own -qt-* properties, zero text indents and the given defaults are dropped, and the four margins are merged
+    into a single margin shorthand.
+
+    Args:
+        style (str): The value of a style attribute.
+        defaults (dict, optional): Declarations that restate what the element would inherit anyway.
+
+    Returns:
+        str: The equivalent, shorter style.
+    """
+    defaults = defaults or {}
+    declarations = {}
+    for declaration in style.split(";"):
+        name, _, value = declaration.partition(":")
+        name, value = name.strip().lower(), value.strip()
+        if not name or not value or name.startswith("-qt-") or defaults.get(name) == value \
+                or (name, value) == ("text-indent", "0px"):
+            continue
+        declarations[name] = value
+
+    if all(margin in declarations for margin in MARGINS):
+        top, right, bottom, left = (declarations.pop(margin) for margin in MARGINS)
+        if top == right == bottom == left:
+            declarations["margin"] = "0" if top == "0px" else top
+        else:
+            declarations["margin"] = f"{top} {right} {bottom} {left}"
+
+    return ";".join(f"{name}:{value}" for name, value in declarations.items())
+
+
+def replace_style(match):
+    """
+    Returns:
+        str: The tag of a STYLE_ATTRIBUTE match with its style compacted, or without it if no declaration is left.
+            Browser defaults are only dropped from the body, where nothing is inherited that they could override.
+    """
+    tag, attributes, style = match.groups()
+    style = compact_style(style, BODY_DEFAULTS if tag.lower() == "body" else None)
+    return f'<{tag}{attributes} style="{style}"' if style else f"<{tag}{attributes}"
+
+
+@functools.lru_cache(maxsize=32)
+def compact_html(html):
+    """
+    Shrinks the rich text markup produced by QTextEdit.toHtml before it is sent.
+
+    The DOCTYPE and qrichtext meta tag are removed, Qt's pre-wrap style sheet is shortened, every inline style is
+    compacted with compact_style, and the line breaks Qt puts between tags are dropped. Whitespace inside paragraphs
+    is left alone, since the pre-wrap rule makes it significant. Results are cached, so compacting the same template
+    version again is free.
+
+    Args:
+        html (str): The HTML produced by the editor.
+
+    Returns:
+        str: The compacted HTML.
+    """
+    html = DOCTYPE.sub("", html)
+    html = QRICHTEXT_META.sub("", html)
+    html = QT_STYLE_BLOCK.sub("<style>p,li{white-space:pre-wrap}</style>", html)
+    html = STYLE_ATTRIBUTE.sub(replace_style, html)
+    html = BETWEEN_TAGS.sub("><", html)
+    html = SELF_CLOSING.sub(">", html)
+    return html.replace("<head></head>", "").strip()
+
+
+class TextExtractor(HTMLParser):
+    """
+    Collects the text of an HTML document, with a line break after every block element.
+    """
+    BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6"}
+    SKIPPED_TAGS = {"head", "style", "script", "title"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag == "br":
+            self.parts.append("\n")
+
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """
+    Derives the plain text version of an email from its HTML, for templates saved without one.
+
+    Args:
+        html (str): The HTML content.
+
+    Returns:
+        str: The text of the document, one line per paragraph.
+    """
+    extractor = TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return "".join(extractor.parts).strip()
@@ -1,5 +1,21 @@
+import bisect
+import contextlib
 import csv
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import os
 import re
+import tempfile
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ..utilities.address_normalizer import AddressNormalizer
+from ..utilities.template import field_key
 
 
 
@@ -17,33 +33,642 @@ def is_valid_email(email):
     return re.match(pattern, email) is not None
 
 
-def clean_email_list(input_file_path, output_file_path):
+VALID = 0
+EMPTY = 1
+MISSING_AT = 2
+MULTIPLE_AT = 3
+INVALID_LOCAL_PART = 4
+INVALID_DOMAIN = 5
+
+REJECTION_REASONS = {
+    EMPTY: "empty",
+    MISSING_AT: "missing @",
+    MULTIPLE_AT: "more than one @",
+    INVALID_LOCAL_PART: "invalid local part",
+    INVALID_DOMAIN: "invalid domain",
+}
+
+VALIDATION_CHUNK_SIZE = 250_000
+PARALLEL_THRESHOLD = 500_000
+
+EXTERNAL_SORT_THRESHOLD = 256 * 1024 * 1024
+EXTERNAL_RUN_SIZE = 1_000_000
+MERGE_FAN_IN = 64
+KEY_BLOCK_SIZE = 65_536
+FINGERPRINT_BYTES = 65_536
+
+ADDRESS_COLUMN_TITLES = {"email", "e_mail", "email_address", "e_mail_address", "mail", "address", "recipient", "to"}
+COLUMN_TITLE = re.compile(r"\w+")
+
+
+def validate_email_chunk(emails):
+    """
+    Validates a chunk of email addresses at once with vectorized pandas string operations. Accepts exactly the
+    addresses is_valid_email accepts, and tells why each rejected address was rejected.
+
+    Args:
+        emails (list[str]): The email addresses to validate.
+
+    Returns:
+        numpy.ndarray: The reason code of every address, VALID for the accepted ones.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if len(emails) == 0:
+        return np.zeros(0, dtype=np.uint8)
+
+    values = pd.Series(emails, dtype=object).fillna("").astype(str)
+    at_count = values.str.count("@").to_numpy()
+    parts = values.str.partition("@")
+    local_ok = parts[0].str.fullmatch(r'[a-zA-Z0-9._%+-]+').to_numpy(dtype=bool)
+    domain_ok = parts[2].str.fullmatch(r'[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}').to_numpy(dtype=bool)
+
+    return np.select(
+        [values.str.len().to_numpy() == 0, at_count == 0, at_count > 1, ~local_ok, ~domain_ok],
+        [EMPTY, MISSING_AT, MULTIPLE_AT, INVALID_LOCAL_PART, INVALID_DOMAIN],
+        VALID,
+    ).astype(np.uint8)
+
+
+class ValidationPool:
+    """
+    The pool of processes large lists are validated in. It is started on first use and kept for the rest of the
+    session, so the worker processes and their numpy and pandas imports are paid for once rather than by every
+    import or every run of an external sort. A pool that breaks, for example because a worker was killed, is
+    replaced on the next use.
+    """
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.executor = None
+        self.processes = None
+
+
+    def map(self, chunks, processes=None) -> list:
+        """
+        Validates chunks of addresses in the worker processes.
+
+        Args:
+            chunks (list[list[str]]): The chunks to validate.
+            processes (int, optional): The number of worker processes. Defaults to one per core.
+
+        Returns:
+            list[numpy.ndarray]: The reason codes of every chunk, in order.
+        """
+        with self.lock:
+            if self.executor is None or self.processes != processes:
+                self.shutdown()
+                self.executor = ProcessPoolExecutor(max_workers=processes)
+                self.processes = processes
+            executor = self.executor
+        try:
+            return list(executor.map(validate_email_chunk, chunks))
+        except BrokenProcessPool:
+            with self.lock:
+                if self.executor is executor:
+                    self.executor = None
+            print("Validation workers stopped unexpectedly, validating in this process instead.")
+            return [validate_email_chunk(chunk) for chunk in chunks]
+
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker processes, if they were started.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+validation_pool = ValidationPool()
+
+
+def validate_emails(emails, processes=None):
+    """
+    Validates many email addresses in bulk. Inputs past PARALLEL_THRESHOLD addresses are split into chunks that are
+    validated in the shared validation_pool, so large imports use every core; smaller ones are validated in this
+    process, where starting workers would cost more than it saves.
+
+    Args:
+        emails (list[str]): The email addresses to validate.
+        processes (int, optional): The number of worker processes. Defaults to one per core; 1 validates in this process.
+
+    Returns:
+        tuple: A boolean numpy mask of the valid addresses, and the numpy array of reason codes of every address.
+    """
+    import numpy as np
+
+    if processes == 1 or len(emails) <= PARALLEL_THRESHOLD:
+        reasons = validate_email_chunk(emails)
+    else:
+        chunks = [emails[start:start + VALIDATION_CHUNK_SIZE] for start in range(0, len(emails), VALIDATION_CHUNK_SIZE)]
+        reasons = np.concatenate(validation_pool.map(chunks, processes))
+    return reasons == VALID, reasons
+
+
+def is_header_row(row, next_row):
+    """
+    Tells whether the first row of a list holds column titles rather than a recipient. No cell of a header looks
+    like an address, and its first title is a known name of the address column, such as "Email" or "E-mail Address".
+    Other titles are accepted only when there are at least two of them, all word-like, and the row after them starts
+    with an address. Any other first row, such as a line of junk above the addresses, is a recipient, left to fail
+    validation if it has no valid address.
+
+    Args:
+        row (list[str]): The first row of the list.
+        next_row (list[str]): The second row of the list, or None if there is none.
+
+    Returns:
+        bool: True if the row is a header.
+    """
+    if not row or not row[0] or any("@" in value for value in row):
+        return False
+    titles = [field_key(value) for value in row]
+    if titles[0] in ADDRESS_COLUMN_TITLES:
+        return True
+    return len(titles) > 1 and all(COLUMN_TITLE.fullmatch(title) for title in titles) \
+        and bool(next_row) and "@" in next_row[0]
+
+
+def read_csv_rows(file):
+    """
+    Reads the header and rows of a CSV list of recipients. The first column holds the email address, any further
+    columns hold merge fields.
+
+    Args:
+        file (TextIO): The open CSV file.
+
+    Returns:
+        tuple: The header as a list of column titles, or None if the file has none, and an iterator over the
+            stripped values of every non-empty row after it.
+    """
+    rows = ([value.strip() for value in row] for row in csv.reader(file) if row)
+    first = next(rows, None)
+    if first is None:
+        return None, iter(())
+    second = next(rows, None)
+    rest = rows if second is None else itertools.chain([second], rows)
+    if is_header_row(first, second):
+        return first, rest
+    return None, itertools.chain([first], rest)
+
+
+def iter_chunks(rows, chunk_size):
+    """
+    Splits an iterator of rows into lists of at most chunk_size rows.
+
+    Yields:
+        list: The next chunk of rows.
+    """
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def merge_runs(run_paths, run_dir, open_run, write_run, fan_in=MERGE_FAN_IN):
+    """
+    Merges sorted run files in passes of at most fan_in runs each, until no more than fan_in are left, so a merge
+    never holds more than fan_in files open however many runs a long input spilled. Merged runs are deleted.
+
+    Args:
+        run_paths (list[str]): The paths to the sorted runs.
+        run_dir (str): The directory the merged runs are written to.
+        open_run (callable): Opens a run from its path within an ExitStack, returning an iterator over its sorted items.
+        write_run (callable): Writes an iterator of sorted items to a run at a given path.
+        fan_in (int, optional): The largest number of runs merged at once.
+
+    Returns:
+        list[str]: The paths to the remaining runs, at most fan_in of them, in the order of the runs they merge.
+    """
+    merge_pass = 0
+    while len(run_paths) > fan_in:
+        merged_paths = []
+        for start in range(0, len(run_paths), fan_in):
+            merged_path = os.path.join(run_dir, f"merge{merge_pass}_{len(merged_paths)}")
+            with contextlib.ExitStack() as stack:
+                write_run(merged_path, heapq.merge(*(open_run(stack, path) for path in run_paths[start:start + fan_in])))
+            for path in run_paths[start:start + fan_in]:
+                os.remove(path)
+            merged_paths.append(merged_path)
+        run_paths = merged_paths
+        merge_pass += 1
+    return run_paths
+
+
+def open_text_run(stack, path):
+    """
+    Opens a run of sorted text lines.
+
+    Returns:
+        TextIO: The open run, closed with the stack.
+    """
+    return stack.enter_context(open(path, mode='r', encoding='utf-8'))
+
+
+def write_text_run(path, lines):
+    """
+    Writes sorted text lines to a run.
+    """
+    with open(path, mode='w', encoding='utf-8') as run:
+        run.writelines(lines)
+
+
+def read_keys(file):
+    """
+    Reads raw 64-bit keys from a binary file, KEY_BLOCK_SIZE at a time.
+
+    Yields:
+        int: The next key.
+    """
+    while True:
+        block = file.read(KEY_BLOCK_SIZE * 8)
+        if not block:
+            return
+        keys = array('Q')
+        keys.frombytes(block)
+        yield from keys
+
+
+def write_keys(file, keys):
+    """
+    Writes 64-bit keys to a binary file as raw integers, KEY_BLOCK_SIZE at a time.
+
+    Args:
+        file (BinaryIO): The open file.
+        keys (iterable[int]): The keys to write.
+    """
+    if isinstance(keys, array):
+        keys.tofile(file)
+        return
+    for block in iter_chunks(iter(keys), KEY_BLOCK_SIZE):
+        array('Q', block).tofile(file)
+
+
+def open_key_run(stack, path):
+    """
+    Opens a run of sorted keys.
+
+    Returns:
+        Iterator[int]: The keys of the run, whose file is closed with the stack.
+    """
+    return read_keys(stack.enter_context(open(path, 'rb')))
+
+
+def write_key_run(path, keys):
+    """
+    Writes sorted keys to a run.
+    """
+    with open(path, 'wb') as run:
+        write_keys(run, keys)
+
+
+def align_row(row, header, target_header):
+    """
+    Reorders the values of a row from one header's columns to another's. Columns the target does not have are
+    dropped, and columns the row does not have are left empty.
+
+    Args:
+        row (list[str]): The values of the row.
+        header (list[str]): The column titles of the row.
+        target_header (list[str]): The column titles to align to.
+
+    Returns:
+        list[str]: The row in the column order of target_header, with the email address kept first.
+    """
+    values = dict(zip(header, row))
+    return [row[0]] + [values.get(title, "") for title in target_header[1:]]
+
+
+def clean_email_list(input_file_path, output_file_path, normalizer=None):
     """
     Reads a list of email addresses from a CSV file, validates each email, and writes unique and valid emails
     to another CSV file.
 
-    This function ensures that the output file contains only unique and properly formatted email addresses,
-    sorted alphabetically.
+    This function ensures that the output file contains only unique and properly formatted email addresses, sorted
+    alphabetically by their canonical form. Addresses that share a canonical form are duplicates, and only the first one
+    seen is kept, as it was written, together with the rest of its row. A header row is kept at the top. Addresses are
+    validated in bulk with validate_emails. Files larger than EXTERNAL_SORT_THRESHOLD are cleaned with clean_email_lists
+    instead, which does not hold the whole list in memory.
 
     Args:
         input_file_path (str): The path to the CSV file containing the list of email addresses.
         output_file_path (str): The path to the CSV file where the cleaned list of email addresses will be saved.
+        normalizer (AddressNormalizer, optional): Defines the canonical form. Defaults to the one set up in the preferences.
+
+    Returns:
+        int: The number of email addresses written.
 
     Notes:
-        The input CSV is expected to contain one email address per row.
+        The input CSV is expected to contain one email address per row, in its first column.
     """
-    unique_emails = set()
+    if os.path.getsize(input_file_path) > EXTERNAL_SORT_THRESHOLD:
+        return clean_email_lists([input_file_path], output_file_path, normalizer=normalizer)
 
+    normalizer = normalizer or AddressNormalizer.from_config()
     with open(input_file_path, mode='r', encoding='utf-8') as infile:
-        reader = csv.reader(infile)
-        for row in reader:
-            if len(row) == 0:
-                continue
-            email = row[0].strip()
-            if is_valid_email(email):
-                unique_emails.add(email)
+        header, rows = read_csv_rows(infile)
+        rows = list(rows)
+
+    valid, _ = validate_emails([row[0] for row in rows])
+    unique_rows = {}
+    for row, ok in zip(rows, valid):
+        if ok:
+            unique_rows.setdefault(normalizer.canonical(row[0]), row)
 
     with open(output_file_path, mode='w', encoding='utf-8', newline='') as outfile:
         writer = csv.writer(outfile)
-        for email in sorted(unique_emails):
-            writer.writerow([email])
+        if header:
+            writer.writerow(header)
+        for _, row in sorted(unique_rows.items()):
+            writer.writerow(row)
+    return len(unique_rows)
+
+
+def clean_email_lists(input_file_paths, output_file_path, run_size=EXTERNAL_RUN_SIZE, normalizer=None):
+    """
+    Merges several CSV files of email addresses into one cleaned list with an external merge sort, so memory stays
+    bounded by run_size no matter how large the inputs are.
+
+    The inputs are read in runs of run_size addresses. Each run is validated, deduplicated, sorted and spilled to
+    a temporary file as lines of canonical form, run number and row; the runs are then k-way merged into the output,
+    dropping addresses whose canonical form was already written as they meet. Ties sort by run number, so the first
+    row seen in input order is the one kept, as in clean_email_list. Inputs long enough to spill more than
+    MERGE_FAN_IN runs are merged in several passes with merge_runs, which bounds the number of open files.
+    The output is written to a temporary file first, so it may be one of the inputs. It takes the header of the first
+    input that has one, and the rows of inputs with a different header are aligned to it by column title.
+
+    Args:
+        input_file_paths (list[str]): The paths to the CSV files containing the email addresses.
+        output_file_path (str): The path to the CSV file where the cleaned list of email addresses will be saved.
+        run_size (int, optional): The number of addresses sorted in memory at a time.
+        normalizer (AddressNormalizer, optional): Defines the canonical form. Defaults to the one set up in the preferences.
+
+    Returns:
+        int: The number of email addresses written.
+    """
+    normalizer = normalizer or AddressNormalizer.from_config()
+    output_dir = os.path.dirname(os.path.abspath(output_file_path))
+    with tempfile.TemporaryDirectory(dir=output_dir) as run_dir:
+        run_paths = []
+        output_header = None
+        for input_file_path in input_file_paths:
+            with open(input_file_path, mode='r', encoding='utf-8') as infile:
+                header, rows = read_csv_rows(infile)
+                output_header = output_header or header
+                for chunk in iter_chunks(rows, run_size):
+                    if header and header != output_header:
+                        chunk = [align_row(row, header, output_header) for row in chunk]
+                    valid, _ = validate_emails([row[0] for row in chunk])
+                    unique_rows = {}
+                    for row, ok in zip(chunk, valid):
+                        if ok:
+                            unique_rows.setdefault(normalizer.canonical(row[0]), row)
+                    run_path = os.path.join(run_dir, f"run{len(run_paths)}.txt")
+                    with open(run_path, mode='w', encoding='utf-8') as run:
+                        run.writelines(f"{canonical}\t{len(run_paths):08d}\t{json.dumps(row)}\n"
+                                       for canonical, row in sorted(unique_rows.items()))
+                    run_paths.append(run_path)
+
+        run_paths = merge_runs(run_paths, run_dir, open_text_run, write_text_run)
+        written = 0
+        previous = None
+        output_path = os.path.join(run_dir, "cleaned.csv")
+        with contextlib.ExitStack() as stack:
+            runs = [open_text_run(stack, run_path) for run_path in run_paths]
+            with open(output_path, mode='w', encoding='utf-8', newline='') as outfile:
+                writer = csv.writer(outfile)
+                if output_header:
+                    writer.writerow(output_header)
+                for line in heapq.merge(*runs):
+                    canonical, _, row = line.rstrip("\n").split("\t", 2)
+                    if canonical != previous:
+                        writer.writerow(json.loads(row))
+                        written += 1
+                        previous = canonical
+        os.replace(output_path, output_file_path)
+    return written
+
+
+def email_key(email):
+    """
+    Returns the 64-bit key an email address is deduplicated on in the cleaning sidecar index.
+
+    Args:
+        email (str): The canonical form of the email address.
+
+    Returns:
+        int: The key of the address.
+    """
+    return int.from_bytes(hashlib.blake2b(email.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def file_fingerprint(file_path, length):
+    """
+    Hashes the length and the first and last FINGERPRINT_BYTES of the first bytes of a file, so that the cost does not
+    grow with the file. An edit that grows the file while leaving both ends of its old content in place is taken for
+    an append; edits inside the content almost always shift its tail, and are then cleaned in full.
+
+    Args:
+        file_path (str): The path to the file.
+        length (int): The number of bytes the fingerprint covers.
+
+    Returns:
+        str: The hex digest of the fingerprint.
+    """
+    digest = hashlib.blake2b(length.to_bytes(8, 'little'))
+    with open(file_path, 'rb') as file:
+        digest.update(file.read(min(length, FINGERPRINT_BYTES)))
+        if length > FINGERPRINT_BYTES:
+            file.seek(max(length - FINGERPRINT_BYTES, FINGERPRINT_BYTES))
+            digest.update(file.read(length - file.tell()))
+    return digest.hexdigest()
+
+
+def sorted_email_keys(file_path, run_dir, normalizer, run_size=EXTERNAL_RUN_SIZE):
+    """
+    Computes the keys of every address in a cleaned list with memory bounded by run_size. The keys of each run of
+    rows are sorted and spilled to a temporary file, ready to be merged as they are read.
+
+    Args:
+        file_path (str): The path to the cleaned CSV file.
+        run_dir (str): The temporary directory the runs are written to.
+        normalizer (AddressNormalizer): Defines the canonical form the keys are taken from.
+        run_size (int, optional): The number of keys sorted in memory at a time.
+
+    Returns:
+        list[str]: The paths to the runs of sorted keys, at most MERGE_FAN_IN of them.
+    """
+    run_paths = []
+    with open(file_path, mode='r', encoding='utf-8') as file:
+        _, rows = read_csv_rows(file)
+        for chunk in iter_chunks(rows, run_size):
+            run_path = os.path.join(run_dir, f"keys{len(run_paths)}")
+            write_key_run(run_path, array('Q', sorted(email_key(normalizer.canonical(row[0])) for row in chunk)))
+            run_paths.append(run_path)
+    return merge_runs(run_paths, run_dir, open_key_run, write_key_run)
+
+
+class CleanState:
+    """
+    The sidecar record of a cleaned email list: the fingerprint of the file as it was left by the cleaner and the
+    sorted keys of every address it contains.
+
+    The sidecar is stored next to the list as one JSON header line followed by the keys as raw 64-bit integers,
+    so loading it is a single read with no parsing per address. Keys are taken from the canonical form of each address,
+    so the signature of the normalizer that produced them is stored as well.
+
+    Attributes:
+        size (int): The size of the cleaned file.
+        mtime_ns (int): The modification time of the cleaned file.
+        digest (str): The fingerprint of the cleaned file's content, see file_fingerprint.
+        keys (array): The sorted keys of the addresses in the file. A state that is only saved may hold any iterable
+            of sorted keys, which is then streamed to the sidecar.
+        normalization (str): The signature of the AddressNormalizer the keys were made with.
+    """
+    def __init__(self, size, mtime_ns, digest, keys, normalization) -> None:
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+        self.keys = keys
+        self.normalization = normalization
+
+
+    @staticmethod
+    def sidecar_path(file_path) -> str:
+        """
+        Returns:
+            str: The path the clean state of a list is saved to.
+        """
+        return f"{file_path}.clean"
+
+
+    @classmethod
+    def of_file(cls, file_path, keys, normalization):
+        """
+        Fingerprints a freshly cleaned file.
+
+        Args:
+            file_path (str): The path to the cleaned file.
+            keys (iterable[int]): The sorted keys of the addresses in the file.
+            normalization (str): The signature of the AddressNormalizer the keys were made with.
+
+        Returns:
+            CleanState: The state of the file.
+        """
+        stat = os.stat(file_path)
+        return cls(stat.st_size, stat.st_mtime_ns, file_fingerprint(file_path, stat.st_size), keys, normalization)
+
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Loads the saved clean state of a list.
+
+        Args:
+            file_path (str): The path to the list.
+
+        Returns:
+            CleanState: The saved state, or None if there is none or it cannot be read.
+        """
+        try:
+            with open(cls.sidecar_path(file_path), 'rb') as file:
+                header = json.loads(file.readline())
+                keys = array('Q')
+                keys.frombytes(file.read())
+            return cls(header["size"], header["mtime_ns"], header["digest"], keys, header["normalization"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+    def save(self, file_path) -> None:
+        """
+        Writes the clean state next to the list.
+
+        Args:
+            file_path (str): The path to the list.
+        """
+        with open(self.sidecar_path(file_path), 'wb') as file:
+            header = {"size": self.size, "mtime_ns": self.mtime_ns, "digest": self.digest, "normalization": self.normalization}
+            file.write(json.dumps(header).encode() + b"\n")
+            write_keys(file, self.keys)
+
+
+    def contains(self, key) -> bool:
+        """
+        Args:
+            key (int): The key of an address.
+
+        Returns:
+            bool: True if an address with this key is already in the cleaned file.
+        """
+        position = bisect.bisect_left(self.keys, key)
+        return position < len(self.keys) and self.keys[position] == key
+
+
+def clean_email_list_cached(file_path, normalizer=None):
+    """
+    Cleans an email list in place, doing only the work its changes since the last clean require.
+
+    The cleaner keeps a CleanState sidecar with the fingerprint of the file as it left it. If the size and modification
+    time still match, the file is untouched and nothing is done. If the file only grew and the head and tail of its old
+    content still match the recorded fingerprint, only the appended bytes are read: they are validated, deduplicated
+    against the sidecar keys and against themselves, and rewritten in place, so the new addresses follow the sorted
+    ones. Any other change, including a change of the normalization preferences, falls back to a full clean.
+
+    Args:
+        file_path (str): The path to the CSV file containing the list of email addresses.
+        normalizer (AddressNormalizer, optional): Defines the canonical form. Defaults to the one set up in the preferences.
+
+    Returns:
+        bool: True if the file was cleaned, False if it was unchanged.
+    """
+    normalizer = normalizer or AddressNormalizer.from_config()
+    state = CleanState.load(file_path)
+    if state and state.normalization != normalizer.signature:
+        state = None
+    stat = os.stat(file_path)
+
+    if state and (stat.st_size, stat.st_mtime_ns) == (state.size, state.mtime_ns):
+        return False
+
+    if state and stat.st_size > state.size and file_fingerprint(file_path, state.size) == state.digest:
+        with open(file_path, 'rb') as file:
+            file.seek(state.size)
+            tail = file.read().decode('utf-8')
+
+        rows = [[value.strip() for value in row] for row in csv.reader(io.StringIO(tail)) if row]
+        valid, _ = validate_emails([row[0] for row in rows])
+
+        new_rows = []
+        new_keys = set()
+        for row, ok in zip(rows, valid):
+            if not ok:
+                continue
+            key = email_key(normalizer.canonical(row[0]))
+            if key in new_keys or state.contains(key):
+                continue
+            new_keys.add(key)
+            new_rows.append(row)
+
+        cleaned_tail = io.StringIO()
+        writer = csv.writer(cleaned_tail)
+        for row in new_rows:
+            writer.writerow(row)
+
+        with open(file_path, 'r+b') as file:
+            file.seek(state.size)
+            file.truncate()
+            file.write(cleaned_tail.getvalue().encode('utf-8'))
+
+        CleanState.of_file(file_path, heapq.merge(state.keys, sorted(new_keys)), normalizer.signature).save(file_path)
+        return True
+
+    clean_email_list(file_path, file_path, normalizer=normalizer)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(file_path))) as run_dir:
+        with contextlib.ExitStack() as stack:
+            run_paths = sorted_email_keys(file_path, run_dir, normalizer)
+            keys = heapq.merge(*(open_key_run(stack, run_path) for run_path in run_paths))
+            CleanState.of_file(file_path, keys, normalizer.signature).save(file_path)
+    return True
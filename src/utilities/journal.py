@@ -0,0 +1,124 @@
+import sqlite3
+import threading
+import time
+
+from ..utilities.resource_path import user_data_path
+
+
+
+class SendJournal:
+    """
+    A durable, append-only record of every recipient state transition, keyed by campaign and address.
+
+    The journal is an SQLite database in WAL mode with synchronous=NORMAL, so each write is a small sequential
+    append without an fsync, yet a crash never loses a committed transition or corrupts the file. Alongside the
+    append-only transitions table, a recipients table holds the latest status of each address, indexed by status,
+    so resuming a campaign only reads the rows that still need sending. The database is kept in the user data
+    directory, so a frozen build finds it again after a restart.
+
+    Attributes:
+        path (str): The relative path to the journal database, within the user data directory.
+        RESUMABLE (tuple[str]): Statuses that are sent again when a campaign is resumed.
+    """
+    path = 'settings/send_journal.db'
+    RESUMABLE = ("Pending", "Failed", "Retrying")
+
+    def __init__(self, path=None) -> None:
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path or user_data_path(SendJournal.path), check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS transitions (
+                campaign TEXT NOT NULL,
+                address TEXT NOT NULL,
+                status TEXT NOT NULL,
+                recorded_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS recipients (
+                campaign TEXT NOT NULL,
+                address TEXT NOT NULL,
+                status TEXT NOT NULL,
+                PRIMARY KEY (campaign, address)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS recipients_by_status ON recipients (campaign, status);
+        """)
+
+
+    def begin(self, campaign, addresses) -> None:
+        """
+        Registers the recipients of a campaign as Pending. Addresses that are already journaled keep their status,
+        so calling this again for a resumed campaign only adds the new addresses.
+
+        Args:
+            campaign (str): The campaign identifier.
+            addresses (iterable[str]): The recipient addresses of the campaign.
+        """
+        with self.lock:
+            with self.connection:
+                self.connection.execute("BEGIN")
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO recipients (campaign, address, status) VALUES (?, ?, 'Pending')",
+                    ((campaign, address) for address in addresses))
+
+
+    def record(self, campaign, addresses, status) -> None:
+        """
+        Records a state transition for one or more addresses in a single transaction.
+
+        Args:
+            campaign (str): The campaign identifier.
+            addresses (list[str]): The addresses whose status changed.
+            status (str): The new status.
+        """
+        now = time.time()
+        with self.lock:
+            with self.connection:
+                self.connection.execute("BEGIN")
+                self.connection.executemany(
+                    "INSERT INTO transitions (campaign, address, status, recorded_at) VALUES (?, ?, ?, ?)",
+                    ((campaign, address, status, now) for address in addresses))
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO recipients (campaign, address, status) VALUES (?, ?, ?)",
+                    ((campaign, address, status) for address in addresses))
+
+
+    def pending(self, campaign) -> list:
+        """
+        Returns the addresses of a campaign that still need sending, read through the status index.
+
+        Args:
+            campaign (str): The campaign identifier.
+
+        Returns:
+            list[str]: The addresses whose latest status is resumable.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT address FROM recipients WHERE campaign = ? AND status IN ({', '.join('?' * len(self.RESUMABLE))})",
+                (campaign, *self.RESUMABLE))
+            return [address for address, in rows.fetchall()]
+
+
+    def settled(self, campaign) -> dict:
+        """
+        Returns the latest status of every address of a campaign that is no longer Pending.
+
+        Args:
+            campaign (str): The campaign identifier.
+
+        Returns:
+            dict: A mapping of address to its latest status.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT address, status FROM recipients WHERE campaign = ? AND status != 'Pending'", (campaign,))
+            return dict(rows.fetchall())
+
+
+    def close(self) -> None:
+        """
+        Closes the underlying database connection.
+        """
+        with self.lock:
+            self.connection.close()
@@ -1,79 +1,249 @@
-from email.mime.multipart import MIMEMultipart
+from dataclasses import dataclass
+from enum import Enum
 import os
-import base64
 import threading
+import time
 from threading import Event
 import json
-from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
-import webbrowser
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from email.mime.text import MIMEText
 
-from ..utilities.resource_path import resource_path
+from ..utilities.campaign import Campaign
+from ..utilities.credential_store import CredentialStore, TokenRefresher
+from ..utilities.resource_path import resource_path, user_data_path
 
 """
 Generated by ChatGPT
 
 This code provides an interface to the Gmail API for sending emails. It includes authentication handling using OAuth 2.0,
 web server setup for local redirection during the OAuth flow, and functions for sending both plain text and HTML emails.
+The Google client libraries are only imported when they are first needed, so importing this module is cheap.
 """
 
 
+class SendOutcome(Enum):
+    """
+    The kinds of result a send can have, each calling for a different reaction from the sender.
+
+    SENT: Gmail accepted the message.
+    TRANSIENT: A network failure or server error; the send can be retried.
+    RATE_LIMITED: Gmail asked to slow down; the send can be retried at a lower rate.
+    QUOTA: The account's sending limit has been reached; nothing more can be sent for now.
+    AUTH_EXPIRED: The credentials are no longer valid; sending needs a new login.
+    PERMANENT: The message was rejected, for example because of a bad address; retrying will not help.
+    """
+    SENT = "Sent"
+    TRANSIENT = "Transient"
+    RATE_LIMITED = "Rate limited"
+    QUOTA = "Quota"
+    AUTH_EXPIRED = "Auth expired"
+    PERMANENT = "Permanent"
+
+
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+QUOTA_REASONS = {"dailyLimitExceeded", "quotaExceeded", "limitExceeded"}
+
+
+def classify_error(error):
+    """
+    Maps an exception raised while sending to the SendOutcome that describes it.
+
+    Args:
+        error (Exception): The exception raised by the Gmail API client or the transport under it.
+
+    Returns:
+        SendOutcome: The outcome the error represents.
+    """
+    from google.auth.exceptions import RefreshError
+    from googleapiclient.errors import HttpError
+    from httplib2 import HttpLib2Error
+
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        details = error.error_details if isinstance(error.error_details, list) else []
+        reasons = {detail.get("reason") for detail in details if isinstance(detail, dict)}
+        if reasons & QUOTA_REASONS or "sending limit" in str(error).lower():
+            return SendOutcome.QUOTA
+        if status == 429 or reasons & RATE_LIMIT_REASONS:
+            return SendOutcome.RATE_LIMITED
+        if status == 401:
+            return SendOutcome.AUTH_EXPIRED
+        if status >= 500 or status == 408:
+            return SendOutcome.TRANSIENT
+        return SendOutcome.PERMANENT
+    if isinstance(error, RefreshError):
+        return SendOutcome.AUTH_EXPIRED
+    if isinstance(error, (OSError, HttpLib2Error)):
+        return SendOutcome.TRANSIENT
+    return SendOutcome.PERMANENT
+
+
+@dataclass
+class SendResult:
+    """
+    The outcome of sending a single message.
+
+    Attributes:
+        outcome (SendOutcome): What happened to the message.
+        message_id (str): The Gmail id assigned to the sent message, when it was accepted.
+        error_class (str): The class name of the exception that caused the send to fail, if any.
+        error (str): A readable description of the failure, if any.
+        ambiguous (bool): True if the request may have reached Gmail without an answer coming back, so the
+            message may or may not have been sent.
+    """
+    outcome: SendOutcome
+    message_id: str = None
+    error_class: str = None
+    error: str = None
+    ambiguous: bool = False
+
+
+    @property
+    def success(self) -> bool:
+        """
+        Returns:
+            bool: True if Gmail accepted the message.
+        """
+        return self.outcome is SendOutcome.SENT
+
+
+    @classmethod
+    def from_error(cls, error):
+        """
+        Builds the result of a send that raised an exception.
+
+        Args:
+            error (Exception): The exception raised while sending.
+
+        Returns:
+            SendResult: The classified failure.
+        """
+        from googleapiclient.errors import HttpError
+
+        # An HTTP error is Gmail's answer, other transient failures may have cut the request off after it arrived
+        outcome = classify_error(error)
+        return cls(outcome, error_class=type(error).__name__, error=str(error),
+                   ambiguous=outcome is SendOutcome.TRANSIENT and not isinstance(error, HttpError))
+
+
 class GmailService:
     """
     Manages authentication and interaction with the Gmail API to send emails.
 
     This service class handles OAuth2 authentication, token management, and provides functionalities
-    to send emails. It uses a local server setup to handle OAuth redirects.
+    to send emails. It uses a local server on a free loopback port to handle OAuth redirects. Credentials are kept in a CredentialStore,
+    so later launches reuse the refresh token without a browser, and once the service is built a TokenRefresher
+    renews the access token in the background before it expires.
+
+    httplib2 connections are not thread-safe, so requests are not executed on the service's own connection: every
+    thread that sends gets its own authorized, keep-alive transport from http, all sharing the same credentials. A
+    pool of sender threads then keeps one warm TLS connection per worker.
 
     Attributes:
         credentials (Credentials): The OAuth2 credentials for accessing Gmail API.
         service (Resource): The Google API service object.
         auth_code (str): The authorization code received from OAuth flow.
         auth_code_event (Event): Event to synchronize the OAuth authentication flow.
+        store (CredentialStore): Where the credentials are kept between launches.
+        refresher (TokenRefresher): Keeps the access token fresh once the service is built.
+        account (str): The name of the additional sending account the service sends from, or None for the main one.
+        transports (threading.local): The authorized transport of every thread that sent with the current service.
     """
     SCOPES = ['https://www.googleapis.com/auth/gmail.send']
-    REDIRECT_URI = 'http://localhost:8080/'
-    
-    def __init__(self):
+    REDIRECT_HOST = '127.0.0.1'
+    AUTH_TIMEOUT = 300
+    MAX_BATCH_SIZE = 100
+    UPLOAD_THRESHOLD = 4 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE = 1024 * 1024
+    UPLOAD_RESUME_ATTEMPTS = 5
+    UPLOAD_RESUME_DELAY = 1
+    DISCOVERY_DOCUMENT = 'settings/gmail_v1_discovery.json'
+    DISCOVERY_URL = 'https://gmail.googleapis.com/$discovery/rest?version=v1'
+
+    def __init__(self, account=None):
+        self.account = account
         self.credentials = None
         self.service = None
         self.auth_code = None
         self.auth_code_event = Event()
+        self.store = CredentialStore(account)
+        self.refresher = None
+        self.transports = threading.local()
 
 
-    def authenticate(self, client_id, client_secret):
+    def restore_credentials(self, client_id):
         """
-        Initiates the OAuth2 flow using a web-based authorization approach. Opens a web browser for the user to grant
-        permissions and waits for a callback on a local server.
+        Signs in with the credentials saved by an earlier launch, renewing their access token if it has expired.
+        Saved credentials whose refresh token has been revoked are deleted.
 
         Args:
             client_id (str): The client ID for the OAuth application.
+
+        Returns:
+            bool: True if saved credentials were restored and credentials are set, otherwise False.
+        """
+        from google.auth.exceptions import RefreshError
+        from google.auth.transport.requests import Request
+
+        credentials = self.store.load(client_id, self.SCOPES)
+        if credentials is None or not credentials.refresh_token:
+            return False
+        if not credentials.valid:
+            try:
+                credentials.refresh(Request())
+            except RefreshError as e:
+                print(f"Saved credentials were revoked ({e}), signing in again.")
+                self.store.clear()
+                return False
+            except Exception as e:
+                print(f"Saved credentials could not be renewed ({e}), signing in again.")
+                return False
+            self.store.save(credentials)
+        self.credentials = credentials
+        return True
+
+
+    def prepare_authentication(self) -> Event:
+        """
+        Sets up the event a new authenticate call waits on. A caller that runs authenticate on another thread prepares
+        it before starting the thread, so that a cancel_authentication made before the call begins is not lost.
+
+        Returns:
+            Event: The event to pass to authenticate.
+        """
+        self.auth_code_event = Event()
+        return self.auth_code_event
+
+
+    def authenticate(self, client_id, client_secret, timeout=None, auth_code_event=None):
+        """
+        Initiates the OAuth2 flow using a web-based authorization approach. Opens a web browser for the user to grant
+        permissions and waits for the redirect on a loopback server listening on a free port picked by the system.
+
+        The wait ends when the browser is redirected back, when timeout seconds have passed, or when
+        cancel_authentication is called from another thread, so the call can be run off the GUI thread and abandoned.
+
+        Args:
+            client_id (str): The client ID for the OAuth application, which must be a Desktop app client.
             client_secret (str): The client secret for the OAuth application.
+            timeout (float, optional): The number of seconds to wait for the user. Defaults to AUTH_TIMEOUT.
+            auth_code_event (Event, optional): The event returned by prepare_authentication, if the call was prepared
+                in advance. If it is already set, the call returns False at once. Defaults to a new one.
 
         Returns:
             bool: True if authentication was successful and credentials are set, otherwise False.
         """
-        flow = InstalledAppFlow.from_client_config(
-            {
-                "web": {
-                    "client_id": client_id,
-                    "client_secret": client_secret,
-                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                    "token_uri": "https://oauth2.googleapis.com/token"
-                }
-            },
-            scopes=self.SCOPES,
-            redirect_uri=self.REDIRECT_URI)
-        
-        auth_url, _ = flow.authorization_url(prompt='consent')
-        webbrowser.open_new(auth_url)
-
-
-        def AuthHandlerFactory(service):
+        self.auth_code = None
+        if auth_code_event is None:
+            auth_code_event = self.prepare_authentication()
+        if auth_code_event.is_set():
+            print("Authentication was cancelled.")
+            return False
+
+        import webbrowser
+        from http.server import HTTPServer, BaseHTTPRequestHandler
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
+        def AuthHandlerFactory(service, expected_state):
             """
             Factory function to create a custom AuthHandler that can access the GmailService instance.
             """
@@ -81,9 +251,12 @@ class GmailService:
                 def do_GET(self):
                     query = urlparse(self.path).query
                     query_components = parse_qs(query)
+                    if query_components.get('state', [None])[0] != expected_state:
+                        self.send_error(400)
+                        return
                     if 'code' in query_components:
                         service.auth_code = query_components['code'][0]
-                        service.auth_code_event.set()
+                        auth_code_event.set()
 
                         self.send_response(200)
                         self.send_header('Content-type', 'text/html')
@@ -97,34 +270,135 @@ class GmailService:
                         except Exception as e:
                             self.wfile.write(b"Error loading HTML content.")
                     else:
+                        # The user denied access: stop waiting
+                        auth_code_event.set()
                         self.send_error(401)
+
+                def log_message(self, format, *args):
+                    pass
             return CustomAuthHandler
-        
-        httpd = HTTPServer(('', 8080), AuthHandlerFactory(self))
-        server_thread = threading.Thread(target=httpd.serve_forever)
-        server_thread.daemon = True
-        server_thread.start()
-
-        self.auth_code_event.wait()  # Wait for the auth code event to be set by the AuthHandler.
-        flow.fetch_token(code=self.auth_code)
-        self.credentials = flow.credentials
 
-        httpd.shutdown()
-        server_thread.join()
+        httpd = HTTPServer((self.REDIRECT_HOST, 0), BaseHTTPRequestHandler)
+        server_thread = None
+        try:
+            flow = InstalledAppFlow.from_client_config(
+                {
+                    "installed": {
+                        "client_id": client_id,
+                        "client_secret": client_secret,
+                        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                        "token_uri": "https://oauth2.googleapis.com/token",
+                        "redirect_uris": [f"http://{self.REDIRECT_HOST}"]
+                    }
+                },
+                scopes=self.SCOPES,
+                redirect_uri=f"http://{self.REDIRECT_HOST}:{httpd.server_port}/")
+
+            auth_url, state = flow.authorization_url(prompt='consent')
+            httpd.RequestHandlerClass = AuthHandlerFactory(self, state)
+            server_thread = threading.Thread(target=httpd.serve_forever)
+            server_thread.daemon = True
+            server_thread.start()
+            webbrowser.open_new(auth_url)
 
+            # Wait for the auth code event to be set by the AuthHandler, a cancellation or the timeout
+            auth_code_event.wait(self.AUTH_TIMEOUT if timeout is None else timeout)
+            if not self.auth_code:
+                print("Authentication was cancelled, denied or timed out.")
+                return False
+            flow.fetch_token(code=self.auth_code)
+        except Exception as e:
+            print(f"Authentication failed: {e}")
+            return False
+        finally:
+            if server_thread:
+                httpd.shutdown()
+                server_thread.join()
+            httpd.server_close()
+
+        self.credentials = flow.credentials
+        self.store.save(self.credentials)
         return self.credentials is not None
 
 
+    def cancel_authentication(self):
+        """
+        Stops waiting for the user in a running authenticate call, which then returns False.
+        """
+        self.auth_code_event.set()
+
+
+    def discovery_document(self):
+        """
+        Returns the Gmail API discovery document the service is built from, without going to the network when it
+        can be avoided. The document is read from its cache in the user data directory, or else taken from the copy
+        bundled with googleapiclient, and only fetched from Google when neither is available. A document that was not
+        read from the cache is saved to it for the next launch.
+
+        Returns:
+            str: The discovery document as JSON.
+        """
+        path = user_data_path(self.DISCOVERY_DOCUMENT)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return file.read()
+        except OSError:
+            pass
+
+        from googleapiclient import discovery_cache
+        document = discovery_cache.get_static_doc('gmail', 'v1')
+        if document is None:
+            import httplib2
+            response, content = httplib2.Http().request(self.DISCOVERY_URL)
+            if response.status != 200:
+                raise Exception(f"Could not fetch the Gmail API discovery document: HTTP {response.status}")
+            document = content.decode('utf-8')
+
+        try:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(document)
+        except OSError as e:
+            print(f"Could not cache the Gmail API discovery document: {e}")
+        return document
+
+
     def build_service(self):
         """
-        Initializes the Gmail API service object using the authenticated credentials.
+        Initializes the Gmail API service object using the authenticated credentials, from the cached discovery
+        document, and starts renewing the access token in the background.
 
         Raises:
             Exception: If credentials are not available or invalid.
         """
+        from googleapiclient.discovery import build_from_document
+
         if not self.credentials:
             raise Exception("No credentials available. Please authenticate first.")
-        self.service = build('gmail', 'v1', credentials=self.credentials)
+        self.service = build_from_document(self.discovery_document(), credentials=self.credentials)
+        self.transports = threading.local()
+        if self.refresher:
+            self.refresher.stop()
+        self.refresher = TokenRefresher(self.credentials, self.store)
+        self.refresher.start()
+
+
+    def http(self):
+        """
+        Returns the calling thread's transport, creating it on the thread's first request. Connections stay open
+        between requests, so a thread only pays for the TLS handshake once.
+
+        Returns:
+            google_auth_httplib2.AuthorizedHttp: An HTTP client authorized with the shared credentials, only to be
+                used from the calling thread.
+        """
+        transport = getattr(self.transports, "http", None)
+        if transport is None:
+            from google_auth_httplib2 import AuthorizedHttp
+            from googleapiclient.http import build_http
+
+            transport = AuthorizedHttp(self.credentials, http=build_http())
+            self.transports.http = transport
+        return transport
 
 
     def send_email(self, to, subject, plain_text, html):
@@ -143,19 +417,116 @@ class GmailService:
         if not self.service:
             raise Exception("Service not initialized. Please authenticate and build the service first.")
 
-        message = MIMEMultipart('alternative')
-        message['to'] = to
-        message['subject'] = subject
+        return self.send_message(Campaign(subject, html, plain_text).render_raw(to)).success
 
-        part1 = MIMEText(plain_text, 'plain')
-        part2 = MIMEText(html, 'html')
 
-        message.attach(part1)
-        message.attach(part2)
+    def send_message(self, raw_message):
+        """
+        Sends a single prepared message.
+
+        Args:
+            raw_message (str): The message encoded as a urlsafe base64 string, as produced by Campaign.render_raw.
+
+        Returns:
+            SendResult: The classified outcome of the send.
+        """
+        if not self.service:
+            raise Exception("Service not initialized. Please authenticate and build the service first.")
 
-        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
         try:
-            self.service.users().messages().send(userId='me', body={'raw': raw_message}).execute()
-            return True
-        except:
-            return False
\ No newline at end of file
+            response = self.service.users().messages().send(userId='me', body={'raw': raw_message}).execute(http=self.http())
+            return SendResult(SendOutcome.SENT, message_id=response.get('id'))
+        except Exception as e:
+            return SendResult.from_error(e)
+
+
+    def send_upload(self, message):
+        """
+        Sends a single large message through the resumable media upload endpoint. The RFC 822 bytes are streamed
+        in UPLOAD_CHUNK_SIZE chunks instead of being base64 encoded into a JSON body, and an upload interrupted by
+        a transient failure is resumed from the last chunk Gmail confirmed, up to UPLOAD_RESUME_ATTEMPTS times, after
+        a delay growing by UPLOAD_RESUME_DELAY seconds each time. googleapiclient's own retries are not used, as they
+        send a streamed chunk again from where the failed attempt left the stream.
+
+        Args:
+            message (io.IOBase): A seekable binary stream of the message, as opened by Campaign.open_message.
+
+        Returns:
+            SendResult: The classified outcome of the send.
+        """
+        from googleapiclient.http import MediaIoBaseUpload
+
+        if not self.service:
+            raise Exception("Service not initialized. Please authenticate and build the service first.")
+
+        media = MediaIoBaseUpload(message, mimetype='message/rfc822', chunksize=self.UPLOAD_CHUNK_SIZE, resumable=True)
+        request = self.service.users().messages().send(userId='me', body={}, media_body=media)
+        failures = 0
+        response = None
+        while response is None:
+            try:
+                _, response = request.next_chunk(http=self.http())
+            except Exception as e:
+                failures += 1
+                if classify_error(e) is not SendOutcome.TRANSIENT or failures >= self.UPLOAD_RESUME_ATTEMPTS:
+                    return SendResult.from_error(e)
+                time.sleep(self.UPLOAD_RESUME_DELAY * failures)
+        return SendResult(SendOutcome.SENT, message_id=response.get('id'))
+
+
+    def send_batch(self, raw_messages, batch_uri=None, http=None):
+        """
+        Sends several prepared messages with as few HTTP round-trips as possible by grouping them into Gmail
+        batch requests of at most MAX_BATCH_SIZE messages each.
+
+        Args:
+            raw_messages (list[str]): Messages encoded with Campaign.render_raw.
+            batch_uri (str, optional): The batch endpoint to post to. Defaults to the endpoint of the built service,
+                and can point at a local fake endpoint for testing.
+            http (httplib2.Http, optional): The HTTP object used to execute the batches. Defaults to the calling
+                thread's transport.
+
+        Returns:
+            list[SendResult]: One result per message, in the same order as raw_messages. Messages the batch response
+                has no readable part for, such as a response missing some of them, get an ambiguous transient result.
+        """
+        from googleapiclient.errors import HttpError
+        from googleapiclient.http import BatchHttpRequest
+
+        if not self.service:
+            raise Exception("Service not initialized. Please authenticate and build the service first.")
+
+        results = [None] * len(raw_messages)
+
+        def callback(request_id, response, exception):
+            position = int(request_id)
+            if exception is None:
+                results[position] = SendResult(SendOutcome.SENT, message_id=response.get('id'))
+            else:
+                results[position] = SendResult.from_error(exception)
+
+        for start in range(0, len(raw_messages), self.MAX_BATCH_SIZE):
+            if batch_uri:
+                batch = BatchHttpRequest(callback=callback, batch_uri=batch_uri)
+            else:
+                batch = self.service.new_batch_http_request(callback=callback)
+
+            for position in range(start, min(start + self.MAX_BATCH_SIZE, len(raw_messages))):
+                request = self.service.users().messages().send(userId='me', body={'raw': raw_messages[position]})
+                batch.add(request, request_id=str(position))
+
+            try:
+                batch.execute(http=http or self.http())
+            except Exception as e:
+                failure = SendResult.from_error(e)
+                if failure.outcome is SendOutcome.PERMANENT and not isinstance(e, HttpError):
+                    # Gmail answered, but not in a way that matches the messages: any of them may have been sent
+                    failure = SendResult(SendOutcome.TRANSIENT, error_class=failure.error_class,
+                                         error=f"Unreadable batch response: {e}", ambiguous=True)
+                for position in range(start, min(start + self.MAX_BATCH_SIZE, len(raw_messages))):
+                    if results[position] is None:
+                        results[position] = failure
+
+        # A message the batch response says nothing about may or may not have been sent
+        return [result or SendResult(SendOutcome.TRANSIENT, error="No response for this message in the batch.",
+                                     ambiguous=True) for result in results]
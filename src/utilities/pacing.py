@@ -0,0 +1,88 @@
+import threading
+import time
+
+
+
+class Pacer:
+    """
+    Hands out send slots spaced an adaptive interval apart, shared by every worker of a sending run.
+
+    Slots are granted in the order they are requested, one per message, so no matter how many sends are in flight
+    or how they are batched the global rate never exceeds one message per interval. A cancelled pacer wakes every
+    waiting caller.
+
+    The interval follows an AIMD rule on the send rate: every rate-limit response halves the rate, and every
+    success adds ADDITIVE_FRACTION of the configured rate back, until the configured interval is reached again. The
+    step scales with the configured rate, so recovering from a halving takes several successes at any interval.
+
+    Attributes:
+        base_interval (float): The configured number of seconds between two slots, the fastest the pacer goes.
+        interval (float): The current number of seconds between two granted slots.
+        next_slot (float): The monotonic time at which the next slot becomes available.
+        cancelled (Event): Set once the pacer is cancelled; pending and future acquisitions fail.
+    """
+    ADDITIVE_FRACTION = 0.1
+    MAX_INTERVAL = 600.0
+
+    def __init__(self, interval) -> None:
+        self.base_interval = float(interval)
+        self.interval = self.base_interval
+        self.next_slot = time.monotonic()
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+
+
+    def acquire(self, count=1) -> bool:
+        """
+        Reserves the next count free slots and blocks until the first of them has come. The messages of a batch
+        request go out together at that slot, and the next caller waits until all of them have been paid for.
+
+        Args:
+            count (int, optional): The number of messages to pace. Defaults to 1.
+
+        Returns:
+            bool: True once the slot is reached, False if the pacer was cancelled while waiting.
+        """
+        with self.lock:
+            slot = max(time.monotonic(), self.next_slot)
+            self.next_slot = slot + self.interval * count
+
+        wait = slot - time.monotonic()
+        if wait > 0:
+            return not self.cancelled.wait(wait)
+        return not self.cancelled.is_set()
+
+
+    def ready_at(self) -> float:
+        """
+        Returns:
+            float: The monotonic time from which the next slot can be granted, in the past if it is free already.
+        """
+        with self.lock:
+            return self.next_slot
+
+
+    def on_success(self) -> None:
+        """
+        Additively raises the send rate after a successful send, up to the configured rate.
+        """
+        with self.lock:
+            if self.interval > self.base_interval:
+                step = self.ADDITIVE_FRACTION / self.base_interval if self.base_interval else float("inf")
+                self.interval = max(self.base_interval, 1 / (1 / self.interval + step))
+
+
+    def on_rate_limited(self) -> None:
+        """
+        Halves the send rate after a rate-limit response and pushes the next slot back accordingly.
+        """
+        with self.lock:
+            self.interval = min(max(self.MAX_INTERVAL, self.base_interval), max(self.interval * 2, 1.0))
+            self.next_slot = max(self.next_slot, time.monotonic() + self.interval)
+
+
+    def cancel(self) -> None:
+        """
+        Cancels the pacer, releasing every caller currently blocked in acquire.
+        """
+        self.cancelled.set()
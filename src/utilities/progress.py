@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+
+
+@dataclass
+class ProgressSnapshot:
+    """
+    A batch of progress delivered to the user interface.
+
+    Attributes:
+        updates (dict): The latest status of every row that changed since the previous snapshot.
+        counts (dict): The number of recipients of the run currently in each status.
+        done (int): The number of recipients of the run that reached a final status.
+        total (int): The number of recipients in the run.
+        throughput (float): The average number of emails sent per minute since the run started.
+        eta (float): The estimated number of seconds until the run completes, or None before anything is done.
+    """
+    updates: dict
+    counts: dict
+    done: int
+    total: int
+    throughput: float
+    eta: float
+
+
+class ProgressChannel:
+    """
+    Aggregates status changes reported by the send workers and delivers them in batches at a fixed rate.
+
+    Workers call record for every change, which only touches a few dictionaries under a lock. A ticker thread wakes
+    every interval, and if anything changed it hands one ProgressSnapshot to the callback. Several changes of the
+    same row between two ticks collapse into its latest status.
+
+    Attributes:
+        FINAL_STATUSES (tuple[str]): The statuses that count a recipient as done.
+
+    Args:
+        total (int): The number of recipients in the run.
+        callback (callable): Called from the ticker thread with each ProgressSnapshot.
+        interval (float, optional): The number of seconds between two deliveries. Defaults to 0.1.
+    """
+    FINAL_STATUSES = ("Sent", "Failed", "Unconfirmed", "Suppressed")
+
+    def __init__(self, total, callback, interval=0.1) -> None:
+        self.total = total
+        self.callback = callback
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.updates = {}
+        self.current = {}
+        self.counts = Counter()
+        self.started_at = time.monotonic()
+        self.stopped = threading.Event()
+        self.ticker = threading.Thread(target=self.run, daemon=True)
+
+
+    def start(self) -> None:
+        """
+        Starts delivering snapshots.
+        """
+        self.started_at = time.monotonic()
+        self.ticker.start()
+
+
+    def record(self, row, status) -> None:
+        """
+        Records a status change of one recipient.
+
+        Args:
+            row (int): The table row of the recipient.
+            status (str): The new status.
+        """
+        with self.lock:
+            previous = self.current.get(row)
+            if previous is not None:
+                self.counts[previous] -= 1
+            self.current[row] = status
+            self.counts[status] += 1
+            self.updates[row] = status
+
+
+    def run(self) -> None:
+        """
+        Delivers a snapshot every interval until the channel is closed.
+        """
+        while not self.stopped.wait(self.interval):
+            self.flush()
+
+
+    def flush(self) -> None:
+        """
+        Delivers the changes recorded since the previous snapshot, if there are any.
+        """
+        with self.lock:
+            if not self.updates:
+                return
+            updates, self.updates = self.updates, {}
+            counts = {status: count for status, count in self.counts.items() if count}
+        done = sum(counts.get(status, 0) for status in self.FINAL_STATUSES)
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        throughput = counts.get("Sent", 0) / elapsed * 60
+        eta = (self.total - done) * elapsed / done if done else None
+        self.callback(ProgressSnapshot(updates, counts, done, self.total, throughput, eta))
+
+
+    def close(self) -> None:
+        """
+        Stops the ticker and delivers whatever is left.
+        """
+        self.stopped.set()
+        if self.ticker.is_alive():
+            self.ticker.join()
+        self.flush()
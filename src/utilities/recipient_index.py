@@ -0,0 +1,247 @@
+import csv
+import os
+import struct
+from array import array
+
+from ..utilities.import_cleaner import is_header_row
+
+
+class RecipientIndex:
+    """
+    A sparse byte-offset index over a recipients CSV file, built while the file is streamed.
+
+    The index stores the byte offset of every STRIDE-th row, so any row can be reached with one seek and at most
+    STRIDE - 1 skipped lines, and a streaming read can resume exactly where it stopped. It is saved next to the CSV
+    file together with the file's size and modification time, and only reused while those still match.
+
+    A header row at the top of the file is read when the index is created and is not counted as a row. Rows are read
+    as whole CSV records, so a quoted value that spans several lines stays in one row.
+
+    Attributes:
+        path (str): The path to the CSV file.
+        header (list[str]): The column titles of the file, or None if it has no header row.
+        offsets (array): The byte offset of rows 0, STRIDE, 2 * STRIDE, and so on.
+        row_count (int): The number of rows indexed so far.
+        end_offset (int): The byte offset just past the last indexed row.
+        size (int): The size of the file when it was indexed.
+        mtime_ns (int): The modification time of the file when it was indexed.
+    """
+    STRIDE = 1024
+    MAGIC = b"LMSIDX2\0"
+    HEADER = struct.Struct("<8sqqqqq")
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self.offsets = array('q')
+        self.row_count = 0
+        self.size, self.mtime_ns = self.fingerprint()
+        self.header, self.end_offset = self.read_header()
+
+
+    def read_header(self) -> tuple:
+        """
+        Reads the header row of the file, if it has one.
+
+        Returns:
+            tuple: The column titles, or None if the file has no header, and the byte offset of the first row.
+        """
+        with open(self.path, 'rb') as file:
+            lines = []
+            while len(lines) < 2:
+                line = self.read_record(file)
+                if not line:
+                    break
+                if line.strip():
+                    lines.append((line, file.tell()))
+            if not lines:
+                return None, 0
+            rows = self.parse([line for line, _ in lines])
+            if is_header_row(rows[0], rows[1] if len(rows) > 1 else None):
+                return rows[0], lines[0][1]
+        return None, 0
+
+
+    def fingerprint(self) -> tuple:
+        """
+        Returns:
+            tuple: The current (size, modification time) of the CSV file.
+        """
+        stat = os.stat(self.path)
+        return stat.st_size, stat.st_mtime_ns
+
+
+    def is_current(self) -> bool:
+        """
+        Returns:
+            bool: True if the CSV file has not changed since it was indexed.
+        """
+        return (self.size, self.mtime_ns) == self.fingerprint()
+
+
+    def is_complete(self) -> bool:
+        """
+        Returns:
+            bool: True if every row of the file has been indexed.
+        """
+        return self.end_offset >= self.size
+
+
+    def seek(self, file, row) -> None:
+        """
+        Positions an open file at the start of a row, using the nearest indexed offset.
+
+        Args:
+            file (BufferedReader): The CSV file opened in binary mode.
+            row (int): The row to position at. Must not be past row_count.
+        """
+        if row == self.row_count:
+            file.seek(self.end_offset)
+            return
+        file.seek(self.offsets[row // self.STRIDE])
+        skip = row % self.STRIDE
+        while skip:
+            line = self.read_record(file)
+            if not line:
+                return
+            if line.strip():
+                skip -= 1
+
+
+    def iter_chunks(self, chunk_size, start_row=0):
+        """
+        Streams the email addresses of the file in chunks, extending the index as new rows are passed.
+
+        Args:
+            chunk_size (int): The number of rows per chunk.
+            start_row (int, optional): The row to start from. Defaults to the first row.
+
+        Yields:
+            list[list[str]]: The rows of the next chunk, each starting with its email address.
+        """
+        with open(self.path, 'rb') as file:
+            self.seek(file, start_row)
+            row = start_row
+            chunk = []
+            while True:
+                offset = file.tell()
+                line = self.read_record(file)
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                if row == self.row_count:
+                    if row % self.STRIDE == 0:
+                        self.offsets.append(offset)
+                    self.row_count += 1
+                    self.end_offset = file.tell()
+                row += 1
+                chunk.append(line)
+                if len(chunk) == chunk_size:
+                    yield self.parse(chunk)
+                    chunk = []
+            self.end_offset = max(self.end_offset, file.tell())
+            if chunk:
+                yield self.parse(chunk)
+
+
+    def read_rows(self, start, count) -> list:
+        """
+        Reads a range of rows directly, without parsing the rows before it.
+
+        Args:
+            start (int): The first row to read. Must not be past row_count.
+            count (int): The maximum number of rows to read.
+
+        Returns:
+            list[list[str]]: The rows read, each starting with its email address.
+        """
+        lines = []
+        with open(self.path, 'rb') as file:
+            self.seek(file, start)
+            while len(lines) < count:
+                line = self.read_record(file)
+                if not line:
+                    break
+                if line.strip():
+                    lines.append(line)
+        return self.parse(lines)
+
+
+    @staticmethod
+    def read_record(file) -> bytes:
+        """
+        Reads one CSV record, which runs over several lines while a quoted value is still open.
+
+        Args:
+            file (BufferedReader): The CSV file opened in binary mode, positioned at the start of a record.
+
+        Returns:
+            bytes: The raw record with its line breaks, or an empty string at the end of the file.
+        """
+        record = file.readline()
+        while record.count(b'"') % 2:
+            line = file.readline()
+            if not line:
+                break
+            record += line
+        return record
+
+
+    @staticmethod
+    def parse(lines) -> list:
+        """
+        Parses raw CSV records.
+
+        Args:
+            lines (list[bytes]): The raw records.
+
+        Returns:
+            list[list[str]]: The stripped values of each row, with at least one value per row.
+        """
+        rows = csv.reader(line.decode('utf-8') for line in lines)
+        return [[value.strip() for value in row] or [""] for row in rows]
+
+
+    @staticmethod
+    def sidecar_path(path) -> str:
+        """
+        Returns:
+            str: The path the index of a CSV file is saved to.
+        """
+        return f"{path}.idx"
+
+
+    def save(self) -> None:
+        """
+        Writes the index next to the CSV file.
+        """
+        with open(self.sidecar_path(self.path), 'wb') as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.size, self.mtime_ns, self.row_count, self.end_offset, self.STRIDE))
+            self.offsets.tofile(file)
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads the saved index of a CSV file, or starts a new one if there is none or the file has changed since.
+
+        Args:
+            path (str): The path to the CSV file.
+
+        Returns:
+            RecipientIndex: The index of the file.
+        """
+        index = cls(path)
+        try:
+            with open(cls.sidecar_path(path), 'rb') as file:
+                magic, size, mtime_ns, row_count, end_offset, stride = cls.HEADER.unpack(file.read(cls.HEADER.size))
+                if magic != cls.MAGIC or stride != cls.STRIDE or (size, mtime_ns) != (index.size, index.mtime_ns):
+                    return index
+                offsets = array('q')
+                offsets.frombytes(file.read())
+        except (OSError, struct.error, ValueError):
+            return index
+        index.offsets = offsets
+        index.row_count = row_count
+        index.end_offset = end_offset
+        return index
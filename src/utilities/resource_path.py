@@ -20,7 +20,6 @@ def resource_path(relative_path):
 
     Notes:
         - sys._MEIPASS is used to detect if the application is running in a frozen state (packaged by PyInstaller).
-        - This function prints the resolved path, which can help in debugging and verifying the correct paths are being used.
     """
     try:
         base_path = sys._MEIPASS
@@ -31,5 +30,33 @@ def resource_path(relative_path):
         path = os.path.join(base_path, 'src', relative_path)
     else:
         path = os.path.join(base_path, 'src', relative_path)
-    print(path)
+    return path
+
+
+def user_data_path(relative_path):
+    """
+    Generates an absolute path to a file the application writes and must find again on the next launch.
+
+    In a development environment this is the same path resource_path gives. A frozen application is unpacked to a
+    new temporary folder on every launch, so its files are kept in a per-user data directory instead:
+    %LOCALAPPDATA% on Windows, ~/Library/Application Support on macOS and $XDG_DATA_HOME (~/.local/share) elsewhere.
+    The directory of the file is created if it does not exist yet.
+
+    Args:
+        relative_path (str): The relative path to the file, as it would be given to resource_path.
+
+    Returns:
+        str: The absolute path to the file.
+    """
+    if not hasattr(sys, '_MEIPASS'):
+        return resource_path(relative_path)
+
+    if sys.platform == "win32":
+        base_path = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base_path = os.path.expanduser("~/Library/Application Support")
+    else:
+        base_path = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    path = os.path.join(base_path, "LibertyMailStream", relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
     return path
@@ -0,0 +1,362 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utilities.config import config
+from ..utilities.account_pool import AccountPool
+from ..utilities.oauth import GmailService, SendOutcome, SendResult
+from ..utilities.progress import ProgressChannel
+
+
+
+def resume_pending(journal, campaign, addresses, suppressed):
+    """
+    Registers the recipients of a campaign with the send journal and works out what is left to send.
+
+    Args:
+        journal (SendJournal): The send journal.
+        campaign (Campaign): The campaign about to be sent.
+        addresses (list[str]): The address of every recipient, in list order.
+        suppressed (numpy.ndarray): A boolean mask of the suppressed recipients.
+
+    Returns:
+        tuple: The latest journaled status of every address the campaign already reached, and the (row, address)
+            of every recipient left to send, in list order.
+    """
+    journal.begin(campaign.campaign_id, addresses)
+    positions = {address: position for position, address in enumerate(addresses)}
+    pending = sorted(positions[address] for address in journal.pending(campaign.campaign_id)
+                     if address in positions and not suppressed[positions[address]])
+    return journal.settled(campaign.campaign_id), [(position, addresses[position]) for position in pending]
+
+
+class SendEngine:
+    """
+    Sends a campaign to a list of recipients. The engine has no user interface of its own: it reports through
+    callbacks, so the same sending logic runs behind the GUI and the command line.
+
+    Sends are dispatched to a bounded pool of worker threads so several messages can be in flight at once. An
+    AccountPool decides which account every group of recipients goes out from, and each account's own Pacer keeps its
+    rate at one message per configured email delay. Groups hold up to the configured batch size and share one Gmail
+    batch request: batching saves HTTP round-trips but never raises the rate, since a group takes one pacer slot per
+    message. Every state change is written to the send journal so an interrupted campaign can be resumed.
+
+    Every send result is classified. Transient failures and rate-limit responses are put on a retry queue with
+    exponential backoff and full jitter, and rate limits also slow the account's pacer down. Quota or authentication
+    failures retire the account from the run and its recipients fail over to the other accounts; once no account is
+    left the run stops with the affected recipients left pending. A send that failed after the request may have
+    reached Gmail, such as a timeout or a reset connection, is never retried automatically, since Gmail does not
+    deduplicate messages, not even on their Message-ID: the recipient is recorded as Unconfirmed, as an interrupted
+    send is on resume, for the user to decide. Retries carry the same Message-ID as the first attempt, which only
+    lets a duplicate be recognized as one.
+
+    Each group is checked against the suppression list right before it is sent, so addresses suppressed while the
+    run is going are skipped and their quota slots given back. Personalized campaigns are rendered with the merge
+    fields of each recipient.
+
+    Args:
+        pending (list[tuple]): The (row, address) of every recipient left to send.
+        accounts (list[SendingAccount]): The authenticated accounts the messages are sent from.
+        campaign (Campaign): The snapshot of the message content taken when sending was started.
+        journal (SendJournal): The journal recording every recipient state transition.
+        suppression (SuppressionList): The addresses that must not be sent to.
+        recipients (RecipientStore): The loaded recipients, holding their merge fields.
+        on_progress (callable): Called at most every 100 ms, from a background thread, with a ProgressSnapshot of the
+            changes since the previous call.
+        on_error (callable): Called with a message when the run stops because nothing more can be sent.
+    """
+    MAX_ATTEMPTS = 5
+    RETRY_BASE_DELAY = 5.0
+    RETRY_MAX_DELAY = 900.0
+
+    def __init__(self, pending, accounts, campaign, journal, suppression, recipients, on_progress, on_error) -> None:
+        self.pending = pending
+        self.campaign = campaign
+        self.journal = journal
+        self.suppression = suppression
+        self.recipients = recipients
+        self.keep_running = True
+        self.pool = AccountPool(accounts, int(config.get("PREFERENCES", "email_delay")))
+        self.worker_count = max(1, int(config.get("PREFERENCES", "send_workers")))
+        self.batch_size = max(1, min(int(config.get("PREFERENCES", "send_batch_size")), GmailService.MAX_BATCH_SIZE))
+        self.condition = threading.Condition()
+        self.retries = []
+        self.sequence = itertools.count()
+        self.attempts = {}
+        self.charges = {}
+        self.outstanding = 0
+        self.halted = False
+        self.on_error = on_error
+        self.progress = ProgressChannel(len(pending), on_progress)
+
+
+    def run(self):
+        """
+        Starts the process of sending emails. This method hands every pending recipient, and every retry once it is due,
+        to the worker pool in groups of up to the batch size, never allowing more than the configured number of groups
+        in flight. A group takes one pacer slot per message and is charged to one account as a whole. It returns once
+        nothing is left to send or retry, or when the user stops the process.
+        """
+        print("Starting email sending process.")
+        self.progress.start()
+        fresh = deque(self.pending)
+        in_flight = threading.Semaphore(self.worker_count)
+        with ThreadPoolExecutor(max_workers=self.worker_count) as executor:
+            while self.keep_running:
+                group = self.next_group(fresh)
+                if not group:
+                    break
+
+                in_flight.acquire()
+                claim = self.pool.acquire(len(group)) if self.keep_running else None
+                while claim is None and self.keep_running and self.pool.wait_for_quota():
+                    claim = self.pool.acquire(len(group))
+                if claim is None:
+                    # Nothing of the group was charged: its recipients stay Pending or Retrying in the journal
+                    in_flight.release()
+                    break
+
+                account, minutes = claim
+                fresh.extendleft(reversed(group[len(minutes):]))
+                group = group[:len(minutes)]
+                for (_, recipient), minute in zip(group, minutes):
+                    self.charges[recipient] = (account, minute)
+                self.submit_group(executor, in_flight, group, account)
+
+        if not self.keep_running:
+            print("Email sending cancelled by user.")
+        print("Email sending process completed.")
+        self.progress.close()
+
+
+    def next_group(self, fresh):
+        """
+        Collects the next group of recipients to send to. It waits for the first one, then adds the ones that are
+        ready right away, up to the batch size.
+
+        Args:
+            fresh (deque): The recipients that have not been attempted yet.
+
+        Returns:
+            list[tuple]: The (row, address) of every recipient in the group, empty if there is nothing left to send.
+        """
+        group = []
+        while len(group) < self.batch_size:
+            entry = self.next_entry(fresh, block=not group)
+            if entry is None:
+                break
+            group.append(entry)
+        return group
+
+
+    def next_entry(self, fresh, block):
+        """
+        Returns the next recipient to send to: a retry that is due, otherwise the next fresh recipient.
+
+        Args:
+            fresh (deque): The recipients that have not been attempted yet.
+            block (bool): Whether to wait for a retry to become due or for in-flight sends to schedule one.
+
+        Returns:
+            tuple: The (row, address) of the recipient, or None if there is nothing to send.
+        """
+        with self.condition:
+            while self.keep_running:
+                now = time.monotonic()
+                if self.retries and self.retries[0][0] <= now:
+                    return heapq.heappop(self.retries)[2]
+                if fresh:
+                    return fresh.popleft()
+                if not block or (not self.retries and self.outstanding == 0):
+                    return None
+                self.condition.wait(self.retries[0][0] - now if self.retries else None)
+            return None
+
+
+    def submit_group(self, executor, in_flight, group, account):
+        """
+        Drops the suppressed recipients of a group, journals the rest as Sending, hands them to the worker pool
+        and releases the group's in-flight slot once they are done.
+
+        Args:
+            executor (ThreadPoolExecutor): The worker pool.
+            in_flight (Semaphore): The semaphore bounding the number of groups in flight.
+            group (list[tuple]): The (row, address) of every recipient in the group.
+            account (SendingAccount): The account the group is sent from.
+        """
+        self.suppression.refresh()
+        suppressed = self.suppression.mask([recipient for _, recipient in group])
+        if suppressed.any():
+            for (row, recipient), is_suppressed in zip(group, suppressed):
+                if is_suppressed:
+                    self.refund(recipient)
+                    self.attempts.pop(recipient, None)
+                    self.progress.record(row, "Suppressed")
+            group = [entry for entry, is_suppressed in zip(group, suppressed) if not is_suppressed]
+            if not group:
+                in_flight.release()
+                return
+
+        self.journal.record(self.campaign.campaign_id, [recipient for _, recipient in group], "Sending")
+        for row, _ in group:
+            self.progress.record(row, "Sending")
+        with self.condition:
+            self.outstanding += len(group)
+        future = executor.submit(self.send_group, group, account)
+        future.add_done_callback(lambda _: in_flight.release())
+
+
+    def send_group(self, group, account):
+        """
+        Sends a group of emails on a worker thread and reports the resulting status of each one. A single recipient
+        is sent with a plain request, larger groups share one Gmail batch request. Messages larger than the upload
+        threshold are streamed one by one through a resumable upload instead.
+
+        Args:
+            group (list[tuple]): The (row, address) of every recipient in the group.
+            account (SendingAccount): The account the group is sent from.
+        """
+        gmail_service = account.gmail_service
+        addresses = [recipient for _, recipient in group]
+        try:
+            if self.campaign.size > GmailService.UPLOAD_THRESHOLD:
+                results = [gmail_service.send_upload(self.campaign.open_message(recipient, self.recipients.fields(row)))
+                           for row, recipient in group]
+            else:
+                if self.campaign.personalized:
+                    raw_messages = [self.campaign.render_raw(recipient, self.recipients.fields(row)) for row, recipient in group]
+                else:
+                    raw_messages = [self.campaign.render_raw(recipient) for recipient in addresses]
+                if len(group) == 1:
+                    results = [gmail_service.send_message(raw_messages[0])]
+                else:
+                    results = gmail_service.send_batch(raw_messages)
+        except Exception as e:
+            results = [SendResult.from_error(e)] * len(group)
+
+        # The group must leave the outstanding count whatever happens, or the run would wait for it forever
+        try:
+            statuses = [self.handle_result(entry, result, account) for entry, result in zip(group, results)]
+            for new_status in set(statuses):
+                self.journal.record(self.campaign.campaign_id,
+                                    [recipient for recipient, status in zip(addresses, statuses) if status == new_status],
+                                    new_status)
+
+            for (row, _), new_status in zip(group, statuses):
+                self.progress.record(row, new_status)
+        except Exception as e:
+            print(f"Error recording the results of a send: {e}")
+            self.halt(f"The results of a send could not be recorded, sending was stopped: {e}")
+        finally:
+            with self.condition:
+                self.outstanding -= len(group)
+                self.condition.notify_all()
+
+
+    def handle_result(self, entry, result, account):
+        """
+        Reacts to the outcome of one send: adjusts the account's pacer, refunds the quota slot of a message Gmail did
+        not accept, marks a message that may or may not have been sent as Unconfirmed, schedules retries, fails over to
+        the other accounts when the account can no longer send, and stops the run when no account can.
+
+        Args:
+            entry (tuple): The (row, address) of the recipient.
+            result (SendResult): The result of the send.
+            account (SendingAccount): The account the message was sent from.
+
+        Returns:
+            str: The new status of the recipient.
+        """
+        recipient = entry[1]
+        pacer = self.pool.pacer(account)
+        if result.success:
+            pacer.on_success()
+            print(f"Email sent to {recipient}: Sent")
+            return "Sent"
+
+        print(f"Error sending email to {recipient}: {result.outcome.value}: {result.error}")
+        if result.ambiguous:
+            # Gmail may have sent it and does not deduplicate: keep the quota slot and leave the decision to the user
+            return "Unconfirmed"
+        self.refund(recipient)
+
+        if result.outcome is SendOutcome.RATE_LIMITED:
+            pacer.on_rate_limited()
+
+        if result.outcome in (SendOutcome.TRANSIENT, SendOutcome.RATE_LIMITED):
+            attempt = self.attempts.get(recipient, 0) + 1
+            self.attempts[recipient] = attempt
+            if attempt < self.MAX_ATTEMPTS:
+                self.schedule_retry(entry, attempt)
+                return "Retrying"
+            return "Failed"
+
+        if result.outcome in (SendOutcome.QUOTA, SendOutcome.AUTH_EXPIRED):
+            if result.outcome is SendOutcome.QUOTA:
+                message = "Gmail reports that the sending limit has been reached."
+            else:
+                message = "The Gmail login has expired. Please sign in again."
+            if self.pool.retire(account, message):
+                self.schedule_retry(entry, 0)
+            else:
+                self.halt(message)
+            return "Pending"
+        return "Failed"
+
+
+    def refund(self, recipient):
+        """
+        Gives the quota slot charged for a recipient back to the account it was charged to, if it still holds one.
+
+        Args:
+            recipient (str): The address of the recipient.
+        """
+        charge = self.charges.pop(recipient, None)
+        if charge is not None:
+            account, minute = charge
+            account.state.refund(minute)
+
+
+    def schedule_retry(self, entry, attempt):
+        """
+        Puts a recipient back on the retry queue after an exponential backoff with full jitter.
+
+        Args:
+            entry (tuple): The (row, address) of the recipient.
+            attempt (int): The number of failed attempts so far, 0 to retry right away from another account.
+        """
+        delay = random.uniform(0, min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** (attempt - 1))) if attempt else 0
+        with self.condition:
+            heapq.heappush(self.retries, (time.monotonic() + delay, next(self.sequence), entry))
+            self.condition.notify_all()
+
+
+    def halt(self, message):
+        """
+        Stops the run because of a condition that affects every further send, reporting it once.
+
+        Args:
+            message (str): The explanation shown to the user.
+        """
+        with self.condition:
+            if self.halted:
+                return
+            self.halted = True
+        self.on_error(message)
+        self.stop()
+
+
+    def stop(self):
+        """
+        Stops the email sending process by setting the keep_running flag to False and waking any send
+        waiting on a pacer, the quota or the retry queue. Sends already in flight are allowed to complete.
+        """
+        self.keep_running = False
+        self.pool.cancel()
+        with self.condition:
+            self.condition.notify_all()
+        print("Stopping email sending process...")
@@ -0,0 +1,41 @@
+import sys
+import time
+
+
+
+class StartupTimer:
+    """
+    Records how long the application takes to reach each step of its startup, to keep the cold start measured.
+
+    Attributes:
+        started_at (float): The performance counter value the timings are measured from.
+        marks (list[tuple]): The name of every step reached and the number of seconds it took to reach it.
+    """
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.marks = []
+
+
+    def mark(self, step) -> None:
+        """
+        Records that a step of the startup has been reached.
+
+        Args:
+            step (str): A short description of the step.
+        """
+        self.marks.append((step, time.perf_counter() - self.started_at))
+
+
+    def report(self) -> None:
+        """
+        Prints the time at which every step was reached and how long it took since the previous one.
+        """
+        lines = ["Startup timing:"]
+        previous = 0.0
+        for step, elapsed in self.marks:
+            lines.append(f"  {step:<28} {elapsed * 1000:9.1f} ms  (+{(elapsed - previous) * 1000:.1f} ms)")
+            previous = elapsed
+        print("\n".join(lines), file=sys.stderr)
+
+
+startup_timer = StartupTimer()
@@ -1,100 +1,252 @@
+import atexit
 import datetime
 import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
 
-from ..utilities.resource_path import resource_path
+from ..utilities.resource_path import user_data_path
 from ..utilities.config import config
 
 
 
 class StateManager:
     """
-    Manages the application state, particularly for tracking daily email send limits and resetting them appropriately.
+    Manages the application state, particularly for tracking the email send limit over a rolling 24-hour window.
 
-    This class handles the operations related to loading, updating, and resetting the application state from a JSON file.
-    It ensures that daily limits on email sends are enforced and resets these counts when a new day starts.
+    Gmail counts its sending limit over the last 24 hours rather than per calendar day, so sends are recorded in
+    per-minute buckets kept in a deque, oldest first, together with a running total. Expired buckets are dropped from
+    the front as time moves on, which makes every query amortized O(1) and bounds the state to 1440 buckets.
+
+    Counts are kept in memory. Instead of rewriting the file on every send, the manager persists a lease: the file holds
+    the real buckets plus one extra bucket of up to LEASE_SIZE sends, dated LEASE_MINUTES ahead. Sends within the lease
+    need no disk access, however many minutes apart they are. Because the extra bucket is dated no earlier than any
+    send it stands for, the file never counts less than the real sends nor lets one expire early, so a crash can only
+    waste part of a lease, never exceed the limit. Future buckets are moved back to the current minute on load, which
+    still dates them after every send made before the crash. Every write goes to a temporary file that atomically
+    replaces the state file, so a crash mid-write leaves the previous state intact.
+
+    Every sending account has its own manager and state file, since Gmail counts the limit per account. The files are
+    kept in the user data directory, so a frozen build still counts the sends of its earlier launches.
 
     Attributes:
         path (str): The relative path to the state JSON file.
-        state (dict): A dictionary containing the current state of the application, including today's date and the count of sent emails.
-        max_email_count (int): The maximum number of emails that can be sent in a day, loaded from configuration.
+        buckets (deque): [minute, count] pairs of the sends inside the window, oldest first. Minutes are counted from the epoch.
+        sent_in_window (int): The total number of sends inside the window.
+        max_email_count (int): The maximum number of emails that can be sent in the window, loaded from configuration.
+        lease (list): The [minute, count] extra bucket of the current lease: the minute it is dated and stored under
+            and the number of sends it still covers, if any.
 
     Methods:
         get_state_from_file: Loads the application state from a JSON file.
-        update_state_file: Saves the current application state to a JSON file.
-        check_and_reset_if_new_day: Checks if the current day has changed and resets the email count if so.
-        can_send_email: Determines if an email can be sent under the daily limit.
-        increment_sent: Increments the count of sent emails if under the daily limit.
+        update_state_file: Atomically saves the application state to a JSON file.
+        expire: Drops the buckets that have left the window.
+        available_now: Returns how many emails can be sent right now.
+        next_slot_frees_at: Returns when the next send becomes possible.
+        can_send_email: Determines if an email can be sent under the limit.
+        charge: Records a send if under the limit and returns the minute it was charged to.
+        increment_sent: Records a send if under the limit.
+        refund: Gives back the slot of a send that was not delivered.
+        flush: Persists the exact counts, releasing the unused part of the lease.
+
+    Args:
+        account (str, optional): The name of an additional sending account. Defaults to the main account, whose state
+            is kept in path.
     """
     path = 'settings/state.json'
-    def __init__(self) -> None:
-        self.state:dict = self.get_state_from_file()
-        self.max_email_count = config.get("PREFERENCES", "daily_email_limit")
-        
-        self.check_and_reset_if_new_day()
+    LEASE_SIZE = 25
+    LEASE_MINUTES = 60
+    WINDOW_MINUTES = 24 * 60
+    DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+    def __init__(self, account=None) -> None:
+        self.path = StateManager.path if account is None else f'settings/state_{account}.json'
+        self.lock = threading.RLock()
+        self.max_email_count = int(config.get("PREFERENCES", "daily_email_limit"))
+        self.buckets = deque(self.get_state_from_file())
+        self.sent_in_window = sum(count for _, count in self.buckets)
+        self.lease = None
+
+        self.expire()
+        atexit.register(self.flush)
+
+
+    @staticmethod
+    def current_minute() -> int:
+        """
+        Returns:
+            int: The number of whole minutes since the epoch, the key of the current bucket.
+        """
+        return int(time.time() // 60)
 
 
-    def get_state_from_file(self) -> dict:
+    def get_state_from_file(self) -> list:
         """
-        Attempts to load the application state from a JSON file. If the file is missing or corrupted, initializes with default values.
+        Attempts to load the send buckets from a JSON file. If the file is missing, starts with an empty window.
+        If it exists but cannot be read, the limit is assumed to be used up as of now so that a damaged file can never
+        lead to exceeding it. Buckets dated in the future, as leases are, are counted in the current minute. State
+        files from before the rolling window count all their sends at their stored date.
 
         Returns:
-            dict: A dictionary representing the current state, including the date and count of sent emails.
+            list: The [minute, count] buckets, oldest first.
         """
         try:
-            with open(resource_path(StateManager.path), "r") as f:
+            with open(user_data_path(self.path), "r") as f:
                 loaded_state = json.load(f)
-                loaded_state["todays_date"] = datetime.datetime.strptime(loaded_state["todays_date"], "%Y-%m-%d %H:%M:%S.%f")
-                return loaded_state
-        except (FileNotFoundError, KeyError):
-            return {"todays_date": datetime.datetime.now(), "sent_today": 0}
+            if "buckets" in loaded_state:
+                # A lease dated in the future is brought back to now, still no earlier than the sends it covers
+                now = self.current_minute()
+                buckets = {}
+                for minute, count in loaded_state["buckets"]:
+                    minute = min(int(minute), now)
+                    buckets[minute] = buckets.get(minute, 0) + int(count)
+                return sorted([minute, count] for minute, count in buckets.items())
+            todays_date = datetime.datetime.strptime(loaded_state["todays_date"], self.DATE_FORMAT)
+            return [[int(todays_date.timestamp() // 60), int(loaded_state["sent_today"])]]
+        except FileNotFoundError:
+            return []
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"State file is unreadable ({e}), assuming the daily limit has been reached.")
+            return [[self.current_minute(), self.max_email_count]]
 
 
     def update_state_file(self) -> None:
         """
-        Saves the current state to a JSON file, ensuring the date is properly formatted as a string.
+        Atomically saves the send buckets to a JSON file, followed by the extra bucket of the current lease.
+        """
+        buckets = [list(bucket) for bucket in self.buckets]
+        if self.lease and self.lease[1] > 0:
+            buckets.append(list(self.lease))
+
+        state_path = user_data_path(self.path)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(state_path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"buckets": buckets}, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, state_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+    def expire(self) -> None:
+        """
+        Drops the buckets that have fallen out of the rolling window.
+        """
+        with self.lock:
+            horizon = self.current_minute() - self.WINDOW_MINUTES
+            while self.buckets and self.buckets[0][0] <= horizon:
+                self.sent_in_window -= self.buckets.popleft()[1]
+
+
+    def available_now(self) -> int:
+        """
+        Returns how many emails can be sent right now without exceeding the limit.
+
+        Returns:
+            int: The number of free slots in the window.
         """
-        self.max_email_count = config.get("DEFAULT","daily_email_limit")
-        temp_state = self.state.copy()
-        temp_state["todays_date"] = temp_state["todays_date"].strftime("%Y-%m-%d %H:%M:%S.%f")
-        with open(resource_path(StateManager.path), "w") as f:
-            json.dump(temp_state, f, indent=4)
+        with self.lock:
+            self.expire()
+            return max(0, self.max_email_count - self.sent_in_window)
 
 
-    def check_and_reset_if_new_day(self) -> None:
+    def next_slot_frees_at(self) -> datetime.datetime:
         """
-        Checks if the current date has changed since the last saved state and resets the sent email count if a new day has started.
+        Returns when the next send becomes possible: now if a slot is free, otherwise when the oldest bucket leaves the window.
+
+        Returns:
+            datetime.datetime: The local time at which the next slot is free.
         """
-        if datetime.datetime.now() - self.state["todays_date"] >= datetime.timedelta(days=1):
-            self.state["todays_date"] = datetime.datetime.now()
-            self.state["sent_today"] = 0
-            self.update_state_file()
+        with self.lock:
+            self.expire()
+            if self.sent_in_window < self.max_email_count or not self.buckets:
+                return datetime.datetime.now()
+            return datetime.datetime.fromtimestamp((self.buckets[0][0] + self.WINDOW_MINUTES) * 60)
 
 
     def can_send_email(self) -> bool:
         """
-        Determines if another email can be sent under the daily limit.
+        Determines if another email can be sent under the limit.
+
+        Returns:
+            bool: True if the number of sends in the window is below the limit, False otherwise.
+        """
+        return self.available_now() > 0
+
+
+    def charge(self):
+        """
+        Records a send in the current minute's bucket if it's below the limit. The state file is only written when
+        the current lease is used up or has reached the minute it is dated, in which case a new lease is persisted
+        before the send is allowed.
 
         Returns:
-            bool: True if the count of sent emails is below the daily limit, False otherwise.
+            int: The minute the send was recorded in, to be passed to refund if the send fails, or None if the limit
+                has been reached.
         """
-        return self.state["sent_today"] < int(self.max_email_count)
+        with self.lock:
+            if not self.can_send_email():
+                return None
+
+            minute = self.current_minute()
+            if self.buckets and self.buckets[-1][0] == minute:
+                self.buckets[-1][1] += 1
+            else:
+                self.buckets.append([minute, 1])
+            self.sent_in_window += 1
+
+            if self.lease and self.lease[0] > minute and self.lease[1] > 0:
+                self.lease[1] -= 1
+            else:
+                headroom = min(self.LEASE_SIZE - 1, self.max_email_count - self.sent_in_window)
+                self.lease = [minute + self.LEASE_MINUTES, headroom]
+                self.update_state_file()
+            return minute
 
 
     def increment_sent(self) -> bool:
         """
-        Increments the count of sent emails if it's below the daily limit, updating the state file accordingly.
+        Records a send if it's below the limit.
 
         Returns:
-            bool: True if the increment was successful, False if the daily limit has been reached.
+            bool: True if the send was recorded, False if the limit has been reached.
+        """
+        return self.charge() is not None
+
+
+    def refund(self, minute) -> None:
+        """
+        Gives back a slot charged for a send that Gmail is known not to have delivered. The slot is taken from the
+        bucket it was charged to, so the window never counts it as expiring later than the real send would have.
+        The persisted counts are left as they are, which is the safe side after a crash.
+
+        Args:
+            minute (int): The minute returned by charge for the failed send.
+        """
+        with self.lock:
+            for bucket in reversed(self.buckets):
+                if bucket[0] == minute:
+                    if bucket[1] > 0:
+                        bucket[1] -= 1
+                        self.sent_in_window -= 1
+                    return
+                if bucket[0] < minute:
+                    return
+
+
+    def flush(self) -> None:
+        """
+        Persists the exact counts, releasing the unused part of the current lease. Called on a clean exit.
         """
-        if self.can_send_email():
-            self.state["sent_today"] += 1
-            self.update_state_file()
-            return True
-        return False
+        with self.lock:
+            if self.lease:
+                self.lease = None
+                self.update_state_file()
 
 
 state_manager = StateManager()
-print("State manager loaded")
-print(f"Lockout Date: {state_manager.state['todays_date']}")
-print(f"        Sent: {state_manager.state['sent_today']}")
@@ -0,0 +1,184 @@
+import csv
+import os
+import struct
+import tempfile
+import threading
+
+from ..utilities.address_normalizer import AddressNormalizer
+
+
+
+class SuppressionList:
+    """
+    The addresses that must never be sent to: unsubscribed, bounced or do-not-contact recipients.
+
+    The list itself is a CSV file of addresses that can be edited by hand or appended to by the application. For
+    lookups it is kept as a sorted numpy array of the 64-bit hashes of the canonical form of every address, so checking
+    a whole chunk of recipients is one vectorized hash and one binary search per address in C. The array is saved in
+    a sidecar next to the CSV file together with the file's size and modification time, and rebuilt when those change.
+    Nothing is read, and numpy and pandas are not imported, until the list is first used.
+
+    Attributes:
+        path (str): The path to the suppression CSV file.
+        keys (numpy.ndarray): The sorted, unique hashes of the suppressed addresses, or None until the list is first
+            refreshed.
+        normalizer (AddressNormalizer): Defines the canonical form the addresses are compared on.
+    """
+    MAGIC = b"LMSSUP1\0"
+    HEADER = struct.Struct("<8sqq64s")
+
+    def __init__(self, path, normalizer=None) -> None:
+        self.path = path
+        self.normalizer = normalizer or AddressNormalizer.from_config()
+        self.lock = threading.Lock()
+        self.keys = None
+        self.fingerprint = None
+
+
+    def sidecar_path(self) -> str:
+        """
+        Returns:
+            str: The path the sorted hashes are saved to.
+        """
+        return f"{self.path}.keys"
+
+
+    def current_fingerprint(self) -> tuple:
+        """
+        Returns:
+            tuple: The (size, modification time) of the CSV file, or None if it does not exist.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+
+    def hash(self, addresses) -> "numpy.ndarray":
+        """
+        Hashes the canonical form of many addresses at once. The canonical forms are made one by one, which with
+        the rules cached per domain is faster than pandas string operations on object arrays; the hashing is vectorized.
+
+        Args:
+            addresses (list[str]): The email addresses.
+
+        Returns:
+            numpy.ndarray: The 64-bit hash of every address.
+        """
+        import numpy as np
+        import pandas as pd
+
+        canonical = np.array(list(map(self.normalizer.canonical, addresses)), dtype=object)
+        return pd.util.hash_array(canonical, categorize=False)
+
+
+    def refresh(self) -> None:
+        """
+        Brings the hashes up to date with the CSV file, loading them from the sidecar if it still matches the file
+        and rebuilding them from the file otherwise.
+        """
+        import numpy as np
+
+        with self.lock:
+            fingerprint = self.current_fingerprint()
+            if self.keys is not None and fingerprint == self.fingerprint:
+                return
+            if fingerprint is None:
+                self.keys = np.empty(0, dtype=np.uint64)
+                self.fingerprint = None
+                return
+            if not self.load_sidecar(fingerprint):
+                with open(self.path, mode='r', encoding='utf-8') as file:
+                    addresses = [row[0].strip() for row in csv.reader(file) if row and row[0].strip()]
+                self.keys = np.unique(self.hash(addresses))
+                self.fingerprint = fingerprint
+                self.save_sidecar()
+
+
+    def load_sidecar(self, fingerprint) -> bool:
+        """
+        Loads the saved hashes if they were made from the current CSV file with the current normalization settings.
+
+        Args:
+            fingerprint (tuple): The current (size, modification time) of the CSV file.
+
+        Returns:
+            bool: True if the hashes were loaded.
+        """
+        import numpy as np
+
+        try:
+            with open(self.sidecar_path(), 'rb') as file:
+                magic, size, mtime_ns, signature = self.HEADER.unpack(file.read(self.HEADER.size))
+                if magic != self.MAGIC or (size, mtime_ns) != fingerprint \
+                        or signature.rstrip(b"\0").decode() != self.normalizer.signature:
+                    return False
+                keys = np.fromfile(file, dtype=np.uint64)
+        except (OSError, struct.error, ValueError):
+            return False
+        self.keys = keys
+        self.fingerprint = fingerprint
+        return True
+
+
+    def save_sidecar(self) -> None:
+        """
+        Atomically writes the hashes next to the CSV file.
+        """
+        sidecar_path = self.sidecar_path()
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(sidecar_path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                size, mtime_ns = self.fingerprint
+                file.write(self.HEADER.pack(self.MAGIC, size, mtime_ns, self.normalizer.signature.encode()))
+                self.keys.tofile(file)
+            os.replace(temp_path, sidecar_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+    def mask(self, addresses) -> "numpy.ndarray":
+        """
+        Checks many addresses against the list at once.
+
+        Args:
+            addresses (list[str]): The email addresses to check.
+
+        Returns:
+            numpy.ndarray: A boolean mask of the addresses that are suppressed.
+        """
+        import numpy as np
+
+        if self.keys is None:
+            self.refresh()
+        with self.lock:
+            keys = self.keys
+        if len(addresses) == 0 or len(keys) == 0:
+            return np.zeros(len(addresses), dtype=bool)
+        hashes = self.hash(addresses)
+        positions = np.minimum(np.searchsorted(keys, hashes), len(keys) - 1)
+        return keys[positions] == hashes
+
+
+    def add(self, addresses) -> None:
+        """
+        Appends addresses to the suppression CSV file and merges them into the hashes.
+
+        Args:
+            addresses (list[str]): The email addresses to suppress.
+        """
+        import numpy as np
+
+        if not addresses:
+            return
+        self.refresh()
+        with self.lock:
+            with open(self.path, mode='a', encoding='utf-8', newline='') as file:
+                writer = csv.writer(file)
+                for address in addresses:
+                    writer.writerow([address])
+            self.keys = np.union1d(self.keys, self.hash(addresses))
+            self.fingerprint = self.current_fingerprint()
+            self.save_sidecar()
@@ -0,0 +1,103 @@
+import html
+import re
+
+
+
+PLACEHOLDER = re.compile(r"\{\{\s*([^{}|]+?)\s*(?:\|\s*([^{}]*?)\s*)?\}\}")
+
+
+def field_key(name) -> str:
+    """
+    Returns the key a merge field is matched on, so that a placeholder like {{First Name}} finds a CSV column titled
+    "first_name" and the other way around.
+
+    Args:
+        name (str): The name of a placeholder or column.
+
+    Returns:
+        str: The lowercased name, with runs of spaces, dashes and underscores turned into single underscores.
+    """
+    return re.sub(r"[\s_-]+", "_", name.strip().lower())
+
+
+class MergeTemplate:
+    """
+    A text with {{field}} placeholders, compiled once into a format string so that filling it in for a recipient is
+    a single str.format call. A placeholder can give a default after a bar, as in {{first_name|there}}, which is used
+    when the recipient has no value for the field.
+
+    Attributes:
+        text (str): The source text.
+        fields (tuple[str]): The keys of the fields the text uses, in order of first appearance.
+        defaults (dict): The default value of every field that has one.
+        escape (callable): Applied to every value before it is inserted, such as html.escape for HTML content.
+    """
+    def __init__(self, text, escape=None) -> None:
+        self.text = text
+        self.escape = escape
+        self.defaults = {}
+        fields = []
+        parts = []
+        position = 0
+        for match in PLACEHOLDER.finditer(text):
+            parts.append(self.escape_braces(text[position:match.start()]))
+            key = field_key(match.group(1))
+            if key not in fields:
+                fields.append(key)
+            if match.group(2) is not None:
+                self.defaults.setdefault(key, match.group(2))
+            parts.append(f"{{{fields.index(key)}}}")
+            position = match.end()
+        parts.append(self.escape_braces(text[position:]))
+        self.fields = tuple(fields)
+        self.format_string = "".join(parts)
+
+
+    @staticmethod
+    def escape_braces(literal) -> str:
+        """
+        Returns:
+            str: The literal text with its braces doubled, so str.format leaves them as they are.
+        """
+        return literal.replace("{", "{{").replace("}", "}}")
+
+
+    @classmethod
+    def for_html(cls, text):
+        """
+        Compiles an HTML template, whose values are HTML escaped.
+
+        Args:
+            text (str): The HTML source.
+
+        Returns:
+            MergeTemplate: The compiled template.
+        """
+        return cls(text, escape=html.escape)
+
+
+    @property
+    def is_static(self) -> bool:
+        """
+        Returns:
+            bool: True if the text has no placeholders and renders the same for everyone.
+        """
+        return not self.fields
+
+
+    def render(self, values) -> str:
+        """
+        Fills in the placeholders for one recipient.
+
+        Args:
+            values (dict): The recipient's values, keyed by field key.
+
+        Returns:
+            str: The rendered text.
+        """
+        if not self.fields:
+            return self.text
+        filled = [values.get(key) or self.defaults.get(key, "") for key in self.fields]
+        if self.escape:
+            filled = [self.escape(value) for value in filled]
+        return self.format_string.format(*filled)
@@ -0,0 +1,60 @@
+import datetime
+import os
+import sys
+
+import pytest
+
+
+
+# Resources are looked up relative to the working directory, as when the application is started from the repository
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+from src.utilities.account_pool import SendingAccount
+
+
+class FakeState:
+    """
+    An in-memory quota ledger with a fixed capacity, standing in for StateManager.
+
+    Attributes:
+        capacity (int): The number of sends the window allows.
+        used (int): The number of sends charged and not refunded.
+        refunds (int): The number of refunds received.
+    """
+    def __init__(self, capacity) -> None:
+        self.capacity = capacity
+        self.used = 0
+        self.refunds = 0
+
+
+    def available_now(self) -> int:
+        return self.capacity - self.used
+
+
+    def charge(self):
+        if self.used >= self.capacity:
+            return None
+        self.used += 1
+        return 1
+
+
+    def refund(self, minute) -> None:
+        self.used -= 1
+        self.refunds += 1
+
+
+    def next_slot_frees_at(self) -> datetime.datetime:
+        return datetime.datetime.now() + datetime.timedelta(hours=1)
+
+
+@pytest.fixture
+def make_account():
+    """
+    Returns:
+        callable: Builds a SendingAccount with the given name, service and capacity, whose ledger is a FakeState.
+    """
+    def make(name, gmail_service=None, capacity=100) -> SendingAccount:
+        return SendingAccount(name, gmail_service, FakeState(capacity))
+    return make
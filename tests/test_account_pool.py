@@ -0,0 +1,88 @@
+import time
+from collections import Counter
+
+import pytest
+
+from src.utilities.account_pool import AccountPool
+
+
+
+@pytest.fixture
+def pool(make_account):
+    """
+    Returns:
+        callable: Builds an AccountPool of accounts named account0, account1... with the given capacities.
+    """
+    def make(*capacities, interval=0) -> AccountPool:
+        return AccountPool([make_account(f"account{i}", capacity=capacity) for i, capacity in enumerate(capacities)],
+                           interval)
+    return make
+
+
+def test_sends_are_split_in_proportion_to_capacity(pool):
+    accounts = pool(40, 10)
+
+    picks = Counter(accounts.acquire()[0].name for _ in range(50))
+
+    assert picks == {"account0": 40, "account1": 10}
+    assert accounts.pick() is None
+
+
+def test_picks_are_interleaved(pool):
+    accounts = pool(1000, 1000)
+
+    names = [accounts.pick().name for _ in range(6)]
+
+    assert names.count("account0") == names.count("account1") == 3
+    assert all(first != second for first, second in zip(names, names[1:]))
+
+
+def test_credits_stay_bounded(pool):
+    accounts = pool(1000, 10, 0)
+
+    for _ in range(500):
+        accounts.pick()
+
+    assert all(abs(credit) <= 1010 for credit in accounts.credits.values())
+    assert sum(accounts.credits.values()) == 0
+
+
+def test_slowed_down_accounts_are_picked_less(pool):
+    accounts = pool(1000, 1000, interval=1)
+    accounts.pacers["account1"].interval = 4
+
+    picks = Counter(accounts.pick().name for _ in range(500))
+
+    assert picks == {"account0": 400, "account1": 100}
+
+
+def test_retired_accounts_are_not_picked(pool):
+    accounts = pool(10, 10)
+    first, second = accounts.accounts
+
+    assert accounts.retire(first, "limit reached")
+    assert {accounts.pick().name for _ in range(5)} == {"account1"}
+    assert not accounts.retire(second, "login expired")
+    assert accounts.pick() is None
+    assert accounts.retired == {"account0": "limit reached", "account1": "login expired"}
+
+
+def test_acquire_charges_a_group_up_to_the_capacity(make_account):
+    accounts = AccountPool([make_account("main", capacity=3)], 0)
+
+    account, minutes = accounts.acquire(5)
+
+    assert account.name == "main"
+    assert minutes == [1, 1, 1]
+
+
+def test_acquire_paces_every_message_of_a_group(make_account):
+    accounts = AccountPool([make_account("main", capacity=3)], 10)
+
+    start = time.monotonic()
+    account, minutes = accounts.acquire(5)
+
+    # Only the three sends the account can still make are paid for
+    assert len(minutes) == 3
+    assert accounts.pacer(account).ready_at() >= start + 30
+    assert accounts.pacer(account).ready_at() < start + 40
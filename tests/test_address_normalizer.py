@@ -0,0 +1,33 @@
+from src.utilities.address_normalizer import AddressNormalizer
+
+
+
+def test_gmail_addresses_collapse_to_one_mailbox():
+    normalizer = AddressNormalizer()
+
+    assert normalizer.canonical("John.Smith+news@Gmail.com") == "johnsmith@gmail.com"
+    assert normalizer.canonical("johnsmith@googlemail.com") == "johnsmith@gmail.com"
+
+
+def test_provider_tags_are_stripped_but_dots_kept():
+    assert AddressNormalizer().canonical("Jane.Doe+tag@Outlook.com") == "jane.doe@outlook.com"
+
+
+def test_unknown_domains_keep_their_local_part_by_default():
+    assert AddressNormalizer().canonical("Jane.Doe+tag@Example.COM") == "Jane.Doe+tag@example.com"
+
+
+def test_unknown_domains_fold_case_when_asked():
+    normalizer = AddressNormalizer(fold_local_part=True)
+
+    assert normalizer.canonical("Jane.Doe+tag@Example.COM") == "jane.doe+tag@example.com"
+    assert normalizer.signature != AddressNormalizer().signature
+
+
+def test_rules_are_compiled_once_per_domain():
+    normalizer = AddressNormalizer()
+
+    normalizer.canonical("a@Example.com")
+    normalizer.canonical("b@example.COM")
+
+    assert list(normalizer.rules) == ["example.com"]
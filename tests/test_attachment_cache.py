@@ -0,0 +1,80 @@
+import base64
+import os
+
+from src.utilities.attachment_cache import AttachmentCache
+
+
+
+def write(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_a_file_is_encoded_as_mime_base64(tmp_path):
+    content = bytes(range(256)) * 4
+    path = write(tmp_path / "data.bin", content)
+
+    encoded = AttachmentCache().encoded(path)
+
+    assert base64.b64decode(encoded) == content
+    assert max(len(line) for line in encoded.splitlines()) == 76
+
+
+def test_the_same_content_is_encoded_once(tmp_path, monkeypatch):
+    first = write(tmp_path / "a.txt", b"same content")
+    second = write(tmp_path / "b.txt", b"same content")
+    cache = AttachmentCache()
+    encodings = []
+    monkeypatch.setattr(base64, "encodebytes", lambda content: encodings.append(content) or b"encoded\n")
+
+    cache.encoded(first)
+    cache.encoded(second)
+    cache.encoded(first)
+
+    assert len(encodings) == 1
+    assert len(cache.entries) == 1
+
+
+def test_a_changed_file_is_read_again(tmp_path):
+    path = write(tmp_path / "a.txt", b"before")
+    cache = AttachmentCache()
+    before = cache.digest(path)
+
+    write(tmp_path / "a.txt", b"after!")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert cache.digest(path) != before
+    assert base64.b64decode(cache.encoded(path)) == b"after!"
+
+
+def test_large_files_are_memory_mapped(tmp_path, monkeypatch):
+    monkeypatch.setattr(AttachmentCache, "MMAP_THRESHOLD", 10)
+    content = os.urandom(1000)
+    path = write(tmp_path / "large.bin", content)
+
+    assert base64.b64decode(AttachmentCache().encoded(path)) == content
+
+
+def test_least_recently_used_encodings_are_evicted(tmp_path):
+    paths = [write(tmp_path / f"{name}.txt", name.encode() * 30) for name in "abc"]
+    cache = AttachmentCache(max_bytes=100)
+
+    cache.encoded(paths[0])
+    cache.encoded(paths[1])
+    cache.encoded(paths[0])
+    cache.encoded(paths[2])
+
+    assert list(cache.entries) == [cache.digest(paths[0]), cache.digest(paths[2])]
+    assert cache.size == sum(len(encoded) for encoded in cache.entries.values())
+
+
+def test_parts_carry_the_file_name_and_type(tmp_path):
+    path = write(tmp_path / "report.pdf", b"%PDF-1.4")
+
+    part = AttachmentCache().part(path)
+
+    assert part.get_content_type() == "application/pdf"
+    assert part.get_filename() == "report.pdf"
+    assert part["Content-Transfer-Encoding"] == "base64"
+    assert part.get_payload(decode=True) == b"%PDF-1.4"
@@ -0,0 +1,105 @@
+import base64
+import email
+import email.policy
+
+from src.utilities.campaign import Campaign
+
+
+
+def decode(raw) -> email.message.EmailMessage:
+    return email.message_from_bytes(base64.urlsafe_b64decode(raw), policy=email.policy.default)
+
+
+def bodies(message) -> dict:
+    return {part.get_content_type(): part.get_content() for part in message.walk() if not part.is_multipart()}
+
+
+def test_static_message_round_trips():
+    campaign = Campaign("Monthly news", "<p>Hello <b>all</b></p>", "Hello all")
+
+    message = decode(campaign.render_raw("ann@example.com"))
+
+    assert message["To"] == "ann@example.com"
+    assert message["Subject"] == "Monthly news"
+    assert message["Message-ID"] == campaign.message_id("ann@example.com")
+    parts = bodies(message)
+    assert parts["text/plain"].strip() == "Hello all"
+    assert "<b>all</b>" in parts["text/html"]
+
+
+def test_every_recipient_gets_their_own_headers():
+    campaign = Campaign("News", "<p>Hi</p>", "Hi")
+
+    first, second = (decode(campaign.render_raw(to)) for to in ("a@example.com", "bob@example.org"))
+
+    assert first["To"] == "a@example.com" and second["To"] == "bob@example.org"
+    assert first["Message-ID"] != second["Message-ID"]
+    assert bodies(first) == bodies(second)
+
+
+def test_message_id_is_stable_across_retries():
+    campaign = Campaign("News", "<p>Hi</p>", "Hi")
+
+    assert campaign.message_id("a@example.com") == Campaign("News", "<p>Hi</p>", "Hi").message_id("a@example.com")
+    assert campaign.message_id("a@example.com") != Campaign("Other", "<p>Hi</p>", "Hi").message_id("a@example.com")
+
+
+def test_unicode_subject_round_trips():
+    campaign = Campaign("Café news ✓", "<p>Hi</p>", "Hi")
+
+    assert decode(campaign.render_raw("ann@example.com"))["Subject"] == "Café news ✓"
+
+
+def test_rendering_does_not_change_the_campaign():
+    campaign = Campaign("News", "<p>Hi</p>", "Hi")
+    first = campaign.render_raw("a@example.com")
+
+    campaign.render_raw("someone.else@example.com")
+
+    assert campaign.render_raw("a@example.com") == first
+
+
+def test_personalized_message_round_trips():
+    campaign = Campaign("Hi {{First Name|there}}", "<p>Dear {{first_name}}, {{city}}</p>", "Dear {{first_name}}")
+
+    message = decode(campaign.render_raw("ann@example.com", {"first_name": "Zoë", "city": "<Paris>"}))
+
+    assert message["Subject"] == "Hi Zoë"
+    parts = bodies(message)
+    assert parts["text/plain"].strip() == "Dear Zoë"
+    assert "Dear Zoë, &lt;Paris&gt;" in parts["text/html"]
+
+
+def test_personalized_message_uses_defaults():
+    campaign = Campaign("Hi {{first_name|there}}", "<p>Hi</p>", "Hi {{first_name|there}}")
+
+    message = decode(campaign.render_raw("ann@example.com", {}))
+
+    assert message["Subject"] == "Hi there"
+    assert bodies(message)["text/plain"].strip() == "Hi there"
+
+
+def test_attachments_are_sent_with_every_message(tmp_path):
+    attachment = tmp_path / "report.txt"
+    attachment.write_bytes(b"quarterly figures")
+    campaign = Campaign("Report", "<p>Attached</p>", "Attached", (str(attachment),))
+
+    for to in ("ann@example.com", "bob@example.com"):
+        message = decode(campaign.render_raw(to))
+
+        files = [part for part in message.walk() if part.get_filename()]
+        assert [part.get_filename() for part in files] == ["report.txt"]
+        assert files[0].get_payload(decode=True) == b"quarterly figures"
+
+
+def test_render_raw_matches_the_uploaded_stream():
+    campaign = Campaign("Hi {{first_name}}", "<p>Hi {{first_name}}</p>", "Hi")
+    fields = {"first_name": "Ann"}
+
+    streamed = email.message_from_bytes(campaign.open_message("ann@example.com", fields).read(),
+                                        policy=email.policy.default)
+    encoded = decode(campaign.render_raw("ann@example.com", fields))
+
+    assert streamed["To"] == encoded["To"]
+    assert streamed["Subject"] == encoded["Subject"] == "Hi Ann"
+    assert bodies(streamed) == bodies(encoded)
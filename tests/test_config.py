@@ -0,0 +1,32 @@
+import pytest
+
+from src.utilities.config import Config
+
+
+
+@pytest.fixture
+def frozen_config(tmp_path, monkeypatch):
+    """
+    Points Config at a bundled defaults file and a separate user copy, as in the one-file build.
+    """
+    defaults = tmp_path / "bundle" / "config.cfg"
+    defaults.parent.mkdir()
+    defaults.write_text("[PREFERENCES]\nemail_delay = 300\ntheme = dark\n\n[ACCOUNTS]\nnames =\n")
+    monkeypatch.setattr(Config, "defaults_path", str(defaults))
+    monkeypatch.setattr(Config, "path", str(tmp_path / "user" / "config.cfg"))
+    (tmp_path / "user").mkdir()
+    return defaults
+
+
+def test_defaults_are_read_from_the_bundle(frozen_config):
+    assert Config().get("PREFERENCES", "email_delay") == "300"
+
+
+def test_changes_are_saved_to_the_user_copy_and_read_back(frozen_config):
+    Config().set("ACCOUNTS", "names", "work")
+
+    reloaded = Config()
+
+    assert reloaded.get("ACCOUNTS", "names") == "work"
+    assert reloaded.get("PREFERENCES", "theme") == "dark"
+    assert "work" not in frozen_config.read_text()
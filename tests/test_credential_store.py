@@ -0,0 +1,135 @@
+import datetime
+import os
+
+import pytest
+
+from src.utilities import credential_store
+from src.utilities.credential_store import CredentialStore, TokenRefresher
+
+
+
+SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(credential_store, "user_data_path", lambda path: str(tmp_path / path.replace("/", "_")))
+    monkeypatch.setattr(credential_store.sys, "platform", "linux")
+    return tmp_path
+
+
+@pytest.fixture
+def keychain():
+    keyring = pytest.importorskip("keyring")
+    from keyring.backend import KeyringBackend
+    from keyring.errors import PasswordDeleteError
+
+    class MemoryKeyring(KeyringBackend):
+        priority = 1
+
+        def get_password(self, service, username):
+            return self.entries.get((service, username))
+
+        def set_password(self, service, username, password):
+            self.entries[(service, username)] = password
+
+        def delete_password(self, service, username):
+            if self.entries.pop((service, username), None) is None:
+                raise PasswordDeleteError(username)
+
+    previous = keyring.get_keyring()
+    backend = MemoryKeyring()
+    backend.entries = {}
+    keyring.set_keyring(backend)
+    yield backend
+    keyring.set_keyring(previous)
+
+
+@pytest.fixture
+def no_keychain():
+    keyring = pytest.importorskip("keyring")
+    from keyring.backends.fail import Keyring
+
+    previous = keyring.get_keyring()
+    keyring.set_keyring(Keyring())
+    yield
+    keyring.set_keyring(previous)
+
+
+def make_credentials(client_id="client", scopes=SCOPES):
+    pytest.importorskip("google.oauth2")
+    from google.oauth2.credentials import Credentials
+
+    return Credentials("token", refresh_token="refresh", token_uri="https://oauth2.googleapis.com/token",
+                       client_id=client_id, client_secret="secret", scopes=scopes)
+
+
+def test_credentials_are_kept_in_the_keychain(keychain, data_dir):
+    store = CredentialStore()
+
+    store.save(make_credentials())
+
+    assert (data_dir / "settings_credentials.dat").read_bytes() == CredentialStore.KEYRING
+    assert (CredentialStore.KEYRING_SERVICE, "credentials") in keychain.entries
+    assert store.load("client", SCOPES).refresh_token == "refresh"
+
+
+def test_without_a_keychain_credentials_are_written_for_this_user_only(no_keychain, data_dir, capsys):
+    store = CredentialStore()
+
+    store.save(make_credentials())
+
+    path = data_dir / "settings_credentials.dat"
+    assert path.read_bytes().startswith(CredentialStore.PLAIN)
+    assert os.stat(path).st_mode & 0o077 == 0
+    assert "UNENCRYPTED" in capsys.readouterr().out
+    assert store.load("client", SCOPES).token == "token"
+
+
+def test_credentials_for_another_client_or_fewer_scopes_are_not_used(keychain):
+    store = CredentialStore()
+    store.save(make_credentials())
+
+    assert store.load("other client", SCOPES) is None
+    assert store.load("client", SCOPES + ["https://www.googleapis.com/auth/gmail.readonly"]) is None
+
+
+def test_accounts_have_their_own_entries(keychain):
+    CredentialStore().save(make_credentials())
+    CredentialStore("second").save(make_credentials(client_id="second client"))
+
+    assert CredentialStore().load("client", SCOPES) is not None
+    assert CredentialStore("second").load("second client", SCOPES) is not None
+
+
+def test_unreadable_credentials_mean_signing_in_again(keychain, data_dir):
+    (data_dir / "settings_credentials.dat").write_bytes(b"garbage")
+    assert CredentialStore().load("client", SCOPES) is None
+
+    (data_dir / "settings_credentials.dat").write_bytes(CredentialStore.KEYRING)
+    assert CredentialStore().load("client", SCOPES) is None
+
+
+def test_clear_removes_the_file_and_the_keychain_entry(keychain, data_dir):
+    store = CredentialStore()
+    store.save(make_credentials())
+
+    store.clear()
+    store.clear()
+
+    assert not (data_dir / "settings_credentials.dat").exists()
+    assert keychain.entries == {}
+    assert store.load("client", SCOPES) is None
+
+
+def test_the_token_is_renewed_ahead_of_its_expiry():
+    credentials = make_credentials()
+    refresher = TokenRefresher(credentials, CredentialStore())
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+    credentials.expiry = now + datetime.timedelta(seconds=TokenRefresher.REFRESH_MARGIN + 60)
+    assert 55 <= refresher.seconds_until_refresh() <= 60
+    credentials.expiry = now + datetime.timedelta(seconds=10)
+    assert refresher.seconds_until_refresh() == 0
+    credentials.token = None
+    assert refresher.seconds_until_refresh() == 0
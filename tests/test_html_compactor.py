@@ -0,0 +1,46 @@
+from src.utilities.html_compactor import compact_html, compact_style, html_to_text
+
+
+
+QT_HTML = """<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0//EN" "http://www.w3.org/TR/REC-html40/strict.dtd">
+<html><head><meta name="qrichtext" content="1" /><style type="text/css">
+p, li { white-space: pre-wrap; }
+</style></head><body style=" font-family:'Sans'; font-size:10pt; font-weight:400; font-style:normal;">
+<p style=" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;">Hello  <span style=" font-weight:700;">all</span></p>
+<p style="-qt-paragraph-type:empty; margin-top:12px; margin-bottom:0px; margin-left:0px; margin-right:0px;"><br /></p></body></html>"""
+
+
+def test_qt_markup_is_compacted():
+    html = compact_html(QT_HTML)
+
+    assert html == ("<html><head><style>p,li{white-space:pre-wrap}</style></head>"
+                    "<body style=\"font-family:'Sans';font-size:10pt\">"
+                    "<p style=\"margin:0\">Hello  <span style=\"font-weight:700\">all</span></p>"
+                    "<p style=\"margin:12px 0px 0px 0px\"><br></p></body></html>")
+
+
+def test_compacting_keeps_the_text():
+    assert html_to_text(compact_html(QT_HTML)) == html_to_text(QT_HTML) == "Hello  all"
+
+
+def test_defaults_are_only_dropped_where_given():
+    assert compact_style("font-weight:400; color:red") == "font-weight:400;color:red"
+    assert compact_style("font-weight:400; color:red", {"font-weight": "400"}) == "color:red"
+
+
+def test_partial_margins_are_kept_apart():
+    assert compact_style("margin-top:4px; margin-left:0px") == "margin-top:4px;margin-left:0px"
+
+
+def test_compacted_html_is_cached():
+    compact_html.cache_clear()
+
+    compact_html(QT_HTML)
+    compact_html(QT_HTML)
+
+    assert compact_html.cache_info().hits == 1
+
+
+def test_plain_text_has_a_line_per_block():
+    assert html_to_text("<head><title>x</title></head><p>One</p><p>Two<br>Three</p><ul><li>&amp; four</li></ul>") \
+        == "One\nTwo\nThree\n& four"
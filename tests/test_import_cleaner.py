@@ -0,0 +1,198 @@
+import contextlib
+import heapq
+import os
+
+import pytest
+
+from src.utilities import import_cleaner
+from src.utilities.address_normalizer import AddressNormalizer
+from src.utilities.import_cleaner import (EMPTY, INVALID_DOMAIN, INVALID_LOCAL_PART, MISSING_AT, MULTIPLE_AT, VALID,
+                                          CleanState, clean_email_list_cached, clean_email_lists, email_key,
+                                          file_fingerprint, is_header_row, is_valid_email, merge_runs, open_text_run,
+                                          validate_email_chunk, validate_emails, validation_pool, write_text_run)
+
+
+
+ADDRESSES = ["a@example.com", "first.last+tag@sub.example.co.uk", "", "no-at.example.com", "a@b@example.com",
+             "bad local@example.com", "a@example", "a@example.c", "a@exa_mple.com", "ünï@example.com",
+             "a@example.com ", "A%B-C_D@EXAMPLE.ORG", "@example.com", "a@"]
+
+
+@pytest.fixture
+def normalizer():
+    return AddressNormalizer()
+
+
+def write_list(path, lines):
+    path.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+
+def read_list(path):
+    return path.read_text(encoding="utf-8").splitlines()
+
+
+def touch_later(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_an_unchanged_list_is_not_cleaned_again(tmp_path, normalizer):
+    path = write_list(tmp_path / "list.csv", ["b@example.com", "a@example.com", "a@example.com"])
+    assert clean_email_list_cached(path, normalizer)
+
+    assert not clean_email_list_cached(path, normalizer)
+    assert read_list(tmp_path / "list.csv") == ["a@example.com", "b@example.com"]
+
+
+def test_an_appended_tail_is_cleaned_on_its_own(tmp_path, normalizer, monkeypatch):
+    path = write_list(tmp_path / "list.csv", ["b@example.com", "a@example.com"])
+    clean_email_list_cached(path, normalizer)
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("d@example.com\nnot an address\na@example.com\nc@example.com\nd@example.com\n")
+    monkeypatch.setattr(import_cleaner, "clean_email_list", lambda *args, **kwargs: pytest.fail("full clean"))
+
+    assert clean_email_list_cached(path, normalizer)
+
+    assert read_list(tmp_path / "list.csv") == ["a@example.com", "b@example.com", "d@example.com", "c@example.com"]
+    state = CleanState.load(path)
+    assert list(state.keys) == sorted(email_key(f"{name}@example.com") for name in "abcd")
+    assert not clean_email_list_cached(path, normalizer)
+
+
+def test_an_edited_list_is_cleaned_in_full(tmp_path, normalizer):
+    path = write_list(tmp_path / "list.csv", ["a@example.com", "b@example.com"])
+    clean_email_list_cached(path, normalizer)
+
+    write_list(tmp_path / "list.csv", ["z@example.com", "b@example.com", "c@example.com", "a@example.com"])
+
+    assert clean_email_list_cached(path, normalizer)
+    assert read_list(tmp_path / "list.csv") == ["a@example.com", "b@example.com", "c@example.com", "z@example.com"]
+
+
+def test_a_new_normalization_cleans_in_full(tmp_path):
+    path = write_list(tmp_path / "list.csv", ["Ann@example.com", "ann@example.com"])
+    clean_email_list_cached(path, AddressNormalizer())
+    assert len(read_list(tmp_path / "list.csv")) == 2
+
+    touch_later(path)
+    assert clean_email_list_cached(path, AddressNormalizer(fold_local_part=True))
+    assert read_list(tmp_path / "list.csv") == ["Ann@example.com"]
+
+
+def test_the_fingerprint_reads_only_the_ends_of_the_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(import_cleaner, "FINGERPRINT_BYTES", 4)
+    path = tmp_path / "data"
+    path.write_bytes(b"headMIDDLEtail")
+    fingerprint = file_fingerprint(str(path), 14)
+
+    path.write_bytes(b"headmiddletail")
+    assert file_fingerprint(str(path), 14) == fingerprint
+
+    path.write_bytes(b"headMIDDLEtaiL")
+    assert file_fingerprint(str(path), 14) != fingerprint
+    path.write_bytes(b"HeadMIDDLEtail")
+    assert file_fingerprint(str(path), 14) != fingerprint
+    assert file_fingerprint(str(path), 10) != file_fingerprint(str(path), 14)
+
+
+def test_vectorized_validation_matches_the_regular_expression():
+    reasons = validate_email_chunk(ADDRESSES)
+
+    assert [reason == VALID for reason in reasons] == [is_valid_email(address) for address in ADDRESSES]
+
+
+def test_rejected_addresses_tell_why():
+    reasons = validate_email_chunk(["", "no-at.example.com", "a@b@example.com", "bad local@example.com", "a@example"])
+
+    assert reasons.tolist() == [EMPTY, MISSING_AT, MULTIPLE_AT, INVALID_LOCAL_PART, INVALID_DOMAIN]
+
+
+def test_an_empty_input_validates_to_nothing():
+    valid, reasons = validate_emails([])
+
+    assert len(valid) == 0 and len(reasons) == 0
+
+
+def test_large_inputs_are_validated_in_chunks_across_processes(monkeypatch):
+    monkeypatch.setattr(import_cleaner, "PARALLEL_THRESHOLD", 10)
+    monkeypatch.setattr(import_cleaner, "VALIDATION_CHUNK_SIZE", 4)
+    emails = ADDRESSES * 3
+
+    valid, reasons = validate_emails(emails, processes=2)
+
+    assert valid.tolist() == [is_valid_email(address) for address in emails]
+    assert reasons.tolist() == validate_email_chunk(emails).tolist()
+
+
+def test_the_validation_pool_is_reused_between_runs(monkeypatch):
+    monkeypatch.setattr(import_cleaner, "PARALLEL_THRESHOLD", 10)
+    monkeypatch.setattr(import_cleaner, "VALIDATION_CHUNK_SIZE", 4)
+
+    validate_emails(ADDRESSES * 2, processes=2)
+    executor = validation_pool.executor
+    validate_emails(ADDRESSES * 2, processes=2)
+
+    assert validation_pool.executor is executor
+    validation_pool.shutdown()
+
+
+def test_merging_many_runs_keeps_few_files_open(tmp_path):
+    run_paths = []
+    for run in range(7):
+        run_path = str(tmp_path / f"run{run}")
+        write_text_run(run_path, [f"{value:03d}\n" for value in range(run, 70, 7)])
+        run_paths.append(run_path)
+
+    merged = merge_runs(run_paths, str(tmp_path), open_text_run, write_text_run, fan_in=2)
+
+    assert len(merged) == 2
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in merged)
+    with contextlib.ExitStack() as stack:
+        lines = list(heapq.merge(*(open_text_run(stack, path) for path in merged)))
+    assert lines == [f"{value:03d}\n" for value in range(70)]
+
+
+def test_lists_are_merged_keeping_the_first_row_of_each_address(tmp_path, normalizer):
+    first = write_list(tmp_path / "first.csv", ["email,name", "c@example.com,Cy", "a@example.com,Ann", "bad,Nobody"])
+    second = write_list(tmp_path / "second.csv",
+                        ["email,city,name", "a@example.com,Rome,Other Ann", "b@example.com,Oslo,Bo"])
+
+    written = clean_email_lists([first, second], str(tmp_path / "out.csv"), run_size=1, normalizer=normalizer)
+
+    assert written == 3
+    assert read_list(tmp_path / "out.csv") == ["email,name", "a@example.com,Ann", "b@example.com,Bo",
+                                               "c@example.com,Cy"]
+
+
+def test_a_list_can_be_merged_into_itself(tmp_path, normalizer):
+    path = write_list(tmp_path / "list.csv", ["b@example.com", "a@example.com", "b@example.com"])
+
+    clean_email_lists([path], path, run_size=2, normalizer=normalizer)
+
+    assert read_list(tmp_path / "list.csv") == ["a@example.com", "b@example.com"]
+    assert os.listdir(tmp_path) == ["list.csv"]
+
+
+@pytest.mark.parametrize("row, next_row, header", [
+    (["email", "First Name"], ["a@example.com", "Ann"], True),
+    (["E-mail Address"], None, True),
+    (["Email"], ["not an address"], True),
+    (["name", "city"], ["a@example.com", "Ann"], True),
+    (["name", "city"], ["Ann", "a@example.com"], False),
+    (["Exported from the CRM on Monday"], ["a@example.com"], False),
+    (["junk"], ["a@example.com"], False),
+    (["report: 3 lists", "page 1"], ["a@example.com", "x"], False),
+    (["email", "a@example.com"], ["b@example.com"], False),
+    (["", "name"], ["a@example.com", "Ann"], False),
+])
+def test_only_column_titles_make_a_header(row, next_row, header):
+    assert is_header_row(row, next_row) is header
+
+
+def test_a_junk_first_line_is_dropped_as_a_bad_recipient(tmp_path, normalizer):
+    path = write_list(tmp_path / "list.csv", ["Exported recipients", "b@example.com", "a@example.com"])
+
+    clean_email_list_cached(path, normalizer)
+
+    assert read_list(tmp_path / "list.csv") == ["a@example.com", "b@example.com"]
@@ -0,0 +1,92 @@
+import sys
+
+import pytest
+
+from src.utilities import resource_path
+from src.utilities.journal import SendJournal
+from src.utilities.send_engine import resume_pending
+
+
+
+ADDRESSES = ["a@example.com", "b@example.com", "c@example.com", "d@example.com"]
+
+
+class FakeCampaign:
+    campaign_id = "campaign"
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "journal.db")
+
+
+def test_new_campaign_is_all_pending(journal_path):
+    journal = SendJournal(journal_path)
+
+    settled, pending = resume_pending(journal, FakeCampaign(), ADDRESSES, [False] * 4)
+
+    assert settled == {}
+    assert pending == list(enumerate(ADDRESSES))
+
+
+def test_resume_after_restart_skips_what_was_sent(journal_path):
+    journal = SendJournal(journal_path)
+    journal.begin("campaign", ADDRESSES)
+    journal.record("campaign", ["a@example.com"], "Sent")
+    journal.record("campaign", ["b@example.com"], "Sending")
+    journal.record("campaign", ["c@example.com"], "Retrying")
+    journal.close()
+
+    settled, pending = resume_pending(SendJournal(journal_path), FakeCampaign(), ADDRESSES, [False] * 4)
+
+    assert settled == {"a@example.com": "Sent", "b@example.com": "Sending", "c@example.com": "Retrying"}
+    assert pending == [(2, "c@example.com"), (3, "d@example.com")]
+
+
+def test_failed_sends_are_resumed_but_unconfirmed_ones_are_not(journal_path):
+    journal = SendJournal(journal_path)
+    journal.begin("campaign", ADDRESSES)
+    journal.record("campaign", ["a@example.com"], "Failed")
+    journal.record("campaign", ["b@example.com"], "Unconfirmed")
+
+    assert sorted(journal.pending("campaign")) == ["a@example.com", "c@example.com", "d@example.com"]
+
+
+def test_begin_keeps_the_status_of_known_addresses(journal_path):
+    journal = SendJournal(journal_path)
+    journal.begin("campaign", ADDRESSES[:2])
+    journal.record("campaign", ["a@example.com"], "Sent")
+
+    journal.begin("campaign", ADDRESSES)
+
+    assert journal.settled("campaign") == {"a@example.com": "Sent"}
+    assert len(journal.pending("campaign")) == 3
+
+
+def test_campaigns_are_journaled_apart(journal_path):
+    journal = SendJournal(journal_path)
+    journal.begin("one", ADDRESSES)
+    journal.begin("two", ADDRESSES)
+
+    journal.record("one", ADDRESSES, "Sent")
+
+    assert journal.pending("one") == []
+    assert len(journal.pending("two")) == 4
+
+
+def test_suppressed_recipients_are_not_resumed(journal_path):
+    _, pending = resume_pending(SendJournal(journal_path), FakeCampaign(), ADDRESSES, [False, True, False, True])
+
+    assert pending == [(0, "a@example.com"), (2, "c@example.com")]
+
+
+def test_frozen_build_keeps_the_journal_in_the_user_data_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "_MEIPASS", str(tmp_path / "bundle"), raising=False)
+    monkeypatch.setattr(sys, "platform", "linux")
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+
+    path = resource_path.user_data_path(SendJournal.path)
+    SendJournal().close()
+
+    assert path == str(tmp_path / "data" / "LibertyMailStream" / "settings" / "send_journal.db")
+    assert (tmp_path / "data" / "LibertyMailStream" / "settings" / "send_journal.db").exists()
@@ -0,0 +1,327 @@
+import email
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.utilities.campaign import MessageStream
+from src.utilities.oauth import GmailService, SendOutcome, SendResult, classify_error
+
+
+
+class FakeBatchEndpoint(BaseHTTPRequestHandler):
+    """
+    Answers Gmail batch requests locally. Every message is answered by the server's answer function, which is given
+    the raw message and returns an HTTP status and JSON body, or None to leave the message out of the response.
+    Batches whose position is in the server's refused set are rejected as a whole.
+    """
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        request = email.message_from_bytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+        self.server.batches.append(len(request.get_payload()))
+        if len(self.server.batches) - 1 in self.server.refused:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        parts = []
+        for part in request.get_payload():
+            inner = part.get_payload()
+            raw = json.loads(inner.replace("\r\n", "\n").split("\n\n", 1)[1])["raw"]
+            answer = self.server.answer(raw)
+            if answer is None:
+                continue
+            status, payload = answer
+            parts.append(f"--BATCH\r\nContent-Type: application/http\r\n"
+                         f"Content-ID: <response-{part['Content-ID'][1:]}\r\n\r\n"
+                         f"HTTP/1.1 {status} Status\r\nContent-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n")
+        content = ("".join(parts) + "--BATCH--\r\n").encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/mixed; boundary=BATCH")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeUploadEndpoint(BaseHTTPRequestHandler):
+    """
+    Answers Gmail resumable media uploads locally. The server's failures counts down the chunk requests to answer
+    with a 503 instead of accepting them, so that an upload has to be resumed.
+    """
+    def do_POST(self):
+        self.server.uploaded = b""
+        self.send_response(200)
+        self.send_header("Location", f"http://127.0.0.1:{self.server.server_port}/session")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        total = int(self.headers["Content-Range"].rsplit("/", 1)[1])
+        start = re.match(r"bytes (\d+)-", self.headers["Content-Range"])
+        if start and self.server.failures:
+            self.server.failures -= 1
+            self.reply(503, error(503, "backendError")[1])
+            return
+        if start and int(start.group(1)) == len(self.server.uploaded):
+            self.server.uploaded += body
+            self.server.chunks += 1
+        if len(self.server.uploaded) < total:
+            self.send_response(308)
+            if self.server.uploaded:
+                self.send_header("Range", f"bytes=0-{len(self.server.uploaded) - 1}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.reply(200, {"id": "uploaded"})
+
+
+    def reply(self, status, payload):
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+def error(status, reason):
+    return status, {"error": {"code": status, "message": reason, "errors": [{"reason": reason}]}}
+
+
+@pytest.fixture
+def endpoint():
+    server = HTTPServer(("127.0.0.1", 0), FakeBatchEndpoint)
+    server.batches = []
+    server.refused = set()
+    server.answer = lambda raw: (200, {"id": f"id-{raw}"})
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def upload_endpoint():
+    server = HTTPServer(("127.0.0.1", 0), FakeUploadEndpoint)
+    server.uploaded = b""
+    server.chunks = 0
+    server.failures = 0
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def gmail():
+    pytest.importorskip("googleapiclient")
+    import httplib2
+    from googleapiclient import discovery_cache
+    from googleapiclient.discovery import build_from_document
+
+    service = GmailService()
+    service.service = build_from_document(discovery_cache.get_static_doc("gmail", "v1"), http=httplib2.Http())
+    return service
+
+
+def send(gmail, endpoint, raw_messages):
+    import httplib2
+
+    return gmail.send_batch(raw_messages, batch_uri=f"http://127.0.0.1:{endpoint.server_port}/batch/gmail/v1",
+                            http=httplib2.Http())
+
+
+def test_every_message_gets_its_own_result(gmail, endpoint):
+    results = send(gmail, endpoint, ["a", "b", "c"])
+
+    assert [result.outcome for result in results] == [SendOutcome.SENT] * 3
+    assert [result.message_id for result in results] == ["id-a", "id-b", "id-c"]
+    assert endpoint.batches == [3]
+
+
+def test_failures_are_classified_per_message(gmail, endpoint):
+    answers = {"bad": error(400, "invalidArgument"), "slow": error(429, "rateLimitExceeded"),
+               "down": error(503, "backendError")}
+    endpoint.answer = lambda raw: answers.get(raw, (200, {"id": raw}))
+
+    results = send(gmail, endpoint, ["ok", "bad", "slow", "down"])
+
+    assert [result.outcome for result in results] == [SendOutcome.SENT, SendOutcome.PERMANENT,
+                                                      SendOutcome.RATE_LIMITED, SendOutcome.TRANSIENT]
+    assert not any(result.ambiguous for result in results)
+
+
+def test_large_groups_are_split_into_several_batches(gmail, endpoint):
+    gmail.MAX_BATCH_SIZE = 2
+
+    results = send(gmail, endpoint, ["a", "b", "c", "d", "e"])
+
+    assert all(result.success for result in results)
+    assert endpoint.batches == [2, 2, 1]
+
+
+def test_a_refused_batch_fails_only_its_own_messages(gmail, endpoint):
+    gmail.MAX_BATCH_SIZE = 2
+    endpoint.refused = {1}
+
+    results = send(gmail, endpoint, ["a", "b", "c", "d"])
+
+    assert [result.outcome for result in results] == [SendOutcome.SENT, SendOutcome.SENT,
+                                                      SendOutcome.TRANSIENT, SendOutcome.TRANSIENT]
+
+
+def test_messages_missing_from_the_response_are_ambiguous(gmail, endpoint):
+    endpoint.answer = lambda raw: None if raw == "lost" else (200, {"id": raw})
+
+    results = send(gmail, endpoint, ["a", "lost"])
+
+    # googleapiclient cannot match a partial response, so neither message is known to have been sent
+    assert all(result.outcome is SendOutcome.TRANSIENT and result.ambiguous for result in results)
+
+
+def test_errors_after_the_request_left_are_ambiguous():
+    pytest.importorskip("googleapiclient")
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+    timeout = SendResult.from_error(TimeoutError("timed out"))
+    server_error = SendResult.from_error(HttpError(httplib2.Response({"status": 503}), b"{}"))
+
+    assert timeout.outcome is SendOutcome.TRANSIENT and timeout.ambiguous
+    assert server_error.outcome is SendOutcome.TRANSIENT and not server_error.ambiguous
+
+
+@pytest.mark.parametrize("status, reason, outcome", [
+    (429, "rateLimitExceeded", SendOutcome.RATE_LIMITED),
+    (403, "userRateLimitExceeded", SendOutcome.RATE_LIMITED),
+    (403, "dailyLimitExceeded", SendOutcome.QUOTA),
+    (401, "authError", SendOutcome.AUTH_EXPIRED),
+    (400, "invalidArgument", SendOutcome.PERMANENT),
+    (500, "backendError", SendOutcome.TRANSIENT),
+])
+def test_http_errors_are_classified(status, reason, outcome):
+    pytest.importorskip("googleapiclient")
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+    _, payload = error(status, reason)
+    assert classify_error(HttpError(httplib2.Response({"status": status}), json.dumps(payload).encode())) is outcome
+
+
+def test_a_message_stream_reads_its_parts_as_one():
+    stream = MessageStream([b"Header: 1\n", b"", b"body", b" and tail"])
+
+    assert stream.read(4) == b"Head"
+    assert stream.read() == b"er: 1\nbody and tail"
+    stream.seek(-4, 2)
+    assert stream.tell() == 19
+    assert stream.read(100) == b"tail"
+    assert stream.read(1) == b""
+    stream.seek(0)
+    assert stream.read() == b"Header: 1\nbody and tail"
+
+
+def upload(gmail, endpoint, content):
+    import httplib2
+
+    class LocalHttp(httplib2.Http):
+        """
+        Sends the requests meant for Gmail to the local endpoint, and leaves 308 responses to googleapiclient as
+        build_http does.
+        """
+        def __init__(self) -> None:
+            super().__init__()
+            self.redirect_codes = self.redirect_codes - {308}
+
+        def request(self, uri, *args, **kwargs):
+            uri = uri.replace("https://gmail.googleapis.com/", f"http://127.0.0.1:{endpoint.server_port}/")
+            return super().request(uri, *args, **kwargs)
+
+    gmail.transports.http = LocalHttp()
+    gmail.UPLOAD_CHUNK_SIZE = 256 * 1024
+    gmail.UPLOAD_RESUME_DELAY = 0
+    return gmail.send_upload(MessageStream([content[:1000], content[1000:]]))
+
+
+def test_large_messages_are_uploaded_in_chunks(gmail, upload_endpoint):
+    content = bytes(range(256)) * 2048
+
+    result = upload(gmail, upload_endpoint, content)
+
+    assert result.outcome is SendOutcome.SENT and result.message_id == "uploaded"
+    assert upload_endpoint.uploaded == content
+    assert upload_endpoint.chunks == 2
+
+
+def test_an_interrupted_upload_resumes_from_the_last_chunk(gmail, upload_endpoint):
+    content = bytes(range(256)) * 4096
+    upload_endpoint.failures = 3
+
+    result = upload(gmail, upload_endpoint, content)
+
+    assert result.success
+    assert upload_endpoint.uploaded == content
+    assert upload_endpoint.chunks == 4
+
+
+def test_an_upload_that_keeps_failing_gives_up(gmail, upload_endpoint):
+    upload_endpoint.failures = GmailService.UPLOAD_RESUME_ATTEMPTS
+
+    result = upload(gmail, upload_endpoint, bytes(1024))
+
+    assert result.outcome is SendOutcome.TRANSIENT and not result.ambiguous
+    assert upload_endpoint.uploaded == b""
+
+
+def test_a_sign_in_cancelled_before_it_starts_returns_at_once(monkeypatch):
+    pytest.importorskip("google_auth_oauthlib")
+    import webbrowser
+
+    opened = []
+    monkeypatch.setattr(webbrowser, "open_new", opened.append)
+    service = GmailService()
+    auth_code_event = service.prepare_authentication()
+    service.cancel_authentication()
+
+    assert not service.authenticate("client", "secret", timeout=30, auth_code_event=auth_code_event)
+    assert opened == []
+
+
+def test_a_denied_sign_in_stops_waiting(monkeypatch):
+    pytest.importorskip("google_auth_oauthlib")
+    import webbrowser
+    from urllib.error import HTTPError
+    from urllib.request import urlopen
+
+    statuses = []
+
+    def redirect(auth_url):
+        query = parse_qs(urlparse(auth_url).query)
+        base = query["redirect_uri"][0]
+        for state in ("forged", query["state"][0]):
+            try:
+                urlopen(f"{base}?error=access_denied&state={state}")
+            except HTTPError as e:
+                statuses.append(e.code)
+
+    monkeypatch.setattr(webbrowser, "open_new", lambda url: threading.Thread(target=redirect, args=(url,)).start())
+
+    assert not GmailService().authenticate("client", "secret", timeout=30)
+    assert statuses == [400, 401]
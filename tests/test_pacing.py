@@ -0,0 +1,95 @@
+import threading
+import time
+
+from src.utilities.pacing import Pacer
+
+
+
+def test_slots_are_spaced_by_the_interval():
+    pacer = Pacer(0.05)
+    start = time.monotonic()
+
+    for _ in range(3):
+        assert pacer.acquire()
+
+    assert time.monotonic() - start >= 0.1
+
+
+def test_concurrent_callers_share_the_rate():
+    pacer = Pacer(0.05)
+    granted = []
+    start = time.monotonic()
+
+    callers = [threading.Thread(target=lambda: pacer.acquire() and granted.append(time.monotonic()))
+               for _ in range(4)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join(timeout=5)
+
+    assert len(granted) == 4
+    assert max(granted) - start >= 0.15
+
+
+def test_cancel_releases_a_waiting_caller():
+    pacer = Pacer(60)
+    pacer.acquire()
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(pacer.acquire()))
+    waiter.start()
+
+    pacer.cancel()
+    waiter.join(timeout=5)
+
+    assert results == [False]
+
+
+def test_a_batch_takes_one_slot_per_message():
+    pacer = Pacer(10)
+
+    start = time.monotonic()
+    assert pacer.acquire(3)
+
+    assert time.monotonic() - start < 1
+    assert pacer.ready_at() >= start + 30
+
+
+def test_rate_limit_halves_the_rate():
+    pacer = Pacer(10)
+
+    pacer.on_rate_limited()
+
+    assert pacer.interval == 20
+    assert pacer.ready_at() >= time.monotonic() + 19
+
+
+def test_rate_limit_is_capped():
+    pacer = Pacer(10)
+
+    for _ in range(20):
+        pacer.on_rate_limited()
+
+    assert pacer.interval == Pacer.MAX_INTERVAL
+
+
+def test_successes_recover_additively_to_the_configured_rate():
+    for interval in (1, 300):
+        pacer = Pacer(interval)
+        pacer.on_rate_limited()
+
+        successes = 0
+        while pacer.interval > interval:
+            previous = pacer.interval
+            pacer.on_success()
+            successes += 1
+            assert pacer.interval < previous
+        assert 1 < successes <= 10
+        assert pacer.interval == interval
+
+
+def test_success_never_goes_faster_than_configured():
+    pacer = Pacer(5)
+
+    pacer.on_success()
+
+    assert pacer.interval == 5
@@ -0,0 +1,76 @@
+import time
+
+from src.utilities.progress import ProgressChannel
+
+
+
+def test_changes_of_a_row_collapse_into_its_latest_status():
+    snapshots = []
+    channel = ProgressChannel(3, snapshots.append)
+
+    channel.record(0, "Sending")
+    channel.record(0, "Sent")
+    channel.record(1, "Sending")
+    channel.flush()
+
+    assert len(snapshots) == 1
+    assert snapshots[0].updates == {0: "Sent", 1: "Sending"}
+    assert snapshots[0].counts == {"Sent": 1, "Sending": 1}
+
+
+def test_only_new_changes_are_delivered_and_counts_carry_over():
+    snapshots = []
+    channel = ProgressChannel(3, snapshots.append)
+    channel.record(0, "Sent")
+    channel.flush()
+
+    channel.flush()
+    channel.record(1, "Failed")
+    channel.record(2, "Suppressed")
+    channel.flush()
+
+    assert len(snapshots) == 2
+    assert snapshots[1].updates == {1: "Failed", 2: "Suppressed"}
+    assert snapshots[1].counts == {"Sent": 1, "Failed": 1, "Suppressed": 1}
+
+
+def test_done_counts_only_final_statuses():
+    snapshots = []
+    channel = ProgressChannel(5, snapshots.append)
+
+    for row, status in enumerate(["Sent", "Failed", "Unconfirmed", "Retrying", "Sending"]):
+        channel.record(row, status)
+    channel.flush()
+
+    assert snapshots[0].done == 3
+    assert snapshots[0].total == 5
+    assert snapshots[0].eta is not None
+
+
+def test_nothing_is_done_so_there_is_no_eta():
+    snapshots = []
+    channel = ProgressChannel(2, snapshots.append)
+
+    channel.record(0, "Sending")
+    channel.flush()
+
+    assert snapshots[0].done == 0
+    assert snapshots[0].eta is None
+    assert snapshots[0].throughput == 0
+
+
+def test_the_ticker_batches_changes_and_close_delivers_the_rest():
+    snapshots = []
+    channel = ProgressChannel(100, snapshots.append, interval=0.05)
+    channel.start()
+
+    for row in range(100):
+        channel.record(row, "Sent")
+    time.sleep(0.15)
+    channel.record(0, "Sent")
+    channel.close()
+
+    assert 2 <= len(snapshots) <= 3
+    assert sum(len(snapshot.updates) for snapshot in snapshots) == 101
+    assert snapshots[-1].done == 100
+    assert not channel.ticker.is_alive()
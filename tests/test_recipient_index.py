@@ -0,0 +1,85 @@
+import os
+
+from src.utilities.recipient_index import RecipientIndex
+
+
+
+def write_csv(tmp_path, text, name="recipients.csv"):
+    path = tmp_path / name
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def addresses(chunks):
+    return [row[0] for chunk in chunks for row in chunk]
+
+
+def test_header_is_read_and_not_counted(tmp_path):
+    path = write_csv(tmp_path, "email,name\na@example.com,Ann\nb@example.com,Bob\n")
+    index = RecipientIndex(path)
+
+    rows = [row for chunk in index.iter_chunks(10) for row in chunk]
+
+    assert index.header == ["email", "name"]
+    assert rows == [["a@example.com", "Ann"], ["b@example.com", "Bob"]]
+    assert index.row_count == 2
+    assert index.is_complete()
+
+
+def test_chunks_skip_blank_lines(tmp_path):
+    path = write_csv(tmp_path, "a@example.com\n\nb@example.com\n\n\nc@example.com\n")
+
+    chunks = list(RecipientIndex(path).iter_chunks(2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert addresses(chunks) == ["a@example.com", "b@example.com", "c@example.com"]
+
+
+def test_quoted_values_spanning_lines_stay_in_one_row(tmp_path):
+    path = write_csv(tmp_path, 'email,note\na@example.com,"first\nsecond ""quoted""\n\nthird"\nb@example.com,plain\n')
+    index = RecipientIndex(path)
+
+    rows = [row for chunk in index.iter_chunks(10) for row in chunk]
+
+    assert rows == [["a@example.com", 'first\nsecond "quoted"\n\nthird'], ["b@example.com", "plain"]]
+    assert index.read_rows(1, 1) == [["b@example.com", "plain"]]
+
+
+def test_rows_are_reached_through_the_sparse_offsets(tmp_path, monkeypatch):
+    monkeypatch.setattr(RecipientIndex, "STRIDE", 4)
+    path = write_csv(tmp_path, "".join(f'r{row}@example.com,"line\nbreak"\n' for row in range(10)))
+    index = RecipientIndex(path)
+    list(index.iter_chunks(3))
+
+    assert len(index.offsets) == 3
+    assert index.read_rows(5, 3) == [[f"r{row}@example.com", "line\nbreak"] for row in (5, 6, 7)]
+    assert addresses(index.iter_chunks(3, start_row=9)) == ["r9@example.com"]
+
+
+def test_a_saved_index_is_reused_until_the_file_changes(tmp_path):
+    path = write_csv(tmp_path, "a@example.com\nb@example.com\n")
+    index = RecipientIndex(path)
+    list(index.iter_chunks(10))
+    index.save()
+
+    loaded = RecipientIndex.load(path)
+    assert (loaded.row_count, loaded.end_offset) == (2, index.end_offset)
+
+    with open(path, "a") as file:
+        file.write("c@example.com\n")
+    os.utime(path, ns=(index.mtime_ns + 10**9, index.mtime_ns + 10**9))
+
+    assert RecipientIndex.load(path).row_count == 0
+
+
+def test_a_partly_built_index_resumes_where_it_stopped(tmp_path):
+    path = write_csv(tmp_path, "".join(f"r{row}@example.com\n" for row in range(5)))
+    index = RecipientIndex(path)
+    chunks = index.iter_chunks(2)
+    next(chunks)
+    chunks.close()
+
+    assert index.row_count == 2
+    assert not index.is_complete()
+    assert addresses(index.iter_chunks(2, start_row=index.row_count)) == [f"r{row}@example.com" for row in (2, 3, 4)]
+    assert index.is_complete()
@@ -0,0 +1,275 @@
+import datetime
+import threading
+
+import pytest
+
+from src.utilities.campaign import Campaign
+from src.utilities.config import config
+from src.utilities.oauth import SendOutcome, SendResult
+from src.utilities.send_engine import SendEngine
+
+
+
+SENT = SendResult(SendOutcome.SENT, message_id="id")
+
+
+class FakeGmail:
+    """
+    Answers every send with the next result of a script, then with SENT.
+    """
+    def __init__(self, *results) -> None:
+        self.results = list(results)
+        self.requests = []
+        self.lock = threading.Lock()
+
+
+    def result(self) -> SendResult:
+        with self.lock:
+            return self.results.pop(0) if self.results else SENT
+
+
+    def send_message(self, raw) -> SendResult:
+        self.requests.append(1)
+        return self.result()
+
+
+    def send_batch(self, raw_messages) -> list:
+        self.requests.append(len(raw_messages))
+        return [self.result() for _ in raw_messages]
+
+
+class FakeJournal:
+    def __init__(self, fail_on=None) -> None:
+        self.fail_on = fail_on
+        self.statuses = {}
+
+
+    def record(self, campaign_id, addresses, status) -> None:
+        if status == self.fail_on:
+            raise OSError("disk full")
+        for address in addresses:
+            self.statuses[address] = status
+
+
+class Mask(list):
+    def any(self) -> bool:
+        return any(self)
+
+
+class FakeSuppression:
+    def __init__(self, suppressed=()) -> None:
+        self.suppressed = set(suppressed)
+
+
+    def refresh(self) -> None:
+        pass
+
+
+    def mask(self, addresses) -> Mask:
+        return Mask(address in self.suppressed for address in addresses)
+
+
+class FakeRecipients:
+    def fields(self, row) -> dict:
+        return {}
+
+
+@pytest.fixture(autouse=True)
+def preferences(monkeypatch):
+    preferences = config.config["PREFERENCES"]
+    monkeypatch.setitem(preferences, "email_delay", "0")
+    monkeypatch.setitem(preferences, "send_workers", "2")
+    monkeypatch.setitem(preferences, "send_batch_size", "1")
+    return preferences
+
+
+def make_engine(accounts, count=4, journal=None, suppression=None):
+    """
+    Returns:
+        tuple: An engine sending to count recipients, and the list collecting the error messages it reports.
+    """
+    errors = []
+    engine = SendEngine([(row, f"user{row}@example.com") for row in range(count)], accounts,
+                        Campaign("Subject", "<p>Hello</p>", "Hello"), journal or FakeJournal(),
+                        suppression or FakeSuppression(), FakeRecipients(), lambda snapshot: None, errors.append)
+    engine.RETRY_BASE_DELAY = 0.01
+    return engine, errors
+
+
+def finish(engine) -> None:
+    """
+    Runs an engine, failing the test if it does not terminate.
+    """
+    runner = threading.Thread(target=engine.run, daemon=True)
+    runner.start()
+    runner.join(timeout=10)
+    assert not runner.is_alive(), "the run did not terminate"
+
+
+def run(accounts, count=4, journal=None, suppression=None):
+    """
+    Returns:
+        tuple: The engine after running over count recipients, its journal and the error messages it reported.
+    """
+    engine, errors = make_engine(accounts, count, journal, suppression)
+    finish(engine)
+    return engine, engine.journal, errors
+
+
+def test_every_recipient_is_sent_once(make_account):
+    sender = make_account("main", FakeGmail())
+
+    _, journal, errors = run([sender])
+
+    assert set(journal.statuses.values()) == {"Sent"}
+    assert len(journal.statuses) == 4
+    assert sender.gmail_service.requests == [1, 1, 1, 1]
+    assert sender.state.used == 4 and sender.state.refunds == 0
+    assert errors == []
+
+
+def test_stop_ends_the_run_with_recipients_left(make_account):
+    sender = make_account("main", FakeGmail())
+    engine, errors = make_engine([sender], count=50)
+    sender.gmail_service.send_message = lambda raw: (engine.stop(), SENT)[1]
+
+    finish(engine)
+
+    assert list(engine.journal.statuses.values()).count("Sent") < 50
+    assert errors == []
+
+
+def test_groups_share_a_batch_request(make_account, preferences):
+    preferences["send_batch_size"] = "5"
+    sender = make_account("main", FakeGmail())
+
+    _, journal, _ = run([sender], count=10)
+
+    assert sorted(sender.gmail_service.requests) == [5, 5]
+    assert set(journal.statuses.values()) == {"Sent"}
+
+
+def test_group_is_cut_to_the_remaining_capacity(make_account, preferences):
+    preferences["send_batch_size"] = "5"
+    sender = make_account("main", FakeGmail(), capacity=7)
+    engine, errors = make_engine([sender], count=10)
+    sender.state.next_slot_frees_at = lambda: (engine.stop(), datetime.datetime.now())[1]
+
+    finish(engine)
+
+    assert sorted(sender.gmail_service.requests) == [2, 5]
+    assert list(engine.journal.statuses.values()) == ["Sent"] * 7
+    assert errors == []
+
+
+def test_transient_failure_is_refunded_and_retried(make_account):
+    sender = make_account("main", FakeGmail(SendResult(SendOutcome.TRANSIENT, error="503")))
+
+    engine, journal, _ = run([sender], count=1)
+
+    assert journal.statuses == {"user0@example.com": "Sent"}
+    assert sender.state.refunds == 1 and sender.state.used == 1
+    assert engine.charges == {"user0@example.com": (sender, 1)}
+
+
+def test_transient_failure_gives_up_after_max_attempts(make_account):
+    failure = SendResult(SendOutcome.TRANSIENT, error="503")
+    sender = make_account("main", FakeGmail(*[failure] * SendEngine.MAX_ATTEMPTS))
+
+    _, journal, _ = run([sender], count=1)
+
+    assert journal.statuses == {"user0@example.com": "Failed"}
+    assert len(sender.gmail_service.requests) == SendEngine.MAX_ATTEMPTS
+    assert sender.state.used == 0
+
+
+def test_permanent_failure_is_refunded_and_not_retried(make_account):
+    sender = make_account("main", FakeGmail(SendResult(SendOutcome.PERMANENT, error="bad address")))
+
+    _, journal, _ = run([sender], count=1)
+
+    assert journal.statuses == {"user0@example.com": "Failed"}
+    assert sender.gmail_service.requests == [1]
+    assert sender.state.used == 0
+
+
+def test_ambiguous_failure_is_unconfirmed_and_keeps_its_slot(make_account):
+    sender = make_account("main", FakeGmail(SendResult(SendOutcome.TRANSIENT, error="timed out", ambiguous=True)))
+
+    _, journal, _ = run([sender], count=1)
+
+    assert journal.statuses == {"user0@example.com": "Unconfirmed"}
+    assert sender.gmail_service.requests == [1]
+    assert sender.state.used == 1 and sender.state.refunds == 0
+
+
+def test_quota_failure_fails_over_to_another_account(make_account):
+    exhausted = make_account("main", FakeGmail(SendResult(SendOutcome.QUOTA, error="limit")))
+    spare = make_account("spare", FakeGmail())
+
+    engine, journal, errors = run([exhausted, spare])
+
+    assert set(journal.statuses.values()) == {"Sent"}
+    assert "main" in engine.pool.retired
+    assert exhausted.state.used == 0
+    assert spare.state.used == 4
+    assert errors == []
+
+
+def test_stop_ends_a_run_waiting_for_quota(make_account):
+    sender = make_account("main", FakeGmail(), capacity=2)
+    engine, errors = make_engine([sender])
+
+    def frees_at():
+        # Only asked once every slot is used, when the run starts waiting for the window to move
+        engine.stop()
+        return datetime.datetime.now() + datetime.timedelta(hours=1)
+
+    sender.state.next_slot_frees_at = frees_at
+    finish(engine)
+
+    assert list(engine.journal.statuses.values()) == ["Sent", "Sent"]
+    assert errors == []
+
+
+def test_run_stops_when_no_account_is_left(make_account):
+    sender = make_account("main", FakeGmail(*[SendResult(SendOutcome.AUTH_EXPIRED, error="revoked")] * 4))
+
+    _, journal, errors = run([sender])
+
+    assert len(errors) == 1
+    assert "Pending" in journal.statuses.values()
+    assert "Sent" not in journal.statuses.values()
+    assert sender.state.used == 0
+
+
+def test_journal_failure_halts_the_run(make_account):
+    sender = make_account("main", FakeGmail())
+
+    _, _, errors = run([sender], journal=FakeJournal(fail_on="Sent"))
+
+    assert len(errors) == 1
+    assert "could not be recorded" in errors[0]
+
+
+def test_suppressed_recipients_are_skipped_and_refunded(make_account):
+    sender = make_account("main", FakeGmail())
+
+    _, journal, _ = run([sender], count=2, suppression=FakeSuppression({"user1@example.com"}))
+
+    assert journal.statuses == {"user0@example.com": "Sent"}
+    assert sender.gmail_service.requests == [1]
+    assert sender.state.used == 1 and sender.state.refunds == 1
+
+
+def test_rate_limit_slows_the_account_down_and_retries(make_account):
+    sender = make_account("main", FakeGmail(SendResult(SendOutcome.RATE_LIMITED, error="429")))
+    engine, errors = make_engine([sender], count=1)
+    slowed = []
+    engine.pool.pacer(sender).on_rate_limited = lambda: slowed.append(1)
+
+    finish(engine)
+
+    assert engine.journal.statuses == {"user0@example.com": "Sent"}
+    assert slowed == [1]
+    assert errors == []
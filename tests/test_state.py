@@ -0,0 +1,174 @@
+import json
+
+import pytest
+
+from src.utilities import state
+from src.utilities.state import StateManager
+
+
+
+@pytest.fixture
+def state_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(state, "user_data_path", lambda relative_path: str(tmp_path / relative_path))
+    (tmp_path / "settings").mkdir()
+    return tmp_path / "settings" / "state_test.json"
+
+
+@pytest.fixture
+def make_manager(state_path):
+    managers = []
+
+    def make(limit=10):
+        manager = StateManager("test")
+        manager.max_email_count = limit
+        managers.append(manager)
+        return manager
+
+    yield make
+    # Nothing may be flushed at exit, once the state file has been cleaned up
+    for manager in managers:
+        manager.lease = None
+
+
+def persisted_count(state_path):
+    with open(state_path) as f:
+        return sum(count for _, count in json.load(f)["buckets"])
+
+
+def test_charge_counts_sends_until_the_limit(make_manager):
+    manager = make_manager(limit=3)
+
+    minutes = [manager.charge() for _ in range(3)]
+
+    assert minutes == [StateManager.current_minute()] * 3
+    assert manager.sent_in_window == 3
+    assert manager.charge() is None
+    assert not manager.can_send_email()
+
+
+def test_refund_gives_the_slot_back(make_manager):
+    manager = make_manager(limit=2)
+    manager.charge()
+    minute = manager.charge()
+
+    manager.refund(minute)
+
+    assert manager.available_now() == 1
+    assert manager.charge() is not None
+
+
+def test_refund_of_an_unknown_minute_is_ignored(make_manager):
+    manager = make_manager()
+    minute = manager.charge()
+
+    manager.refund(minute - 5)
+
+    assert manager.sent_in_window == 1
+
+
+def test_lease_writes_the_file_once_per_lease(make_manager, monkeypatch):
+    manager = make_manager(limit=100)
+    writes = []
+    write = manager.update_state_file
+    monkeypatch.setattr(manager, "update_state_file", lambda: (writes.append(1), write()))
+
+    for _ in range(StateManager.LEASE_SIZE):
+        manager.charge()
+    assert len(writes) == 1
+
+    manager.charge()
+    assert len(writes) == 2
+
+
+def test_persisted_counts_never_fall_below_the_real_sends(make_manager, state_path):
+    manager = make_manager(limit=100)
+
+    for sends in range(1, 2 * StateManager.LEASE_SIZE + 1):
+        manager.charge()
+        assert persisted_count(state_path) >= sends
+
+
+def test_lease_is_capped_by_the_limit(make_manager, state_path):
+    manager = make_manager(limit=5)
+
+    manager.charge()
+
+    assert persisted_count(state_path) == 5
+
+
+def test_flush_releases_the_unused_lease(make_manager, state_path):
+    manager = make_manager(limit=100)
+    for _ in range(3):
+        manager.charge()
+
+    manager.flush()
+
+    assert persisted_count(state_path) == 3
+    assert make_manager(limit=100).sent_in_window == 3
+
+
+def test_lease_survives_a_crash_as_sends(make_manager):
+    manager = make_manager(limit=100)
+    manager.charge()
+
+    reloaded = make_manager(limit=100)
+
+    assert reloaded.sent_in_window == StateManager.LEASE_SIZE
+    assert max(minute for minute, _ in reloaded.buckets) <= StateManager.current_minute()
+
+
+def test_unreadable_file_uses_up_the_limit(make_manager, state_path):
+    state_path.write_text("{not json")
+
+    manager = make_manager()
+
+    assert not manager.can_send_email()
+
+
+def test_missing_file_starts_empty(make_manager):
+    assert make_manager().available_now() == 10
+
+
+def test_expired_buckets_leave_the_window(make_manager, state_path):
+    now = StateManager.current_minute()
+    state_path.write_text(json.dumps({"buckets": [[now - StateManager.WINDOW_MINUTES - 1, 7], [now - 10, 2]]}))
+
+    manager = make_manager()
+
+    assert manager.sent_in_window == 2
+    assert manager.available_now() == 8
+
+
+def test_slots_free_up_as_sends_age_out(make_manager, monkeypatch):
+    manager = make_manager(limit=2)
+    minute = StateManager.current_minute()
+    manager.charge()
+    manager.charge()
+    assert manager.next_slot_frees_at().timestamp() == (minute + StateManager.WINDOW_MINUTES) * 60
+
+    monkeypatch.setattr(StateManager, "current_minute", staticmethod(lambda: minute + StateManager.WINDOW_MINUTES))
+
+    assert manager.available_now() == 2
+
+
+def test_old_daily_state_files_are_counted_at_their_date(make_manager, state_path):
+    state_path.write_text(json.dumps({"todays_date": "2000-01-01 10:00:00.000000", "sent_today": 40}))
+
+    assert make_manager(limit=50).available_now() == 50
+
+
+def test_lease_is_renewed_after_its_hour(make_manager, monkeypatch):
+    manager = make_manager(limit=100)
+    writes = []
+    write = manager.update_state_file
+    monkeypatch.setattr(manager, "update_state_file", lambda: (writes.append(1), write()))
+    minute = StateManager.current_minute()
+    manager.charge()
+
+    monkeypatch.setattr(StateManager, "current_minute", staticmethod(lambda: minute + StateManager.LEASE_MINUTES - 1))
+    manager.charge()
+    assert len(writes) == 1
+
+    monkeypatch.setattr(StateManager, "current_minute", staticmethod(lambda: minute + StateManager.LEASE_MINUTES))
+    manager.charge()
+    assert len(writes) == 2
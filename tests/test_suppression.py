@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from src.utilities.address_normalizer import AddressNormalizer
+from src.utilities.suppression import SuppressionList
+
+
+
+@pytest.fixture
+def suppression_path(tmp_path):
+    path = tmp_path / "suppression.csv"
+    path.write_text("John.Smith@gmail.com\nann@example.com\n\n", encoding="utf-8")
+    return str(path)
+
+
+def test_addresses_are_matched_on_their_canonical_form(suppression_path):
+    suppression = SuppressionList(suppression_path, AddressNormalizer())
+
+    mask = suppression.mask(["johnsmith+news@googlemail.com", "ann@example.com", "Ann@example.com", "bob@example.com"])
+
+    assert mask.tolist() == [True, True, False, False]
+
+
+def test_a_missing_list_suppresses_nothing(tmp_path):
+    suppression = SuppressionList(str(tmp_path / "missing.csv"), AddressNormalizer())
+
+    assert suppression.mask(["ann@example.com"]).tolist() == [False]
+    assert suppression.mask([]).tolist() == []
+
+
+def test_the_hashes_are_reloaded_from_the_sidecar(suppression_path, monkeypatch):
+    SuppressionList(suppression_path, AddressNormalizer()).refresh()
+    monkeypatch.setattr(SuppressionList, "hash", lambda self, addresses: pytest.fail("rebuilt"))
+
+    suppression = SuppressionList(suppression_path, AddressNormalizer())
+    suppression.refresh()
+
+    assert len(suppression.keys) == 2
+
+
+def test_the_sidecar_is_rebuilt_when_the_list_or_the_normalization_changes(suppression_path):
+    SuppressionList(suppression_path, AddressNormalizer()).refresh()
+
+    folded = SuppressionList(suppression_path, AddressNormalizer(fold_local_part=True))
+    assert folded.mask(["ANN@example.com"]).tolist() == [True]
+
+    with open(suppression_path, "a", encoding="utf-8") as file:
+        file.write("bob@example.com\n")
+    stat = os.stat(suppression_path)
+    os.utime(suppression_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert SuppressionList(suppression_path, AddressNormalizer()).mask(["bob@example.com"]).tolist() == [True]
+
+
+def test_added_addresses_are_suppressed_and_kept(suppression_path):
+    suppression = SuppressionList(suppression_path, AddressNormalizer())
+
+    suppression.add(["bob@example.com"])
+
+    assert suppression.mask(["bob@example.com"]).tolist() == [True]
+    assert SuppressionList(suppression_path, AddressNormalizer()).mask(["bob@example.com"]).tolist() == [True]
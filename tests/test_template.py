@@ -0,0 +1,40 @@
+from src.utilities.template import MergeTemplate, field_key
+
+
+
+def test_field_keys_match_across_spellings():
+    assert field_key(" First Name ") == field_key("first_name") == field_key("first-name") == "first_name"
+
+
+def test_render_fills_placeholders():
+    template = MergeTemplate("Hello {{ First Name }}, welcome to {{city}}. Bye {{first_name}}!")
+
+    assert template.fields == ("first_name", "city")
+    assert template.render({"first_name": "Ann", "city": "Rome"}) == "Hello Ann, welcome to Rome. Bye Ann!"
+
+
+def test_missing_values_use_the_default_or_nothing():
+    template = MergeTemplate("Hi {{name|there}}{{suffix}}")
+
+    assert template.defaults == {"name": "there"}
+    assert template.render({}) == "Hi there"
+    assert template.render({"name": ""}) == "Hi there"
+
+
+def test_literal_braces_are_kept():
+    template = MergeTemplate("{ a } {{name}} {b}")
+
+    assert template.render({"name": "x"}) == "{ a } x {b}"
+
+
+def test_static_text_is_returned_as_is():
+    template = MergeTemplate("No {placeholders} here")
+
+    assert template.is_static
+    assert template.render({"anything": "x"}) == "No {placeholders} here"
+
+
+def test_html_values_are_escaped():
+    template = MergeTemplate.for_html("<p>{{name}}</p>")
+
+    assert template.render({"name": "<b>Tom & Jerry</b>"}) == "<p>&lt;b&gt;Tom &amp; Jerry&lt;/b&gt;</p>"